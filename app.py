@@ -1,34 +1,74 @@
 # backend/app.py
+import asyncio
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import uuid
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from datetime import date
+from typing import Optional
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query
 from fastapi.responses import JSONResponse
-from auth import router as auth_router
+from auth import auth_cache_stats, router as auth_router
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel  # using simple str for email to avoid extra deps
 from dotenv import load_dotenv
-import certifi
-from motor.motor_asyncio import AsyncIOMotorClient
-from utils.inference import run_inference
+from contextlib import asynccontextmanager
+from utils.model_provider import model_provider
+from utils.result_cache import result_cache
 from fastapi.staticfiles import StaticFiles
-from database import bookings_collection
-from routes.valuation_routes import router as valuation_router
-from routes import listings, payments,orders,marketplace,users
-
-IN_SERVER = True  # Set True when running on Render
-
-if IN_SERVER:
-    run_inference = None
-else:
-    from utils.inference import run_inference
+from database import MONGO_BOOKINGS_COLLECTION, close_client, collection, open_client, pool_stats
+from db_indexes import reconcile_indexes
+from models.listing_model import listings_collection
+from utils.listing_cache import listing_cache
+from utils.passwords import password_hasher
+from utils import serialization
+from services import booking_slots, outbox, pricing_tables, reservations, search
+from services.valuation_memo import valuation_memo
+from routes.valuation_routes import VALUATION_MAX_UPLOAD_BYTES, router as valuation_router
+from utils.body_limit import BodyLimitMiddleware
+from routes import listings, payments,orders,marketplace,users,classify,media,exports
+
+# Classifier loading is controlled by INFERENCE_MODE (disabled | lazy | eager),
+# see utils/model_provider.py. Render deployments leave it "disabled".
 
 
 load_dotenv()
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_client()
+    # the slot capacity guard relies on this unique index: build it before
+    # taking bookings and fail startup if that's impossible
+    await booking_slots.ensure_index()
+    # index builds can take a while on big collections; don't block startup
+    # (keep a reference: the loop only holds tasks weakly)
+    index_builder = asyncio.create_task(reconcile_indexes())
+    listing_cache.start(listings_collection)
+    sweeper = asyncio.create_task(reservations.run_sweeper())
+    outbox.outbox_worker.start()
+    await pricing_tables.start()
+    search.start()
+    await model_provider.startup()
+    yield
+    index_builder.cancel()
+    try:
+        await index_builder
+    except asyncio.CancelledError:
+        pass
+    sweeper.cancel()
+    try:
+        await sweeper
+    except asyncio.CancelledError:
+        pass
+    await outbox.outbox_worker.stop()
+    await pricing_tables.stop()
+    await search.stop()
+    await model_provider.shutdown()
+    await listing_cache.stop()
+    close_client()
+
+
+# orjson when installed (utils/serialization.py)
+app = FastAPI(lifespan=lifespan, default_response_class=serialization.JSON_RESPONSE_CLASS)
 app.include_router(auth_router)
 app.include_router(valuation_router)
 app.include_router(listings.router)
@@ -36,6 +76,9 @@ app.include_router(payments.router)
 app.include_router(orders.router)
 app.include_router(users.router)
 app.include_router(marketplace.router)
+app.include_router(classify.router)
+app.include_router(media.router)
+app.include_router(exports.router)
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 
 
@@ -48,47 +91,27 @@ def root():
 # ---------- load credentials from .env----------
 
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
-SMTP_HOST = os.getenv("SMTP_HOST")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USERNAME = os.getenv("SMTP_USERNAME")
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
-SMTP_FROM = os.getenv("SMTP_FROM", SMTP_USERNAME or "")
-
-
-MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "ewaste_db")
-MONGO_BOOKINGS_COLLECTION = os.getenv("MONGO_BOOKINGS_COLLECTION", "bookings")
-
-
-
-# ---------- Mongodb connection (local dev)----------
-uri_lower = MONGO_URI.lower()
-
-if "+srv" in uri_lower or "mongodb.net" in uri_lower:
-    mongo_client = AsyncIOMotorClient(
-        MONGO_URI,
-        tls=True,
-        tlsCAFile=certifi.where(),
-        serverSelectionTimeoutMS=10000
-    )
-else:
-    mongo_client = AsyncIOMotorClient(
-        MONGO_URI,
-        serverSelectionTimeoutMS=10000
-    )
-
-mongo_db = mongo_client[MONGO_DB_NAME]
-bookings_collection = mongo_db[MONGO_BOOKINGS_COLLECTION]
+# SMTP settings live in services/outbox.py
 
 
 # ---------- Middleware ----------
 
+# upload bodies are capped while they arrive, before multipart parsing
+app.add_middleware(
+    BodyLimitMiddleware,
+    limits={
+        "/classify": classify.MAX_REQUEST_BYTES,
+        "/classify/batch": classify.MAX_BATCH_REQUEST_BYTES,
+        "/valuation/estimate/batch/upload": VALUATION_MAX_UPLOAD_BYTES + classify.MULTIPART_OVERHEAD_BYTES,
+    },
+)
 app.add_middleware(
     CORSMiddleware,
       allow_origins=["http://localhost:5173", "http://localhost:3000", "*"],  # later you can change to [FRONTEND_URL]
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # listings pagination
 )
 
 # ---------- MODELS ----------
@@ -96,6 +119,7 @@ app.add_middleware(
 class BookingRequest(BaseModel):
     userId: str
     userEmail: str          
+    recycleItem: Optional[str] = None
     recycleItemPrice: float
     pickupDate: str         
     pickupTime: str        
@@ -105,26 +129,10 @@ class BookingRequest(BaseModel):
     phone: int
 
 
-# ---------- EMAIL CONFIG ----------
-
-SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
-SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
-SMTP_USERNAME = os.getenv("SMTP_USERNAME")  # your email / SMTP username
-SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")  # app password or SMTP password
-FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USERNAME or "no-reply@example.com")
-
-
-def send_booking_email(booking: BookingRequest):
-    """
-    Send booking confirmation email to the customer.
-    Runs in a background task so it won't block the API response.
-    """
-    if not (SMTP_USERNAME and SMTP_PASSWORD):
-        # For dev, just log instead of breaking the request
-        print("⚠ SMTP credentials not configured. Skipping email send.")
-        print("Booking details:", booking.model_dump())
-        return
+# ---------- EMAIL ----------
 
+def booking_email(booking: BookingRequest):
+    """Subject and body of the booking confirmation (delivered via the outbox)."""
     subject = f"E-Waste Pickup Booking Confirmation - {booking.pickupDate} {booking.pickupTime}"
 
     body = f"""Hi {booking.fullName},
@@ -133,7 +141,7 @@ Thank you for booking an e-waste pickup with E-Cycle.
 
 Here are your booking details:
 
-- Item: {booking.recycleItem}
+- Item: {booking.recycleItem or "E-waste item"}
 - Estimated price: ₹{booking.recycleItemPrice}
 - Pickup slot: {booking.pickupDate} at {booking.pickupTime}
 - Pickup address: {booking.address}
@@ -146,53 +154,35 @@ If any of the above details are incorrect, please reply to this email.
 Thank you for recycling responsibly 🌱
 E-Cycle Team
 """
-
-    msg = MIMEMultipart()
-    msg["Subject"] = subject
-    msg["From"] = FROM_EMAIL
-    msg["To"] = booking.userEmail
-    msg.attach(MIMEText(body, "plain"))
-
-    try:
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
-            server.sendmail(FROM_EMAIL, [booking.userEmail], msg.as_string())
-        print(f"✅ Booking confirmation email sent to {booking.userEmail}")
-    except Exception as e:
-        # Don't crash the app if email fails
-        print("❌ Error sending booking email:", e)
+    return subject, body
 
 
 # ---------- EXISTING ENDPOINTS ----------
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "model": model_provider.health(),
+        "classify_cache": result_cache.stats(),
+        "listing_cache": listing_cache.stats(),
+        "mongo": pool_stats.stats(),
+        "outbox": outbox.outbox_worker.stats(),
+        "pricing_tables": pricing_tables.stats(),
+        "valuation_memo": valuation_memo.stats(),
+        "passwords": password_hasher.stats(),
+        "auth_cache": auth_cache_stats(),
+        "serialization": serialization.stats(),
+        "search": search.stats(),
+        "booking_slots": booking_slots.stats(),
+    }
 
 
-# ----------- classify endpoint ------------
+# ----------- classify endpoint (see routes/classify.py) ------------
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-
-@app.post("/classify")
-async def classify(file: UploadFile = File(...)):
-    if IN_SERVER:
-        raise HTTPException(status_code=503, detail="AI model disabled in server deployment.")
-
-    contents = await file.read()
-    try:
-        result = await run_inference(contents)
-        return {
-            "predictions": result.get("predictions", []),
-            "category": result.get("category"),
-            "speed": f"{result.get('speed_ms', 0)}ms",
-        }
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
 """------- @app.post("/classify")
 async def classify(file: UploadFile = File(...)):
     if not file.content_type.startswith("image/"):
@@ -227,17 +217,46 @@ async def classify(file: UploadFile = File(...)):
 # ---------- NEW BOOKING ENDPOINT ----------
 
 @app.post("/api/v1/booking")
-async def create_booking(booking: BookingRequest, background_tasks: BackgroundTasks):
+async def create_booking(
+    booking: BookingRequest,
+    bookings_collection=Depends(collection(MONGO_BOOKINGS_COLLECTION)),
+):
     """
     Create a booking from the frontend, save it in MongoDB,
-    and send a confirmation email.
+    and queue a confirmation email. 409 when the pickup slot is full.
     """
+    try:
+        slot_date = booking_slots.parse_date(booking.pickupDate)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="pickupDate must be YYYY-MM-DD")
+    try:
+        slot_time = booking_slots.parse_slot(booking.pickupTime)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"pickupTime must be one of: {', '.join(booking_slots.BOOKING_SLOTS)}",
+        )
+    try:
+        facility = booking_slots.parse_facility(booking.facility)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Unknown facility")
+    # store (and confirm) the slot as it is counted
+    booking = booking.model_copy(update={"facility": facility, "pickupDate": slot_date, "pickupTime": slot_time})
+
+    # take a unit of the slot's capacity first (atomic, guarded)
+    try:
+        await booking_slots.reserve(facility, slot_date, slot_time)
+    except booking_slots.SlotFullError:
+        raise HTTPException(status_code=409, detail="This pickup slot is full, please pick another one")
 
     # Turn Pydantic model into a plain dict
     booking_doc = booking.model_dump()
 
-   
-    result = await bookings_collection.insert_one(booking_doc)
+    try:
+        result = await bookings_collection.insert_one(booking_doc)
+    except Exception:
+        await booking_slots.release(facility, slot_date, slot_time)
+        raise
     booking_id = str(result.inserted_id)
 
     # Motor has now added `_id: ObjectId(...)` into booking_doc
@@ -250,8 +269,13 @@ async def create_booking(booking: BookingRequest, background_tasks: BackgroundTa
 
     print(" New booking stored in Mongo:", booking_doc, " -> _id:", booking_id)
 
-    # Send email in background
-    background_tasks.add_task(send_booking_email, booking)
+    # Queue the confirmation; services/outbox.py delivers it in the background
+    subject, body = booking_email(booking)
+    try:
+        await outbox.enqueue(booking.userEmail, subject, body, kind="booking_confirmation")
+    except Exception as e:
+        # Don't fail the booking if the email can't be queued
+        print("❌ Error queueing booking email:", e)
 
     # Now everything in this object is JSON serializable
     return {
@@ -259,3 +283,32 @@ async def create_booking(booking: BookingRequest, background_tasks: BackgroundTa
         "bookingId": booking_id,
         "booking": booking_doc,
     }
+
+
+@app.get("/api/v1/booking/availability")
+async def booking_availability(
+    facility: str,
+    start: str = Query(..., description="first date, YYYY-MM-DD"),
+    end: Optional[str] = Query(None, description="last date (inclusive), defaults to start"),
+):
+    """Free capacity per pickup slot for each day in start..end (services/booking_slots.py)."""
+    try:
+        start = booking_slots.parse_date(start)
+        end = booking_slots.parse_date(end) if end else start
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    try:
+        facility = booking_slots.parse_facility(facility)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Unknown facility")
+    span = (date.fromisoformat(end) - date.fromisoformat(start)).days + 1
+    if span < 1:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if span > booking_slots.BOOKING_AVAILABILITY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {booking_slots.BOOKING_AVAILABILITY_MAX_DAYS} days per request",
+        )
+
+    days = await booking_slots.availability(facility, start, end)
+    return {"facility": facility, "days": days}
@@ -1,13 +1,17 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from passlib.context import CryptContext
 from bson import ObjectId
 from dotenv import load_dotenv
+import base64
+import hmac
 import os
 
-from database import users_collection
+from database import collection
+from utils.auth_cache import claims_cache, user_cache
+from utils.passwords import HasherBusyError, password_hasher
 
 router = APIRouter(prefix="/auth")
 
@@ -18,11 +22,21 @@ JWT_SECRET = os.getenv("JWT_SECRET", "super-secret")
 JWT_ALGO = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24
 
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+# Password hashing runs on a bounded bcrypt pool (utils/passwords.py).
+# When that pool is saturated we shed load instead of queueing forever.
+def _busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in attempts right now, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 
-def hash_password(password: str):
+async def hash_password(password: str):
     try:
-        return pwd_context.hash(password)
+        return await password_hasher.hash(password)
+    except HasherBusyError:
+        raise _busy()
     except ValueError as e:
         # bcrypt limitation or other hashing issues
         raise HTTPException(status_code=400, detail=str(e))
@@ -31,9 +45,12 @@ def hash_password(password: str):
         raise HTTPException(status_code=500, detail="Password hashing failed")
 
 
-
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+async def verify_password(plain, hashed):
+    """(valid, new_hash) - new_hash is set when the stored hash should be upgraded."""
+    try:
+        return await password_hasher.verify_and_update(plain, hashed)
+    except HasherBusyError:
+        raise _busy()
 
 def create_access_token(data: dict, expires: timedelta | None = None):
     to_encode = data.copy()
@@ -64,14 +81,131 @@ class TokenResponse(BaseModel):
     user: UserPublic
 
 
+# ----------- CURRENT USER (dependency) -----------
+# Decoded claims and the user projection are cached (utils/auth_cache.py),
+# so a repeat request with the same token costs two dict lookups.
+
+bearer_scheme = HTTPBearer(auto_error=False)
+USER_PROJECTION = {"fullName": 1, "email": 1, "phone": 1}
+
+
+def _unauthorized(detail: str = "Not authenticated"):
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def decode_token(token: str) -> dict:
+    """Validated claims of an access token. Raises 401."""
+    try:
+        segment = token.rsplit(".", 2)[2]
+        signature = base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+    except (IndexError, ValueError):
+        raise _unauthorized("Invalid token")
+
+    cached = claims_cache.get(signature)
+    # same signature but different header/payload is a forged token: verify it for real
+    if cached is not None and hmac.compare_digest(cached[0], token):
+        return cached[1]
+
+    try:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+    except JWTError:
+        raise _unauthorized("Invalid or expired token")
+    if not claims.get("sub"):
+        raise _unauthorized("Invalid token")
+
+    claims_cache.set(signature, (token, claims), deadline=claims.get("exp"))
+    return claims
+
+
+async def _load_user(sub: str, users_collection) -> UserPublic:
+    user = user_cache.get(sub)
+    if user is not None:
+        return user
+
+    try:
+        oid = ObjectId(sub)
+    except Exception:
+        raise _unauthorized("Invalid token")
+    doc = await users_collection.find_one({"_id": oid}, USER_PROJECTION)
+    if not doc:
+        raise _unauthorized("User no longer exists")
+
+    user = UserPublic(
+        id=sub,
+        fullName=doc.get("fullName") or "",
+        email=doc.get("email", ""),
+        phone=doc.get("phone") or "",
+    )
+    user_cache.set(sub, user)
+    return user
+
+
+async def current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    users_collection=Depends(collection("users")),
+) -> UserPublic:
+    """The user of the bearer token. Raises 401 without a valid token."""
+    if credentials is None:
+        raise _unauthorized()
+    claims = decode_token(credentials.credentials)
+    return await _load_user(claims["sub"], users_collection)
+
+
+async def optional_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Depends(bearer_scheme),
+    users_collection=Depends(collection("users")),
+) -> UserPublic | None:
+    """Like current_user, but None when no token was sent (an invalid token is still a 401)."""
+    if credentials is None:
+        return None
+    return await current_user(credentials, users_collection)
+
+
+# Read-only endpoints used to take the caller's email as a query parameter.
+# That identifies nobody, so it is accepted only while AUTH_ALLOW_LEGACY_EMAIL
+# is switched on for clients that don't send tokens yet; writes always need a token.
+AUTH_ALLOW_LEGACY_EMAIL = os.getenv("AUTH_ALLOW_LEGACY_EMAIL", "false").lower() == "true"
+
+
+def resolve_email(user: UserPublic | None, email: str | None) -> str:
+    """
+    Email of the caller: the token's user if there is one, else (only with
+    AUTH_ALLOW_LEGACY_EMAIL) the legacy ?email= parameter. Raises 401.
+    """
+    if user is not None:
+        return user.email
+    if email and AUTH_ALLOW_LEGACY_EMAIL:
+        return email
+    raise _unauthorized()
+
+
+# Admin-only endpoints (e.g. /exports): comma-separated emails in ADMIN_EMAILS
+ADMIN_EMAILS = {e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()}
+
+
+async def admin_user(user: UserPublic = Depends(current_user)) -> UserPublic:
+    """current_user, restricted to ADMIN_EMAILS. Raises 403 for everyone else."""
+    if user.email.lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admins only")
+    return user
+
+
+def auth_cache_stats() -> dict:
+    return {"claims": claims_cache.stats(), "users": user_cache.stats()}
+
+
 # ----------- SIGNUP -----------
 @router.post("/signup", response_model=TokenResponse)
-async def signup(user: UserCreate):
+async def signup(user: UserCreate, users_collection=Depends(collection("users"))):
     existing = await users_collection.find_one({"email": user.email.lower()})
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = hash_password(user.password)
+    hashed_pw = await hash_password(user.password)
 
     user_doc = {
         "fullName": user.fullName,
@@ -98,14 +232,23 @@ async def signup(user: UserCreate):
 
 # ----------- LOGIN -----------
 @router.post("/login", response_model=TokenResponse)
-async def login(data: UserLogin):
+async def login(data: UserLogin, users_collection=Depends(collection("users"))):
     user_doc = await users_collection.find_one({"email": data.email.lower()})
     if not user_doc:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
-    if not verify_password(data.password, user_doc["password_hash"]):
+    valid, new_hash = await verify_password(data.password, user_doc["password_hash"])
+    if not valid:
         raise HTTPException(status_code=400, detail="Invalid email or password")
 
+    if new_hash is not None:
+        # BCRYPT_ROUNDS changed since this hash was made: upgrade it in place.
+        # The filter skips the write if the password changed meanwhile.
+        await users_collection.update_one(
+            {"_id": user_doc["_id"], "password_hash": user_doc["password_hash"]},
+            {"$set": {"password_hash": new_hash}},
+        )
+
     user_id = str(user_doc["_id"])
     token = create_access_token({"sub": user_id})
 
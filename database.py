@@ -1,30 +1,187 @@
 # backend/database.py
+# The one MongoDB client of this process.
+#
+# create_client() builds it from env; constructing it does no I/O
+# (connect=False), so module-level collection handles like
+# models.listing_model.listings_collection stay valid. The app lifespan
+# opens it (open_client: ping + pool warm-up) and closes it on shutdown.
+# Routers get their collections through the `collection(name)` dependency.
+#
+# Pool sizing is per process, i.e. per uvicorn worker:
+#   MONGO_MAX_POOL_SIZE     max connections per server (pymongo default 100)
+#   MONGO_MIN_POOL_SIZE     connections kept open even when idle
+#   MONGO_MAX_IDLE_TIME_MS  close connections idle longer than this (0 = never)
+#   MONGO_COMPRESSORS       wire compression in preference order, e.g. "zstd,snappy,zlib"
+#   MONGO_READ_PREFERENCE   primary | primaryPreferred | secondary | secondaryPreferred | nearest
+# pool_stats (GET /health -> "mongo") shows how long requests wait for a
+# connection; a rising wait_p95_ms means the pool is too small for the load.
 import os
+import threading
+import time
+from collections import deque
+
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 
 # Read env
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/ewaste_db")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", None)
+MONGO_BOOKINGS_COLLECTION = os.getenv("MONGO_BOOKINGS_COLLECTION", "bookings")
+
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0"))
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+
+
+# ---------- connection pool metrics ----------
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool listener. pymongo calls it from its own threads; each
+    checkout starts and finishes on the same thread, so the start time is
+    kept thread-locally.
+    """
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._waits = deque(maxlen=window)  # recent checkout waits, seconds
+        self.checkouts = 0
+        self.checkout_failures = {}          # reason -> count
+        self.checked_out = 0
+        self.open_connections = 0
+        self.pools_cleared = 0
+        self._wait_max = 0.0
+
+    def _finish_wait(self, event) -> float:
+        # pymongo >= 4.7 measures it for us
+        duration = getattr(event, "duration", None)
+        if duration is None:
+            started = getattr(self._local, "started", None)
+            duration = time.perf_counter() - started if started is not None else 0.0
+        self._local.started = None
+        return duration
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait = self._finish_wait(event)
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self._waits.append(wait)
+            self._wait_max = max(self._wait_max, wait)
+
+    def connection_check_out_failed(self, event):
+        self._finish_wait(event)
+        reason = str(event.reason)
+        with self._lock:
+            self.checkout_failures[reason] = self.checkout_failures.get(reason, 0) + 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+
+        def pct(q):
+            return round(1000 * waits[min(len(waits) - 1, int(q * len(waits)))], 2) if waits else 0.0
+
+        return {
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "min_pool_size": MONGO_MIN_POOL_SIZE,
+            "open_connections": self.open_connections,
+            "checked_out": self.checked_out,
+            "checkouts": self.checkouts,
+            "checkout_failures": dict(self.checkout_failures),
+            "pools_cleared": self.pools_cleared,
+            # over the last len(waits) checkouts
+            "wait_p50_ms": pct(0.50),
+            "wait_p95_ms": pct(0.95),
+            "wait_max_ms": round(1000 * self._wait_max, 2),
+        }
+
+
+pool_stats = PoolStats()
 
-# Heuristic: enable TLS only for cloud/atlas SRV URIs or mongodb.net hosts.
-uri_lower = (MONGO_URI or "").lower()
-if "+srv" in uri_lower or "mongodb.net" in uri_lower:
-    # Cloud (Atlas) -> require TLS + certifi CA bundle
-    client = AsyncIOMotorClient(
-        MONGO_URI,
-        tls=True,
-        tlsCAFile=certifi.where(),
-        serverSelectionTimeoutMS=10000,
-    )
-    using_tls = True
-else:
-    # Local dev -> don't force TLS
-    client = AsyncIOMotorClient(
-        MONGO_URI,
-        serverSelectionTimeoutMS=10000,
-    )
-    using_tls = False
+
+# ---------- client factory ----------
+
+def _available_compressors(names: str) -> list:
+    """Requested compressors whose Python package is installed (zlib always is)."""
+    modules = {"zstd": "zstandard", "snappy": "snappy", "zlib": None}
+    available = []
+    for name in (n.strip().lower() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in modules:
+            print(f"⚠ [database] unknown compressor {name!r}, ignored")
+            continue
+        if modules[name]:
+            try:
+                __import__(modules[name])
+            except ImportError:
+                print(f"⚠ [database] compressor {name!r} needs the {modules[name]!r} package, ignored")
+                continue
+        available.append(name)
+    return available
+
+
+def create_client(uri: str = MONGO_URI) -> AsyncIOMotorClient:
+    options = {
+        "serverSelectionTimeoutMS": 10000,
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "readPreference": MONGO_READ_PREFERENCE,
+        "event_listeners": [pool_stats],
+        "appname": "ewaste-backend",
+        "connect": False,  # no sockets/threads until the lifespan opens it
+    }
+    if MONGO_MAX_IDLE_TIME_MS > 0:
+        options["maxIdleTimeMS"] = MONGO_MAX_IDLE_TIME_MS
+    compressors = _available_compressors(MONGO_COMPRESSORS)
+    if compressors:
+        options["compressors"] = ",".join(compressors)
+
+    # Heuristic: enable TLS only for cloud/atlas SRV URIs or mongodb.net hosts.
+    uri_lower = (uri or "").lower()
+    if "+srv" in uri_lower or "mongodb.net" in uri_lower:
+        # Cloud (Atlas) -> require TLS + certifi CA bundle
+        options.update(tls=True, tlsCAFile=certifi.where())
+    return AsyncIOMotorClient(uri, **options)
+
+
+client = create_client()
 
 # Choose DB
 if MONGO_DB_NAME:
@@ -38,6 +195,54 @@ else:
 
 # Collections exported for app
 users_collection = db["users"]
-bookings_collection = db["bookings"]
+bookings_collection = db[MONGO_BOOKINGS_COLLECTION]
+
+print(f"[database] MONGO_URI='{MONGO_URI[:60]}...' db='{db.name}' "
+      f"pool={MONGO_MIN_POOL_SIZE}-{MONGO_MAX_POOL_SIZE} read_preference={MONGO_READ_PREFERENCE}")
+
+
+# ---------- lifecycle (called from the app lifespan) ----------
+
+async def open_client():
+    """Connect now instead of on the first request; pymongo then keeps MONGO_MIN_POOL_SIZE connections open."""
+    try:
+        await client.admin.command("ping")
+        print("✅ [database] connected")
+    except Exception as e:
+        # same as before: requests will fail individually until Mongo is reachable
+        print("⚠ [database] ping failed:", e)
+
+
+def close_client():
+    client.close()
+
+
+# ---------- FastAPI dependencies ----------
+
+def get_db():
+    return db
+
+
+def collection(name: str):
+    """Dependency factory: `orders_collection=Depends(collection("orders"))`."""
+    def get_collection():
+        return db[name]
+    get_collection.__name__ = f"get_{name}_collection"
+    return get_collection
+
+
+# ---------- capability checks ----------
+
+_supports_transactions = None
+
 
-print(f"[database] MONGO_URI='{MONGO_URI[:60]}...' using_tls={using_tls} db='{db.name}'")
+async def supports_transactions() -> bool:
+    """Multi-document transactions need a replica set or a mongos (cached after first check)."""
+    global _supports_transactions
+    if _supports_transactions is None:
+        try:
+            hello = await client.admin.command("hello")
+            _supports_transactions = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except Exception:
+            _supports_transactions = False
+    return _supports_transactions
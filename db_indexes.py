@@ -0,0 +1,151 @@
+# backend/db_indexes.py
+"""
+Index registry: every Mongo index the app relies on, per collection.
+
+At startup `reconcile_indexes()` (run in the background from the app
+lifespan) builds whatever is missing. Existing indexes are never dropped
+automatically - use the report to decide that by hand:
+
+    python -m db_indexes            # report missing / unused indexes
+    python -m db_indexes --apply    # build missing ones, then report
+
+"Unused" comes from $indexStats, whose counters reset when mongod restarts,
+so check `since` before dropping anything.
+"""
+import argparse
+import asyncio
+
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+
+from database import db
+from models.listing_model import LISTING_INDEXES
+from services.booking_slots import SLOT_INDEX
+from services.search import SEARCH_TITLE_WEIGHT, TEXT_INDEX_NAME
+
+INDEXES = {
+    "users": [
+        # auth.signup/login and /users/me look users up by email
+        IndexModel([("email", ASCENDING)], unique=True, name="email_unique"),
+    ],
+    "listings": LISTING_INDEXES + [
+        # /marketplace/my-listings: find({owner_email}).sort(_id, -1)
+        IndexModel([("owner_email", ASCENDING), ("_id", DESCENDING)], name="owner_email_id"),
+        # /marketplace/search ($text over title + tags, see services/search.py)
+        IndexModel([("title", TEXT), ("tags", TEXT)], weights={"title": SEARCH_TITLE_WEIGHT, "tags": 1},
+                   default_language="english", name=TEXT_INDEX_NAME),
+    ],
+    "orders": [
+        # /orders/history: find({user_email}).sort(created_at, -1)
+        IndexModel([("user_email", ASCENDING), ("created_at", DESCENDING)], name="user_email_created_at"),
+        # /exports/orders without an owner: created_at range, oldest first
+        IndexModel([("created_at", ASCENDING)], name="created_at"),
+    ],
+    "reservations": [
+        # services.reservations.sweep_expired: held + expires_at < now
+        IndexModel([("status", ASCENDING), ("expires_at", ASCENDING)], name="status_expires_at"),
+        # finished reservations are removed RESERVATION_RETENTION_S after they end
+        IndexModel([("purge_at", ASCENDING)], expireAfterSeconds=0, name="purge_at_ttl"),
+    ],
+    "outbox": [
+        # services.outbox claims: pending + next_attempt_at <= now, oldest first
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        IndexModel([("claim", ASCENDING)], sparse=True, name="claim"),
+        # sent messages are removed OUTBOX_RETENTION_S after delivery
+        IndexModel([("purge_at", ASCENDING)], expireAfterSeconds=0, name="purge_at_ttl"),
+    ],
+    "pricing_tables": [
+        # services.pricing_tables: newest active version
+        IndexModel([("active", ASCENDING), ("activated_at", DESCENDING)], name="active_activated_at"),
+    ],
+    "booking_slots": [
+        # services.booking_slots (also built, and awaited, at startup)
+        SLOT_INDEX,
+    ],
+    "classify_cache": [
+        # Mongo's TTL monitor removes expired /classify results
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0, name="expires_at_ttl"),
+    ],
+}
+
+
+def _declared_names(collection: str) -> set:
+    return {index.document["name"] for index in INDEXES.get(collection, [])}
+
+
+async def missing_indexes(collection: str) -> list:
+    existing = await db[collection].index_information()
+    return [index for index in INDEXES[collection] if index.document["name"] not in existing]
+
+
+async def reconcile_indexes():
+    """Create every declared index that doesn't exist yet. Failures are logged, not raised."""
+    for collection in INDEXES:
+        try:
+            missing = await missing_indexes(collection)
+        except Exception as e:
+            print(f"⚠ [indexes] could not read indexes of {collection}:", e)
+            continue
+
+        for index in missing:
+            name = index.document["name"]
+            try:
+                # one at a time so a failing build (e.g. duplicate emails
+                # under a unique index) doesn't block the others
+                await db[collection].create_indexes([index])
+                print(f"✅ [indexes] built {collection}.{name}")
+            except Exception as e:
+                print(f"❌ [indexes] failed to build {collection}.{name}:", e)
+
+
+async def index_report() -> dict:
+    """
+    {collection: {"missing": [...], "unused": [...], "undeclared": [...]}}
+    unused     - declared or not, zero accesses since `since` per $indexStats
+    undeclared - present in Mongo but not in INDEXES
+    """
+    report = {}
+    collections = set(INDEXES) | set(await db.list_collection_names())
+    for collection in sorted(collections):
+        declared = _declared_names(collection)
+        existing = await db[collection].index_information()
+
+        stats = await db[collection].aggregate([{"$indexStats": {}}]).to_list(length=None)
+        unused = [
+            {"name": s["name"], "since": s["accesses"]["since"]}
+            for s in stats
+            if s["name"] != "_id_" and s["accesses"]["ops"] == 0
+        ]
+
+        report[collection] = {
+            "missing": sorted(declared - set(existing)),
+            "unused": unused,
+            "undeclared": sorted(set(existing) - declared - {"_id_"}),
+        }
+    return report
+
+
+def _print_report(report: dict):
+    for collection, info in report.items():
+        if not (info["missing"] or info["unused"] or info["undeclared"]):
+            print(f"{collection}: ok")
+            continue
+        print(f"{collection}:")
+        for name in info["missing"]:
+            print(f"  missing     {name}")
+        for entry in info["unused"]:
+            print(f"  unused      {entry['name']} (no ops since {entry['since']})")
+        for name in info["undeclared"]:
+            print(f"  undeclared  {name}")
+
+
+async def _main(apply: bool):
+    if apply:
+        await reconcile_indexes()
+    _print_report(await index_report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report (and optionally build) Mongo indexes.")
+    parser.add_argument("--apply", action="store_true", help="build missing indexes first")
+    args = parser.parse_args()
+    asyncio.run(_main(args.apply))
@@ -1,4 +1,6 @@
+from typing import Optional
 from pydantic import BaseModel
+from pymongo import ASCENDING, IndexModel
 from database import db  # keep your existing import
 
 # Pydantic model used for responses
@@ -6,7 +8,9 @@ class Listing(BaseModel):
     id: str
     title: str
     price: float
+    # may point at a specific size: /media/<sha256>/{original|medium|thumb}
     image_url: str
+    thumbnail_url: Optional[str] = None
     category: str
     condition: str
     short_description: str
@@ -18,3 +22,34 @@ class Listing(BaseModel):
 
 # Mongo collection handle
 listings_collection = db["listings"]
+
+# Only the fields a Listing response needs (see listing_entity in routes/listings.py)
+LISTING_PROJECTION = {
+    "title": 1,
+    "price": 1,
+    "image_url": 1,
+    "category": 1,
+    "condition": 1,
+    "short_description": 1,
+    "stock": 1,
+}
+
+# Compound indexes behind the /marketplace/listings filters (built by
+# db_indexes.py). Equality fields come first and _id last, so each filter
+# combination is an index range already in keyset (_id) order - no
+# in-memory sort, no collection scan.
+LISTING_INDEXES = [
+    IndexModel([("category", ASCENDING), ("_id", ASCENDING)], name="category_id"),
+    IndexModel([("category", ASCENDING), ("condition", ASCENDING), ("_id", ASCENDING)],
+               name="category_condition_id"),
+    IndexModel([("condition", ASCENDING), ("_id", ASCENDING)], name="condition_id"),
+    # min/max_price and in_stock are ranges, so an index can't hand them back
+    # in _id order. With these the planner can scan just the matching range
+    # and keep a top-(limit+1) sort, instead of walking _id and filtering
+    # every listing; it picks whichever is cheaper for the query's selectivity.
+    IndexModel([("price", ASCENDING), ("_id", ASCENDING)], name="price_id"),
+    IndexModel([("category", ASCENDING), ("price", ASCENDING), ("_id", ASCENDING)],
+               name="category_price_id"),
+    IndexModel([("stock", ASCENDING), ("_id", ASCENDING)], name="stock_id"),
+]
+
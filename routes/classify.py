@@ -0,0 +1,239 @@
+# backend/routes/classify.py
+import asyncio
+import io
+import json
+import os
+import zipfile
+from typing import List
+
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import StreamingResponse
+
+from utils.batching import QueueFullError
+from utils.model_provider import model_provider, model_version, ModelDisabledError
+from utils.result_cache import result_cache, make_key
+from utils import image_store
+from utils.image_io import (
+    read_upload_limited,
+    sniff_image_type,
+    ImageTooLargeError,
+    UnsupportedImageError,
+    MAX_UPLOAD_BYTES,
+)
+
+router = APIRouter(prefix="/classify", tags=["classify"])
+
+CLASSIFY_CONF_THRESH = 0.25
+CLASSIFY_TOP_K = 6
+
+# /classify/batch limits
+MAX_BATCH_IMAGES = int(os.getenv("MAX_BATCH_IMAGES", "50"))
+MAX_BATCH_ZIP_BYTES = int(os.getenv("MAX_BATCH_ZIP_BYTES", str(200 * 1024 * 1024)))
+# images of one batch request in flight at a time, so a single batch can't
+# fill the shared inference queue (INFERENCE_QUEUE_DEPTH) on its own
+CLASSIFY_BATCH_CONCURRENCY = max(1, int(os.getenv("CLASSIFY_BATCH_CONCURRENCY", "8")))
+
+# whole-request caps (multipart framing allowance on top of the file limits)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+MAX_REQUEST_BYTES = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES
+MAX_BATCH_REQUEST_BYTES = (
+    max(MAX_BATCH_ZIP_BYTES, MAX_BATCH_IMAGES * MAX_UPLOAD_BYTES)
+    + MAX_BATCH_IMAGES * MULTIPART_OVERHEAD_BYTES
+)
+
+
+def _ensure_enabled():
+    if model_provider.mode == "disabled":
+        raise HTTPException(status_code=503, detail="AI model disabled in server deployment.")
+
+
+async def classify_bytes(contents: bytes) -> dict:
+    """
+    Classify one image through the result cache and the model provider,
+    and persist the upload in the image store (deduplicated by content).
+    Shared by /classify and /classify/batch; errors propagate to the caller.
+    """
+    # store the upload while the model works; same bytes -> same image_id
+    store_task = asyncio.create_task(image_store.put(contents))
+
+    try:
+        # identical bytes + settings + weights -> identical answer, skip the model
+        cache_key = make_key(contents, CLASSIFY_CONF_THRESH, CLASSIFY_TOP_K, model_version())
+        cached = await result_cache.get(cache_key)
+        if cached is not None:
+            response = {
+                "predictions": cached["predictions"],
+                "category": cached["category"],
+                "speed": "0ms",
+                "queue_ms": 0,
+                "compute_ms": 0,
+                "cached": True,
+            }
+        else:
+            result = await model_provider.run_inference(
+                contents, conf_thresh=CLASSIFY_CONF_THRESH, top_k=CLASSIFY_TOP_K
+            )
+            await result_cache.set(cache_key, {
+                "predictions": result.get("predictions", []),
+                "category": result.get("category"),
+            })
+            response = {
+                "predictions": result.get("predictions", []),
+                "category": result.get("category"),
+                "speed": f"{result.get('speed_ms', 0)}ms",
+                "queue_ms": result.get("queue_ms", 0),
+                "compute_ms": result.get("compute_ms", 0),
+                "cached": False,
+            }
+    except BaseException:
+        store_task.cancel()
+        raise
+
+    try:
+        image_id = await store_task
+    except Exception as e:
+        # the classification is still good; just don't hand out a URL
+        print("⚠ Could not store classified image:", e)
+        return response
+
+    response["image_id"] = image_id
+    response["image_url"] = image_store.variant_url(image_id, "original")
+    response["thumbnail_url"] = image_store.variant_url(image_id, "thumb")
+    return response
+
+
+# ---------- single image ----------
+
+@router.post("")
+async def classify(file: UploadFile = File(...)):
+    # the request body itself is capped at MAX_REQUEST_BYTES while it
+    # arrives (utils/body_limit.py, registered in app.py)
+    _ensure_enabled()
+
+    try:
+        contents = await read_upload_limited(file)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageError as e:
+        raise HTTPException(status_code=415, detail=str(e))
+
+    try:
+        return await classify_bytes(contents)
+    except ModelDisabledError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except QueueFullError:
+        # shed load instead of letting the backlog grow without bound
+        raise HTTPException(status_code=503, detail="Classifier busy, please retry shortly.")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# ---------- batch (many files or one zip) ----------
+
+def _images_from_zip(data: bytes):
+    """Return [(filename, bytes, error)] for the image entries of a zip archive."""
+    images = []
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        for info in zf.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or os.path.basename(name).startswith("."):
+                continue
+            if len(images) >= MAX_BATCH_IMAGES:
+                raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images per batch.")
+            # check the declared size before inflating anything (zip bombs)
+            if info.file_size > MAX_UPLOAD_BYTES:
+                images.append((name, None, (413, "Image too large.")))
+                continue
+            with zf.open(info) as f:
+                head = f.read(16)
+                if sniff_image_type(head) is None:
+                    continue
+                images.append((name, head + f.read(MAX_UPLOAD_BYTES), None))
+    return images
+
+
+async def _collect_batch(files: List[UploadFile]):
+    """
+    Read every upload (bounded) into [(filename, bytes, error)], where
+    error is a (status, message) pair for uploads that can't be classified.
+    A single zip upload is expanded into its images.
+    """
+    if len(files) == 1:
+        f = files[0]
+        head = await f.read(4)
+        await f.seek(0)
+        if head == b"PK\x03\x04":
+            try:
+                data = await read_upload_limited(f, MAX_BATCH_ZIP_BYTES, check_image=False)
+            except ImageTooLargeError:
+                raise HTTPException(status_code=413, detail="Zip archive too large.")
+            try:
+                return await asyncio.to_thread(_images_from_zip, data)
+            except zipfile.BadZipFile:
+                raise HTTPException(status_code=400, detail="Invalid zip archive.")
+
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_IMAGES} images per batch.")
+
+    items = []
+    for f in files:
+        try:
+            items.append((f.filename, await read_upload_limited(f), None))
+        except ImageTooLargeError as e:
+            items.append((f.filename, None, (413, str(e))))
+        except UnsupportedImageError as e:
+            items.append((f.filename, None, (415, str(e))))
+    return items
+
+
+@router.post("/batch")
+async def classify_batch(files: List[UploadFile] = File(...)):
+    """
+    Classify many images in one request, streamed back as NDJSON.
+
+    Accepts several `files` parts, or a single zip archive of images. Up to
+    CLASSIFY_BATCH_CONCURRENCY images are with the model at once, enough for
+    the batching queue to pack them into full predict calls while leaving
+    room for other requests. Each line is written as soon as its image is
+    done (not in upload order), and carries `index` and `filename` so the
+    client can match it up. A final `{"done": true, ...}` line closes the stream.
+    """
+    _ensure_enabled()
+    items = await _collect_batch(files)
+    if not items:
+        raise HTTPException(status_code=400, detail="No images found in upload.")
+
+    in_flight = asyncio.Semaphore(CLASSIFY_BATCH_CONCURRENCY)
+
+    async def _one(index: int, filename: str, body, error):
+        line = {"index": index, "filename": filename}
+        if error is not None:
+            line.update({"status": error[0], "error": error[1]})
+            return line
+        try:
+            async with in_flight:
+                line.update(await classify_bytes(body))
+            line["status"] = 200
+        except QueueFullError:
+            line.update({"status": 503, "error": "Classifier busy, please retry shortly."})
+        except ModelDisabledError as e:
+            line.update({"status": 503, "error": str(e)})
+        except Exception as e:
+            line.update({"status": 500, "error": str(e)})
+        return line
+
+    async def _stream():
+        tasks = [asyncio.create_task(_one(i, *item)) for i, item in enumerate(items)]
+        failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                line = await next_done
+                failed += line["status"] != 200
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"done": True, "count": len(items), "failed": failed}) + "\n"
+        finally:
+            # client went away mid-stream: don't keep the model busy for nobody
+            for t in tasks:
+                t.cancel()
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
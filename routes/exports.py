@@ -0,0 +1,188 @@
+# backend/routes/exports.py
+"""
+Streaming exports for admin reporting (admins only, see auth.admin_user):
+
+    GET /exports/orders?format=ndjson|csv&start=&end=&status=&owner=
+    GET /exports/listings?format=ndjson|csv&start=&end=&status=available|sold_out&owner=
+
+start/end bound created_at (listings: the _id timestamp), end exclusive.
+owner is the buyer's email for orders, the seller's for listings.
+
+Documents come off the Motor cursor EXPORT_BATCH_SIZE per round trip and
+each batch is written out before the next is read, so memory stays flat
+however many documents match. When the client disconnects the cursor is
+closed right away instead of idling on the server until it times out.
+NDJSON output ends with a `{"done": true, "count": ...}` line.
+"""
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Literal, Optional
+
+import anyio
+from bson import ObjectId
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
+
+from auth import UserPublic, admin_user
+from database import collection
+from routes.marketplace import listing_entity
+from routes.orders import order_entity
+from utils.serialization import dumps
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+ORDER_COLUMNS = ["id", "user_email", "status", "total_amount", "created_at", "item_count", "items"]
+LISTING_COLUMNS = [
+    "id", "title", "price", "condition", "stock", "category", "image_url",
+    "thumbnail_url", "tags", "owner_email", "created_at",
+]
+LISTING_EXPORT_PROJECTION = {
+    "title": 1, "price": 1, "condition": 1, "stock": 1, "category": 1,
+    "image_url": 1, "tags": 1, "owner_email": 1,
+}
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+
+def _range(start: Optional[datetime], end: Optional[datetime], to_bound=lambda d: d) -> dict:
+    bounds = {}
+    if start is not None:
+        bounds["$gte"] = to_bound(start)
+    if end is not None:
+        bounds["$lt"] = to_bound(end)
+    return bounds
+
+
+def _order_csv(row: dict) -> list:
+    created_at = row["created_at"]
+    return [
+        row["id"], row["user_email"], row["status"], row["total_amount"],
+        created_at.isoformat() if created_at else "", len(row["items"]),
+        json.dumps(row["items"], default=str),
+    ]
+
+
+def _listing_row(doc) -> dict:
+    row = listing_entity(doc)
+    row["created_at"] = doc["_id"].generation_time
+    return row
+
+
+def _listing_csv(row: dict) -> list:
+    return [
+        row["id"], row["title"], row["price"], row["condition"], row["stock"],
+        row["category"], row["image_url"], row["thumbnail_url"],
+        ";".join(row["tags"] or []), row["owner_email"] or "", row["created_at"].isoformat(),
+    ]
+
+
+def _stream(request: Request, cursor, fmt: str, to_row, to_csv, columns: list, filename: str):
+    def _csv(rows, header=False) -> str:
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        if header:
+            writer.writerow(columns)
+        writer.writerows(to_csv(row) for row in rows)
+        return buf.getvalue()
+
+    def _chunk(rows):
+        if fmt == "csv":
+            return _csv(rows)
+        return b"".join(dumps(row) + b"\n" for row in rows)
+
+    async def _export():
+        count = 0
+        try:
+            if fmt == "csv":
+                yield _csv([], header=True)
+            batch = []
+            async for doc in cursor:
+                batch.append(to_row(doc))
+                if len(batch) < EXPORT_BATCH_SIZE:
+                    continue
+                yield _chunk(batch)
+                count += len(batch)
+                batch = []
+                if await request.is_disconnected():
+                    return
+            if batch:
+                yield _chunk(batch)
+                count += len(batch)
+            if fmt == "ndjson":
+                yield dumps({"done": True, "count": count}) + b"\n"
+        finally:
+            # client gone (or export done): free the server-side cursor now.
+            # On a disconnect Starlette cancels this task; shield the close
+            # so that cancellation doesn't abort it too
+            with anyio.CancelScope(shield=True):
+                await cursor.close()
+
+    media_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+@router.get("/orders")
+async def export_orders(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start: Optional[datetime] = Query(None, description="created_at >= start"),
+    end: Optional[datetime] = Query(None, description="created_at < end"),
+    status: Optional[str] = None,
+    owner: Optional[str] = Query(None, description="buyer email"),
+    admin: UserPublic = Depends(admin_user),
+    orders_collection=Depends(collection("orders")),
+):
+    """Every matching order, oldest first."""
+    query = {}
+    created_at = _range(start, end)
+    if created_at:
+        query["created_at"] = created_at
+    if status:
+        query["status"] = status
+    if owner:
+        query["user_email"] = owner
+
+    cursor = (
+        orders_collection.find(query)
+        .sort("created_at", 1)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    return _stream(request, cursor, format, order_entity, _order_csv, ORDER_COLUMNS, "orders")
+
+
+@router.get("/listings")
+async def export_listings(
+    request: Request,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    start: Optional[datetime] = Query(None, description="created (from _id) >= start"),
+    end: Optional[datetime] = Query(None, description="created (from _id) < end"),
+    status: Optional[Literal["available", "sold_out"]] = None,
+    owner: Optional[str] = Query(None, description="seller email"),
+    admin: UserPublic = Depends(admin_user),
+    listings_collection=Depends(collection("listings")),
+):
+    """Every matching listing, oldest first."""
+    query = {}
+    created = _range(start, end, ObjectId.from_datetime)
+    if created:
+        query["_id"] = created
+    if status == "available":
+        query["stock"] = {"$gt": 0}
+    elif status == "sold_out":
+        query["stock"] = {"$lte": 0}
+    if owner:
+        query["owner_email"] = owner
+
+    cursor = (
+        listings_collection.find(query, LISTING_EXPORT_PROJECTION)
+        .sort("_id", 1)
+        .batch_size(EXPORT_BATCH_SIZE)
+    )
+    return _stream(request, cursor, format, _listing_row, _listing_csv, LISTING_COLUMNS, "listings")
@@ -1,8 +1,13 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
 from bson import ObjectId
 
-from models.listing_model import listings_collection, Listing
+from database import collection
+from models.listing_model import Listing, LISTING_PROJECTION
+from utils.image_store import variant_url_for
+from utils.listing_cache import listing_cache
+from utils.serialization import trusted
 
 router = APIRouter(prefix="/marketplace", tags=["marketplace"])
 
@@ -14,6 +19,7 @@ def listing_entity(doc) -> dict:
         "title": doc.get("title", ""),
         "price": float(doc.get("price", 0)),
         "image_url": doc.get("image_url", ""),
+        "thumbnail_url": variant_url_for(doc.get("image_url", ""), "thumb"),
         "category": doc.get("category", ""),
         "condition": doc.get("condition", ""),
         "short_description": doc.get("short_description", ""),
@@ -21,25 +27,105 @@ def listing_entity(doc) -> dict:
     }
 
 
+def encode_cursor(oid: ObjectId) -> str:
+    return base64.urlsafe_b64encode(oid.binary).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def listings_filter(category=None, condition=None, min_price=None, max_price=None, in_stock=None) -> dict:
+    query = {}
+    if category:
+        query["category"] = category
+    if condition:
+        query["condition"] = condition
+    if min_price is not None or max_price is not None:
+        query["price"] = {}
+        if min_price is not None:
+            query["price"]["$gte"] = min_price
+        if max_price is not None:
+            query["price"]["$lte"] = max_price
+    if in_stock:
+        query["stock"] = {"$gt": 0}
+    return query
+
+
 @router.get("/listings", response_model=List[Listing])
-async def get_listings():
-    cursor = listings_collection.find({})
-    docs = await cursor.to_list(length=100)  # if using Motor (async)
-    # If using sync PyMongo, use: docs = list(cursor)
-    return [listing_entity(doc) for doc in docs]
+async def get_listings(
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    category: Optional[str] = None,
+    condition: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    listings_collection=Depends(collection("listings")),
+):
+    """
+    One page of listings in _id order (keyset pagination).
+    When more results exist the opaque cursor for the next page is returned
+    in the `X-Next-Cursor` header; pass it back as `cursor`.
+    """
+    query = listings_filter(category, condition, min_price, max_price, in_stock)
+
+    # the unfiltered feed is what almost everyone sees: serve it from cache
+    default_feed = not query
+    if default_feed:
+        page = listing_cache.get_page(cursor, limit)
+        if page is not None:
+            items, next_cursor = page
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+            return trusted(items)
+
+    if cursor:
+        query["_id"] = {"$gt": decode_cursor(cursor)}
+    token = listing_cache.token()
+
+    # one extra doc tells us whether there is a next page
+    docs = await (
+        listings_collection.find(query, LISTING_PROJECTION)
+        .sort("_id", 1)
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(docs[-1]["_id"])
+        response.headers["X-Next-Cursor"] = next_cursor
+
+    items = [listing_entity(doc) for doc in docs]
+    if default_feed:
+        listing_cache.put_page(cursor, limit, (items, next_cursor), next_cursor, token)
+    return trusted(items)
 
 
 @router.get("/listings/{listing_id}", response_model=Listing)
-async def get_listing(listing_id: str):
+async def get_listing(listing_id: str, listings_collection=Depends(collection("listings"))):
     try:
         oid = ObjectId(listing_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid listing id")
 
-    doc = await listings_collection.find_one({"_id": oid})
+    cached = listing_cache.get(oid)
+    if cached is not None:
+        return cached
+
+    token = listing_cache.token()
+    doc = await listings_collection.find_one({"_id": oid}, LISTING_PROJECTION)
     # If sync: doc = listings_collection.find_one({"_id": oid})
 
     if not doc:
         raise HTTPException(status_code=404, detail="Listing not found")
 
-    return listing_entity(doc)
+    item = listing_entity(doc)
+    listing_cache.put(oid, item, token)
+    return item
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Depends
 from bson import ObjectId, errors
 from typing import Optional, List
 from pydantic import BaseModel
-from database import db
+from auth import UserPublic, current_user, optional_current_user, resolve_email
+from database import collection
+from utils.image_store import variant_url_for
+from utils.listing_cache import listing_cache
+from utils.serialization import trusted
+from services import search
 
 router = APIRouter(prefix="/marketplace", tags=["Marketplace"])
-listings_collection = db["listings"]
 
 class ListingSchema(BaseModel):
     title: str
@@ -13,6 +17,7 @@ class ListingSchema(BaseModel):
     condition: str = "Good"
     stock: int = 1
     category: str = "reusable"
+    # /media/<sha256>/<variant> URLs (from /classify) or any other image URL
     image_url: str
     tags: list[str] = []
     owner_email: Optional[str] = None
@@ -26,6 +31,7 @@ def listing_entity(doc):
         "stock": doc.get("stock"),
         "category": doc.get("category"),
         "image_url": doc.get("image_url"),
+        "thumbnail_url": variant_url_for(doc.get("image_url"), "thumb"),
         "tags": doc.get("tags", []),
         "owner_email": doc.get("owner_email"),
     }
@@ -33,24 +39,64 @@ def listing_entity(doc):
 # ---------- Listings on marketplace ----------
 
 @router.post("/listings")
-async def create_listing(listing: ListingSchema):
-    res = await listings_collection.insert_one(listing.dict())
+async def create_listing(listing: ListingSchema, listings_collection=Depends(collection("listings"))):
+    doc = listing.dict()
+    res = await listings_collection.insert_one(doc)
+    listing_cache.invalidate(res.inserted_id)
+    search.index_listing(doc)
     return {"id": str(res.inserted_id)}
 
+# ---------- Search ----------
+
+@router.get("/search")
+async def search_listings(
+    q: Optional[str] = Query(None, max_length=200, description="words to look for in title and tags"),
+    category: Optional[str] = None,
+    condition: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    listings_collection=Depends(collection("listings")),
+):
+    """
+    Listings matching any word of `q` (title weighs more than tags), best
+    match first; without `q`, newest first. `facets` counts every match by
+    category, condition and price bucket, with the filters applied.
+    """
+    filters = {"category": category, "condition": condition, "min_price": min_price, "max_price": max_price}
+    docs, total, facets, backend = await search.search(listings_collection, q, filters, limit, offset)
+    results = []
+    for doc in docs:
+        item = listing_entity(doc)
+        item["score"] = doc.get("score")
+        results.append(item)
+    return {"total": total, "results": results, "facets": facets, "backend": backend}
+
 # ----------  My Listings in profile ----------
 
 @router.get("/my-listings")
-async def get_my_listings(owner_email: str = Query(...)):
+async def get_my_listings(
+    owner_email: Optional[str] = Query(None, description="legacy, needs AUTH_ALLOW_LEGACY_EMAIL: used only without a bearer token"),
+    caller: Optional[UserPublic] = Depends(optional_current_user),
+    listings_collection=Depends(collection("listings")),
+):
+    owner_email = resolve_email(caller, owner_email)
     cursor = listings_collection.find({"owner_email": owner_email}).sort("_id", -1)
     docs = await cursor.to_list(length=100)
     if not docs:
         return []  # return empty list, not 404
-    return [listing_entity(doc) for doc in docs]
+    return trusted([listing_entity(doc) for doc in docs])
 
 # ---------- For deleting  listing (only if owned by the user) ----------
 
 @router.delete("/listings/{listing_id}")
-async def delete_listing(listing_id: str, owner_email: str = Query(...)):
+async def delete_listing(
+    listing_id: str,
+    caller: UserPublic = Depends(current_user),
+    listings_collection=Depends(collection("listings")),
+):
+    owner_email = caller.email
     try:
         oid = ObjectId(listing_id)
     except errors.InvalidId:
@@ -65,5 +111,7 @@ async def delete_listing(listing_id: str, owner_email: str = Query(...)):
             status_code=404,
             detail="Listing not found or you are not allowed to delete it",
         )
+    listing_cache.invalidate(oid)
+    search.remove_listing(oid)
 
     return {"success": True}
@@ -0,0 +1,46 @@
+# backend/routes/media.py
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+
+from utils import image_store
+
+router = APIRouter(prefix="/media", tags=["media"])
+
+# content at a /media URL never changes, so clients and CDNs may keep it forever
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+_MEDIA_TYPES = {
+    "jpg": "image/jpeg",
+    "png": "image/png",
+    "webp": "image/webp",
+    "gif": "image/gif",
+    "bmp": "image/bmp",
+    "tiff": "image/tiff",
+}
+
+
+@router.get("/{digest}/{variant}")
+async def get_media(digest: str, variant: str, request: Request):
+    """
+    Serve a stored image: `original`, or a resized WebP (`thumb`, `medium`).
+    """
+    # before the ETag check: a deleted or never-stored image is a 404, not a 304
+    if not image_store.exists(digest, variant):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    etag = f'"{digest}-{variant}"'
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    try:
+        path = await image_store.get_path(digest, variant)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Could not render image variant")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    ext = path.rsplit(".", 1)[-1]
+    return FileResponse(path, media_type=_MEDIA_TYPES.get(ext, "application/octet-stream"), headers=headers)
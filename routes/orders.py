@@ -1,16 +1,16 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 from typing import List
 from bson import ObjectId
 from datetime import datetime
 
-from models.listing_model import listings_collection
-from database import db
+from auth import UserPublic, optional_current_user, resolve_email
+from database import collection
+from services import reservations
+from utils.serialization import trusted
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
-orders_collection = db["orders"]
-
 
 class CartItem(BaseModel):
     listing_id: str
@@ -42,32 +42,53 @@ def order_entity(doc) -> dict:
     }
 
 
+def merge_cart(items: List[CartItem]) -> dict:
+    """{ObjectId: total quantity}, duplicates merged, cart order kept."""
+    merged = {}
+    for cart_item in items:
+        try:
+            listing_oid = ObjectId(cart_item.listing_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid listing id")
+        if cart_item.quantity <= 0:
+            raise HTTPException(status_code=400, detail="Quantity must be at least 1")
+        merged[listing_oid] = merged.get(listing_oid, 0) + cart_item.quantity
+    return merged
+
+
 @router.post("/create", response_model=OrderResponse)
-async def create_order(payload: CreateOrderRequest):
+async def create_order(
+    payload: CreateOrderRequest,
+    listings_collection=Depends(collection("listings")),
+    orders_collection=Depends(collection("orders")),
+):
     if not payload.items:
         raise HTTPException(status_code=400, detail="Cart is empty")
 
+    quantities = merge_cart(payload.items)
+
+    # one round trip for every listing in the cart
+    cursor = listings_collection.find(
+        {"_id": {"$in": list(quantities)}}, {"title": 1, "price": 1, "stock": 1}
+    )
+    listings = {doc["_id"]: doc for doc in await cursor.to_list(length=len(quantities))}
+
     order_items = []
     total_amount = 0.0
 
-    for cart_item in payload.items:
-        try:
-            listing_oid = ObjectId(cart_item.listing_id)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid listing id")
-
-        listing = await listings_collection.find_one({"_id": listing_oid})
+    for listing_oid, quantity in quantities.items():
+        listing = listings.get(listing_oid)
         if not listing:
             raise HTTPException(status_code=404, detail="Listing not found")
 
-        if listing.get("stock", 0) < cart_item.quantity:
+        if listing.get("stock", 0) < quantity:
             raise HTTPException(
                 status_code=400,
                 detail=f"Not enough stock for {listing.get('title', 'item')}",
             )
 
         price = float(listing["price"])
-        subtotal = price * cart_item.quantity
+        subtotal = price * quantity
         total_amount += subtotal
 
         order_items.append(
@@ -75,7 +96,7 @@ async def create_order(payload: CreateOrderRequest):
                 "listing_id": str(listing["_id"]),
                 "title": listing.get("title", ""),
                 "price": price,
-                "quantity": cart_item.quantity,
+                "quantity": quantity,
                 "subtotal": subtotal,
             }
         )
@@ -88,19 +109,37 @@ async def create_order(payload: CreateOrderRequest):
         "created_at": datetime.utcnow(),
     }
 
-    res = await orders_collection.insert_one(order_doc)
+    # take the stock first (guarded, all-or-nothing), then record the order
+    try:
+        reservation_id = await reservations.hold(quantities, owner=payload.user_email)
+    except reservations.OutOfStockError as e:
+        title = listings.get(e.listing_id, {}).get("title", "item")
+        raise HTTPException(status_code=400, detail=f"Not enough stock for {title}")
+
+    order_doc["reservation_id"] = reservation_id
+    try:
+        res = await orders_collection.insert_one(order_doc)
+        await reservations.commit(reservation_id)
+    except Exception as e:
+        await reservations.release(reservation_id)
+        if "_id" in order_doc:
+            await orders_collection.delete_one({"_id": order_doc["_id"]})
+        if isinstance(e, reservations.ReservationError):
+            # the hold expired (stock already returned) before we could commit
+            raise HTTPException(status_code=409, detail="Reservation expired, please retry checkout")
+        raise
+
     order_doc["_id"] = res.inserted_id
+    return order_entity(order_doc)
 
-    # decrease stock
-    for item in order_items:
-        await listings_collection.update_one(
-            {"_id": ObjectId(item["listing_id"])},
-            {"$inc": {"stock": -item["quantity"]}},
-        )
 
-    return order_entity(order_doc)
 @router.get("/history", response_model=List[OrderResponse])
-async def get_order_history(user_email: str = Query(...)):
+async def get_order_history(
+    user_email: str | None = Query(None, description="legacy, needs AUTH_ALLOW_LEGACY_EMAIL: used only without a bearer token"),
+    caller: UserPublic | None = Depends(optional_current_user),
+    orders_collection=Depends(collection("orders")),
+):
+    user_email = resolve_email(caller, user_email)
     cursor = orders_collection.find({"user_email": user_email}).sort("created_at", -1)
     docs = await cursor.to_list(length=100)
-    return [order_entity(doc) for doc in docs]
\ No newline at end of file
+    return trusted([order_entity(doc) for doc in docs])
\ No newline at end of file
@@ -1,12 +1,10 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from bson import ObjectId
 from datetime import datetime
 
-from models.listing_model import listings_collection
-from database import db
-
-orders_collection = db["orders"]
+from database import collection
+from services import reservations
 
 router = APIRouter(prefix="/payments", tags=["payments"])
 
@@ -23,7 +21,11 @@ class CreateOrderResponse(BaseModel):
 
 
 @router.post("/create-order", response_model=CreateOrderResponse)
-async def create_order(data: CreateOrderRequest):
+async def create_order(
+    data: CreateOrderRequest,
+    listings_collection=Depends(collection("listings")),
+    orders_collection=Depends(collection("orders")),
+):
     try:
         oid = ObjectId(data.listing_id)
     except Exception:
@@ -38,6 +40,12 @@ async def create_order(data: CreateOrderRequest):
     if listing.get("stock", 0) <= 0:
         raise HTTPException(status_code=400, detail="Item out of stock")
 
+    # take 1 unit atomically; the check above is only a fast path
+    try:
+        reservation_id = await reservations.hold({listing["_id"]: 1}, owner=data.user_email)
+    except reservations.OutOfStockError:
+        raise HTTPException(status_code=400, detail="Item out of stock")
+
     amount = float(listing["price"])
 
     # simple order dict, no Pydantic model
@@ -46,18 +54,23 @@ async def create_order(data: CreateOrderRequest):
         "amount": amount,
         "user_email": data.user_email,
         "payment_status": "paid",  # simulate success
+        "reservation_id": reservation_id,
         "created_at": datetime.utcnow(),
     }
 
-    res = await orders_collection.insert_one(order_doc)
-    # If sync: res = orders_collection.insert_one(order_doc)
+    try:
+        res = await orders_collection.insert_one(order_doc)
+        # If sync: res = orders_collection.insert_one(order_doc)
+        await reservations.commit(reservation_id)
+    except Exception as e:
+        await reservations.release(reservation_id)
+        if "_id" in order_doc:
+            await orders_collection.delete_one({"_id": order_doc["_id"]})
+        if isinstance(e, reservations.ReservationError):
+            # the hold expired (stock already returned) before we could commit
+            raise HTTPException(status_code=409, detail="Reservation expired, please retry checkout")
+        raise
 
     order_id = str(res.inserted_id)
 
-    # decrease stock by 1
-    await listings_collection.update_one(
-        {"_id": listing["_id"]}, {"$inc": {"stock": -1}}
-    )
-    # If sync: listings_collection.update_one(...)
-
     return CreateOrderResponse(order_id=order_id, amount=amount)
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, HTTPException, Query,Body
+from fastapi import APIRouter, HTTPException, Query,Body, Depends
 from pydantic import BaseModel
-from database import db
+from auth import UserPublic, current_user, optional_current_user, resolve_email
+from database import collection
+from utils.auth_cache import user_cache
 from bson import ObjectId
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-users_collection = db["users"]
-
 class UserProfile(BaseModel):
     email: str
     name: str | None = None
@@ -23,7 +23,12 @@ def user_entity(doc):
     }
 
 @router.get("/me", response_model=UserProfile)
-async def get_profile(email: str = Query(...)):
+async def get_profile(
+    email: str | None = Query(None, description="legacy, needs AUTH_ALLOW_LEGACY_EMAIL: used only without a bearer token"),
+    caller: UserPublic | None = Depends(optional_current_user),
+    users_collection=Depends(collection("users")),
+):
+    email = resolve_email(caller, email)
     user = await users_collection.find_one({"email": email})
     if user:
         return user_entity(user)
@@ -35,13 +40,18 @@ async def get_profile(email: str = Query(...)):
     return user_entity(new_doc)
 
 @router.put("/me")
-async def update_me(email: str = Query(...), payload: dict = Body(...)):
+async def update_me(
+    payload: dict = Body(...),
+    caller: UserPublic = Depends(current_user),
+    users_collection=Depends(collection("users")),
+):
     user = await users_collection.update_one(
-        {"email": email},
+        {"email": caller.email},
         {"$set": payload}
     )
     if user.modified_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    user_cache.invalidate(caller.id)
     return {"success": True}
 
     updated = await users_collection.find_one({"email": profile.email})
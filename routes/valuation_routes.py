@@ -1,7 +1,37 @@
 # backend/routes/valuation_routes.py
-from fastapi import APIRouter
-from schemas.valuation import ValueEstimateRequest, ValueEstimateResponse
-from services.valuation_engine import estimate_value
+import asyncio
+import codecs
+import csv
+import io
+import json
+import os
+import re
+
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+
+from schemas.valuation import (
+    ValueEstimateBatchRequest,
+    ValueEstimateBatchResponse,
+    ValueEstimateRequest,
+    ValueEstimateResponse,
+)
+from services.pricing_tables import current_tables
+from services.valuation_engine import estimate_values
+from services.valuation_memo import normalize, valuation_memo
+from utils.image_io import ImageTooLargeError, read_upload_limited
+
+# JSON batches are priced in one go; uploads are streamed in chunks
+VALUATION_MAX_BATCH = int(os.getenv("VALUATION_MAX_BATCH", "10000"))
+VALUATION_MAX_UPLOAD_BYTES = int(os.getenv("VALUATION_MAX_UPLOAD_BYTES", str(64 * 1024 * 1024)))
+VALUATION_STREAM_CHUNK = int(os.getenv("VALUATION_STREAM_CHUNK", "5000"))
+
+CSV_COLUMNS = [
+    "index", "estimated_value", "currency", "base_price", "condition_multiplier",
+    "brand_multiplier", "age_factor", "weight_factor", "component_bonus", "location",
+    "table_version", "error",
+]
 
 router = APIRouter(
     prefix="/valuation",
@@ -13,6 +43,173 @@ router = APIRouter(
 async def estimate_endpoint(payload: ValueEstimateRequest):
     """
     Estimate the value of an e-waste item using rule-based logic.
+    age_years is quoted at VALUATION_MEMO_AGE_DECIMALS precision.
     """
-    # estimate_value() returns a dict that matches ValueEstimateResponse
-    return estimate_value(payload)
+    # already-serialized ValueEstimateResponse, memoized (services/valuation_memo.py)
+    return Response(content=valuation_memo.quote(payload), media_type="application/json")
+
+
+@router.post("/estimate/batch", response_model=ValueEstimateBatchResponse)
+async def estimate_batch_endpoint(payload: ValueEstimateBatchRequest):
+    """
+    Price many items at once; results come back in request order and are
+    identical to calling /valuation/estimate for each item (age_years is
+    likewise quoted at VALUATION_MEMO_AGE_DECIMALS precision).
+    """
+    if len(payload.items) > VALUATION_MAX_BATCH:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {VALUATION_MAX_BATCH} items per batch, upload a file for more.",
+        )
+    items = [normalize(item)[1] for item in payload.items]
+    results = await asyncio.to_thread(estimate_values, items)
+    return {"results": results, "count": len(results)}
+
+
+# ---------- file upload (CSV / NDJSON), streamed back ----------
+
+def _upload_format(file: UploadFile, data: bytes) -> str:
+    name = (file.filename or "").lower()
+    if name.endswith(".csv") or file.content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if name.endswith((".ndjson", ".jsonl")) or file.content_type in ("application/x-ndjson", "application/jsonl"):
+        return "ndjson"
+    # unknown: NDJSON lines start with "{"
+    head = data[:64].lstrip(codecs.BOM_UTF8 + b" \t\r\n")
+    return "ndjson" if head.startswith(b"{") else "csv"
+
+
+def _parse_components(value: str):
+    """CSV components cell: "battery:0.3;motherboard:0.4" (';' or ',' separated)."""
+    components = []
+    for part in re.split(r"[;,]", value):
+        if part.strip():
+            name, _, pct = part.partition(":")
+            components.append({"name": name.strip(), "percentage": pct.strip()})
+    return components
+
+
+def _csv_rows(text):
+    for row in csv.DictReader(text):
+        # empty cells fall back to the schema defaults
+        row = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+        if "components" in row:
+            row["components"] = _parse_components(row["components"])
+        yield row
+
+
+def _ndjson_rows(text):
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+
+def _read_chunk(rows, size: int) -> list:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            break
+    return chunk
+
+
+def _price_chunk(rows: list, start: int, tables) -> list:
+    """[(index, result | None, error | None)] for one chunk of raw rows."""
+    requests, positions, out = [], [], []
+    for offset, row in enumerate(rows):
+        index = start + offset
+        if isinstance(row, Exception):
+            out.append((index, None, f"Invalid JSON: {row}"))
+            continue
+        try:
+            requests.append(normalize(ValueEstimateRequest.model_validate(row))[1])
+            positions.append(len(out))
+            out.append((index, None, None))
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            out.append((index, None, errors))
+
+    for position, result in zip(positions, estimate_values(requests, tables)):
+        out[position] = (out[position][0], result, None)
+    return out
+
+
+def _to_ndjson(priced: list) -> str:
+    lines = []
+    for index, result, error in priced:
+        line = {"index": index, **result} if error is None else {"index": index, "error": error}
+        lines.append(json.dumps(line))
+    return "\n".join(lines) + "\n"
+
+
+def _to_csv(priced: list, header: bool) -> str:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(CSV_COLUMNS)
+    for index, result, error in priced:
+        if error is not None:
+            writer.writerow([index] + [""] * (len(CSV_COLUMNS) - 2) + [error])
+            continue
+        b = result["breakdown"]
+        writer.writerow([
+            index, result["estimated_value"], result["currency"], b["base_price"],
+            b["condition_multiplier"], b["brand_multiplier"], b["age_factor"],
+            b["weight_factor"], b["component_bonus"], b["location"] or "",
+            result["table_version"], "",
+        ])
+    return buf.getvalue()
+
+
+@router.post("/estimate/batch/upload")
+async def estimate_batch_upload(file: UploadFile = File(...)):
+    """
+    Price a CSV or NDJSON file of ValueEstimateRequest rows.
+
+    CSV columns are the request fields (components as
+    "battery:0.3;screen:0.2"). Results stream back in the same format and
+    row order, VALUATION_STREAM_CHUNK rows at a time, each carrying its
+    0-based `index`, priced exactly as /valuation/estimate would price
+    them. Invalid rows get an `error` instead of failing the file. NDJSON output ends with a `{"done": true, ...}` line.
+    """
+    # read up front: the upload is closed once this handler returns,
+    # before the streamed response is sent
+    try:
+        data = await read_upload_limited(file, VALUATION_MAX_UPLOAD_BYTES, check_image=False)
+    except ImageTooLargeError:
+        raise HTTPException(status_code=413, detail="File too large.")
+
+    fmt = _upload_format(file, data)
+    text = io.TextIOWrapper(io.BytesIO(data), encoding="utf-8-sig", newline="")
+    rows = _csv_rows(text) if fmt == "csv" else _ndjson_rows(text)
+
+    # one table version for the whole file, even if a reload happens mid-stream
+    tables = current_tables()
+
+    async def _stream():
+        index = failed = 0
+        while True:
+            try:
+                chunk = await asyncio.to_thread(_read_chunk, rows, VALUATION_STREAM_CHUNK)
+            except (UnicodeDecodeError, csv.Error) as e:
+                priced = [(index, None, f"Unreadable file: {e}")]
+                yield _to_ndjson(priced) if fmt == "ndjson" else _to_csv(priced, header=index == 0)
+                return
+            if not chunk:
+                break
+            priced = await asyncio.to_thread(_price_chunk, chunk, index, tables)
+            failed += sum(1 for _, _, error in priced if error is not None)
+            yield _to_ndjson(priced) if fmt == "ndjson" else _to_csv(priced, header=index == 0)
+            index += len(chunk)
+
+        if fmt == "ndjson":
+            yield json.dumps({"done": True, "count": index, "failed": failed}) + "\n"
+        elif index == 0:
+            yield _to_csv([], header=True)
+
+    media_type = "application/x-ndjson" if fmt == "ndjson" else "text/csv"
+    return StreamingResponse(_stream(), media_type=media_type)
@@ -28,7 +28,7 @@ class ValueEstimateRequest(BaseModel):
     # optional component breakdown
     components: Optional[List[ComponentShare]] = None
 
-    # city / region if you want to vary prices later
+    # city / region: picks per-location overrides in the pricing tables
     location: Optional[str] = None
 
 
@@ -41,9 +41,22 @@ class ValueBreakdown(BaseModel):
     component_bonus: float
     final_value: float
     currency: str = "INR"
+    # location whose price overrides were applied (None = default prices)
+    location: Optional[str] = None
 
 
 class ValueEstimateResponse(BaseModel):
     estimated_value: float
     currency: str = "INR"
     breakdown: ValueBreakdown
+    # pricing table version that produced this estimate
+    table_version: Optional[str] = None
+
+
+class ValueEstimateBatchRequest(BaseModel):
+    items: List[ValueEstimateRequest]
+
+
+class ValueEstimateBatchResponse(BaseModel):
+    results: List[ValueEstimateResponse]
+    count: int
@@ -0,0 +1,65 @@
+# backend/scripts/backfill_booking_slots.py
+"""
+Build the booking_slots counters from bookings made before slot capacity
+existed (run once when deploying services/booking_slots.py, before taking
+new bookings):
+
+    MONGO_URI=... python -m scripts.backfill_booking_slots [--dry-run]
+
+Counts existing bookings per facility / pickupDate / pickupTime (one
+$group), maps each to its canonical facility / date / slot the way new
+bookings are, and sets each counter to that count. Bookings whose
+pickupDate isn't a valid date, whose pickupTime isn't one of
+BOOKING_SLOTS, or whose facility isn't accepted are reported and skipped. Counters can end up above capacity; those slots
+simply show no free capacity until they drain.
+"""
+import argparse
+import asyncio
+
+from pymongo import UpdateOne
+
+from database import MONGO_BOOKINGS_COLLECTION, db
+from services.booking_slots import capacity_for, parse_date, parse_facility, parse_slot, slots_collection
+
+
+async def main(dry_run: bool):
+    groups = await db[MONGO_BOOKINGS_COLLECTION].aggregate([
+        {"$group": {
+            "_id": {"facility": "$facility", "date": "$pickupDate", "time": "$pickupTime"},
+            "count": {"$sum": 1},
+        }},
+    ]).to_list(length=None)
+
+    counts, skipped = {}, 0
+    for group in groups:
+        key = group["_id"]
+        try:
+            facility = parse_facility(str(key.get("facility") or ""))
+            day = parse_date(str(key.get("date") or ""))
+            time = parse_slot(str(key.get("time") or ""))
+        except ValueError:
+            skipped += group["count"]
+            continue
+        slot = (facility, day, time)
+        counts[slot] = counts.get(slot, 0) + group["count"]
+
+    over = [(slot, n) for slot, n in counts.items() if n > capacity_for(slot[0])]
+    print(f"{len(counts)} slots from {sum(counts.values())} bookings, "
+          f"{skipped} bookings skipped (bad facility/pickupDate/pickupTime), {len(over)} slots over capacity")
+    for (facility, day, time), n in sorted(over, key=lambda x: x[0][1]):
+        print(f"  over capacity: {facility} {day} {time}: {n}/{capacity_for(facility)}")
+
+    if dry_run or not counts:
+        return
+    ops = [
+        UpdateOne({"facility": f, "date": d, "time": t}, {"$set": {"booked": n}}, upsert=True)
+        for (f, d, t), n in counts.items()
+    ]
+    result = await slots_collection.bulk_write(ops, ordered=False)
+    print(f"upserted {result.upserted_count}, updated {result.modified_count} counters")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true")
+    asyncio.run(main(parser.parse_args().dry_run))
@@ -0,0 +1,78 @@
+# backend/scripts/bench_auth.py
+"""
+Per-request identity overhead of auth.current_user, with and without the
+claims/user caches, next to the legacy "look the user up by ?email=" path.
+
+Runs against MONGO_URI in a throwaway database (dropped afterwards):
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.bench_auth [--requests 2000]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_bench_auth")
+
+from fastapi.security import HTTPAuthorizationCredentials  # noqa: E402
+
+from auth import create_access_token, current_user  # noqa: E402
+from database import client, db  # noqa: E402
+from utils.auth_cache import claims_cache, user_cache  # noqa: E402
+
+users_collection = db["users"]
+
+
+async def _legacy(email: str):
+    await users_collection.find_one({"email": email})
+
+
+async def _uncached(credentials):
+    claims_cache.clear()
+    user_cache.clear()
+    await current_user(credentials, users_collection)
+
+
+async def _cached(credentials):
+    await current_user(credentials, users_collection)
+
+
+async def _time(fn, arg, requests: int) -> list:
+    samples = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await fn(arg)
+        samples.append((time.perf_counter() - started) * 1e6)
+    return samples
+
+
+def _report(name: str, samples: list):
+    q = statistics.quantiles(samples, n=100)
+    print(f"{name:<28} p50 {q[49]:9.1f} us   p95 {q[94]:9.1f} us   mean {statistics.fmean(samples):9.1f} us")
+
+
+async def main(requests: int):
+    if db.name != os.environ["MONGO_DB_NAME"]:
+        raise SystemExit(f"refusing to run against database {db.name!r}")
+
+    await db.drop_collection("users")
+    res = await users_collection.insert_one(
+        {"fullName": "Bench User", "email": "bench@example.com", "phone": "0", "password_hash": "x"}
+    )
+    token = create_access_token({"sub": str(res.inserted_id)})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    try:
+        await _cached(credentials)  # warm the caches (and the connection pool)
+        _report("legacy ?email= lookup", await _time(_legacy, "bench@example.com", requests))
+        _report("current_user, no cache", await _time(_uncached, credentials, requests))
+        _report("current_user, cached", await _time(_cached, credentials, requests))
+    finally:
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=2000)
+    asyncio.run(main(parser.parse_args().requests))
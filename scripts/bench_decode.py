@@ -0,0 +1,96 @@
+# backend/scripts/bench_decode.py
+"""
+Compare the old full-resolution decode with utils.image_io.decode_for_model.
+
+Each mode runs in a fresh process so peak RSS (ru_maxrss) isn't polluted
+by the other one.
+
+    python -m scripts.bench_decode                  # synthetic 8000x6000 JPEG
+    python -m scripts.bench_decode uploads/x.jpg    # real photo
+"""
+import io
+import multiprocessing as mp
+import resource
+import sys
+import time
+
+REPEATS = 5
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _synthetic_jpeg(width=8000, height=6000) -> bytes:
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    # low-frequency noise compresses like a photo, not like static
+    small = rng.integers(0, 255, (height // 50, width // 50, 3), dtype=np.uint8)
+    img = Image.fromarray(small).resize((width, height), Image.BILINEAR)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _old_decode(data: bytes):
+    import numpy as np
+    from PIL import Image
+
+    img = Image.open(io.BytesIO(data)).convert("RGB")
+    return np.asarray(img)
+
+
+def _new_decode(data: bytes):
+    from utils.image_io import decode_for_model
+
+    arr, _ = decode_for_model(data)
+    return arr
+
+
+def _run(mode: str, data: bytes, out):
+    import numpy  # noqa: F401  (import cost shouldn't count as decode memory)
+    import PIL.Image  # noqa: F401
+    import utils.image_io  # noqa: F401
+
+    fn = _old_decode if mode == "full" else _new_decode
+    base = _rss_mb()
+
+    timings = []
+    shape = None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        arr = fn(data)
+        timings.append((time.perf_counter() - started) * 1000.0)
+        shape = arr.shape
+        del arr
+
+    out.put((mode, shape, min(timings), sum(timings) / len(timings), _rss_mb() - base, _rss_mb()))
+
+
+def main():
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb") as f:
+            data = f.read()
+        source = sys.argv[1]
+    else:
+        data = _synthetic_jpeg()
+        source = "synthetic 8000x6000 JPEG"
+
+    print(f"source: {source} ({len(data) / 1e6:.1f} MB)")
+    print(f"{'mode':<8} {'shape':<18} {'min ms':>9} {'avg ms':>9} {'peak RSS +MB':>13} {'peak RSS MB':>12}")
+
+    ctx = mp.get_context("spawn")
+    for mode in ("full", "draft"):
+        out = ctx.Queue()
+        proc = ctx.Process(target=_run, args=(mode, data, out))
+        proc.start()
+        mode, shape, best, avg, rss_delta, rss_peak = out.get()
+        proc.join()
+        print(f"{mode:<8} {str(shape):<18} {best:>9.1f} {avg:>9.1f} {rss_delta:>13.1f} {rss_peak:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
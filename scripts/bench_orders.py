@@ -0,0 +1,90 @@
+# backend/scripts/bench_orders.py
+"""
+Order-creation latency vs cart size: the old per-item pipeline
+(find_one + update_one per item) against routes.orders.create_order
+(one $in read + one bulk_write).
+
+Runs against MONGO_URI in a throwaway database (dropped afterwards):
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.bench_orders
+"""
+import asyncio
+import os
+import statistics
+import time
+from datetime import datetime
+
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_bench_orders")
+
+from database import client, db  # noqa: E402
+from models.listing_model import listings_collection  # noqa: E402
+from routes.orders import CartItem, CreateOrderRequest, create_order  # noqa: E402
+
+orders_collection = db["orders"]
+
+CART_SIZES = [1, 5, 10, 20, 40]
+REPEATS = 30
+
+
+async def sequential_baseline(payload: CreateOrderRequest):
+    """The pre-batching pipeline, kept here only as the comparison point."""
+    from bson import ObjectId
+
+    items, total = [], 0.0
+    for cart_item in payload.items:
+        listing = await listings_collection.find_one({"_id": ObjectId(cart_item.listing_id)})
+        price = float(listing["price"])
+        total += price * cart_item.quantity
+        items.append({"listing_id": str(listing["_id"]), "quantity": cart_item.quantity})
+    await orders_collection.insert_one({
+        "user_email": payload.user_email, "items": items, "total_amount": total,
+        "status": "placed", "created_at": datetime.utcnow(),
+    })
+    for item in items:
+        await listings_collection.update_one(
+            {"_id": ObjectId(item["listing_id"])}, {"$inc": {"stock": -item["quantity"]}}
+        )
+
+
+async def _batched(payload: CreateOrderRequest):
+    await create_order(payload, listings_collection=listings_collection, orders_collection=orders_collection)
+
+
+async def _time(fn, payload) -> list:
+    samples = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        await fn(payload)
+        samples.append((time.perf_counter() - started) * 1000.0)
+    return samples
+
+
+def _p(samples, q):
+    return statistics.quantiles(samples, n=100)[q - 1]
+
+
+async def main():
+    if db.name != os.environ["MONGO_DB_NAME"]:
+        raise SystemExit(f"refusing to run against database {db.name!r}")
+
+    await db.drop_collection("listings")
+    await db.drop_collection("orders")
+    docs = [{"title": f"item {i}", "price": 100 + i, "stock": 10_000_000} for i in range(max(CART_SIZES))]
+    ids = (await listings_collection.insert_many(docs)).inserted_ids
+
+    print(f"{'items':>5} | {'sequential p50':>14} {'p95':>8} | {'batched p50':>11} {'p95':>8} | speedup")
+    for size in CART_SIZES:
+        payload = CreateOrderRequest(
+            user_email="bench@example.com",
+            items=[CartItem(listing_id=str(oid), quantity=1) for oid in ids[:size]],
+        )
+        seq = await _time(sequential_baseline, payload)
+        bat = await _time(_batched, payload)
+        print(f"{size:>5} | {_p(seq, 50):>12.1f}ms {_p(seq, 95):>6.1f}ms | "
+              f"{_p(bat, 50):>9.1f}ms {_p(bat, 95):>6.1f}ms | {_p(seq, 50) / _p(bat, 50):>6.1f}x")
+
+    await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+# backend/scripts/bench_outbox.py
+"""
+Outbox throughput against a local aiosmtpd stand-in (pip install aiosmtpd).
+
+Compares the old delivery (new SMTP connection per mail) with the outbox
+worker (batched, one reused connection), and checks that a permanently
+rejected recipient is dead-lettered instead of retried:
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.bench_outbox [--messages 500]
+
+Uses a throwaway database (dropped afterwards). Exits non-zero if the
+worker loses or duplicates mail.
+"""
+import argparse
+import asyncio
+import os
+import smtplib
+import sys
+import time
+from email.mime.text import MIMEText
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    raise SystemExit("this benchmark needs aiosmtpd: pip install aiosmtpd")
+
+SMTP_PORT = 8025
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_bench_outbox")
+os.environ.update(SMTP_HOST="127.0.0.1", SMTP_PORT=str(SMTP_PORT), SMTP_STARTTLS="false")
+
+from database import client, db  # noqa: E402
+from services import outbox  # noqa: E402
+
+REJECTED = "rejected@example.com"
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = []
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address == REJECTED:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.extend(envelope.rcpt_tos)
+        return "250 Message accepted"
+
+
+def connection_per_message(count: int):
+    """The pre-outbox delivery path: connect, send, quit for every mail."""
+    for i in range(count):
+        msg = MIMEText(f"message {i}")
+        msg["Subject"], msg["From"], msg["To"] = "bench", "bench@example.com", f"user{i}@example.com"
+        with smtplib.SMTP("127.0.0.1", SMTP_PORT) as server:
+            server.send_message(msg)
+
+
+async def main(messages: int) -> int:
+    if db.name != os.environ["MONGO_DB_NAME"]:
+        raise SystemExit(f"refusing to run against database {db.name!r}")
+
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+    controller.start()
+    try:
+        started = time.perf_counter()
+        await asyncio.to_thread(connection_per_message, messages)
+        baseline = messages / (time.perf_counter() - started)
+        handler.received.clear()
+
+        await db.drop_collection("outbox")
+        for i in range(messages):
+            await outbox.enqueue(f"user{i}@example.com", "bench", f"message {i}", kind="bench")
+        await outbox.enqueue(REJECTED, "bench", "should be dead-lettered", kind="bench")
+
+        worker = outbox.OutboxWorker()
+        started = time.perf_counter()
+        while await worker.drain_once():
+            pass
+        pooled = messages / (time.perf_counter() - started)
+        await asyncio.to_thread(worker._session.close)
+
+        stats = worker.stats()
+        dead = await outbox.outbox_collection.count_documents({"status": "dead"})
+        ok = (
+            len(handler.received) == messages
+            and len(set(handler.received)) == messages
+            and dead == 1
+            and stats["smtp_connects"] == 1
+        )
+        print(f"connection per message: {baseline:8.1f} msg/s")
+        print(f"outbox worker:          {pooled:8.1f} msg/s  ({pooled / baseline:.1f}x, "
+              f"{stats['smtp_connects']} connection(s), batches of {worker.batch_size})")
+        print(f"delivered={len(handler.received)} unique={len(set(handler.received))} dead={dead} "
+              f"-> {'PASS' if ok else 'FAIL'}")
+        return 0 if ok else 1
+    finally:
+        controller.stop()
+        await client.drop_database(db.name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    sys.exit(asyncio.run(main(parser.parse_args().messages)))
@@ -0,0 +1,146 @@
+# backend/scripts/bench_search.py
+"""
+/marketplace/search latency at scale, for both backends of services/search.py:
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.bench_search [--listings 100000] [--requests 300] [--keep]
+    python -m scripts.bench_search --index-only [--listings 100000] [--requests 300]
+
+Fills a throwaway database with scripts.gen_listings data (reused if the
+count already matches; dropped afterwards unless --keep), builds the
+listings indexes, then replays a query mix - common, mid-frequency and
+rare words, multi-word queries, filtered queries and facet-only browsing -
+through the $text/$facet backend and the in-process index.
+
+p95 targets at 100k listings (end to end inside the service: ranking,
+facets and the page read):
+    text    P95_TARGET_MS["text"]
+    memory  P95_TARGET_MS["memory"]
+Exits non-zero when a backend misses its target.
+
+--index-only times just the in-process index (ranking + facets, no page
+read) on generated listings and needs no MongoDB. At 100k listings, 300
+requests (Python 3.11.7):
+
+    before  p50 55.4 ms   p95 722.1 ms   ("" 722 ms, "" + category 134 ms)
+    after   p50 17.8 ms   p95  43.0 ms   ("" 0.1 ms, "" + category 0.1 ms)
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+from bson import ObjectId
+
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_search_bench")
+
+from database import client, db  # noqa: E402
+from db_indexes import INDEXES  # noqa: E402
+from scripts.gen_listings import generate, insert  # noqa: E402
+from services import search  # noqa: E402
+
+P95_TARGET_MS = {"text": 250.0, "memory": 100.0}
+
+QUERIES = [
+    ("phone", {}),
+    ("laptop", {}),
+    ("samsung battery", {}),
+    ("cracked screen", {"category": "mobile"}),
+    ("macbook ssd", {"max_price": 30000}),
+    ("charger usb fast", {"condition": "Good"}),
+    ("x123", {}),
+    ("pro42 oled", {}),
+    ("refurbished thinkpad 8gb ram", {"min_price": 5000, "max_price": 40000}),
+    ("", {"category": "tv"}),
+    ("", {}),
+]
+
+
+async def _ensure_data(listings: int):
+    collection = db["listings"]
+    if await collection.estimated_document_count() != listings:
+        await db.drop_collection("listings")
+        started = time.perf_counter()
+        await insert(collection, listings)
+        print(f"generated {listings} listings in {time.perf_counter() - started:.1f}s")
+    await collection.create_indexes(INDEXES["listings"])
+
+
+async def _run(backend: str, requests: int, rng: random.Random) -> list:
+    collection = db["listings"]
+    run = search._search_text if backend == "text" else search._search_memory
+    samples = []
+    for _ in range(requests):
+        query, filters = rng.choice(QUERIES)
+        offset = rng.choice([0, 0, 0, 20, 40])
+        started = time.perf_counter()
+        await run(collection, query, filters, 20, offset)
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def _report(backend: str, samples: list, target_ms: float) -> bool:
+    q = statistics.quantiles(samples, n=100)
+    ok = q[94] <= target_ms
+    print(f"{backend:<7} p50 {q[49]:7.1f} ms   p95 {q[94]:7.1f} ms   max {max(samples):7.1f} ms   "
+          f"target p95 <= {target_ms:.0f} ms -> {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+def index_only(listings: int, requests: int) -> int:
+    started = time.perf_counter()
+    index = search.InvertedIndex()
+    for doc in generate(listings):
+        doc["_id"] = ObjectId()
+        index.add(doc)
+    print(f"memory index: {len(index)} listings built in {time.perf_counter() - started:.2f}s")
+
+    def _run_index(count: int, rng: random.Random) -> list:
+        samples = []
+        for _ in range(count):
+            query, filters = rng.choice(QUERIES)
+            offset = rng.choice([0, 0, 0, 20, 40])
+            started = time.perf_counter()
+            index.search(query, filters, 20, offset)
+            samples.append((time.perf_counter() - started) * 1000)
+        return samples
+
+    _run_index(20, random.Random(1))  # warm-up
+    return 0 if _report("index", _run_index(requests, random.Random(0)), P95_TARGET_MS["memory"]) else 1
+
+
+async def main(listings: int, requests: int, keep: bool) -> int:
+    if not db.name.endswith("_bench"):
+        raise SystemExit(f"refusing to run against database {db.name!r}")
+
+    failed = False
+    try:
+        await _ensure_data(listings)
+
+        started = time.perf_counter()
+        await search._build_index()
+        print(f"memory index: {len(search._State.index)} listings built in "
+              f"{time.perf_counter() - started:.2f}s")
+
+        for backend in ("text", "memory"):
+            await _run(backend, 20, random.Random(1))  # warm-up
+            samples = await _run(backend, requests, random.Random(0))
+            failed |= not _report(backend, samples, P95_TARGET_MS[backend])
+    finally:
+        if not keep:
+            await client.drop_database(db.name)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=100_000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--keep", action="store_true", help="keep the generated data for the next run")
+    parser.add_argument("--index-only", action="store_true", help="time the in-process index alone, no MongoDB")
+    args = parser.parse_args()
+    if args.index_only:
+        sys.exit(index_only(args.listings, args.requests))
+    sys.exit(asyncio.run(main(args.listings, args.requests, args.keep)))
@@ -0,0 +1,39 @@
+# backend/scripts/export_onnx.py
+"""
+Export models/best.pt to ONNX for INFERENCE_RUNTIME=onnx, plus an INT8
+dynamically-quantized copy for ONNX_INT8=1.
+
+    python -m scripts.export_onnx            # best.onnx + best.int8.onnx
+    python -m scripts.export_onnx --no-int8
+
+Needs ultralytics, onnx and onnxruntime installed (build machine only).
+"""
+import argparse
+import shutil
+
+from utils.model_provider import MODEL_PATH
+from utils.runtimes import IMGSZ, ONNX_INT8_MODEL_PATH, ONNX_MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-int8", action="store_true", help="skip the quantized variant")
+    parser.add_argument("--dynamic", action="store_true", help="dynamic batch axis (enables batched runs)")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    exported = YOLO(MODEL_PATH).export(format="onnx", imgsz=IMGSZ, dynamic=args.dynamic, simplify=True)
+    if exported != ONNX_MODEL_PATH:
+        shutil.move(exported, ONNX_MODEL_PATH)
+    print(f"✅ wrote {ONNX_MODEL_PATH}")
+
+    if not args.no_int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(ONNX_MODEL_PATH, ONNX_INT8_MODEL_PATH, weight_type=QuantType.QUInt8)
+        print(f"✅ wrote {ONNX_INT8_MODEL_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# backend/scripts/gen_listings.py
+"""
+Synthetic marketplace listings (ListingSchema shape) for search/feed benchmarks:
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.gen_listings [--count 100000] [--seed 0]
+
+Writes into MONGO_DB_NAME (default ewaste_search_bench) and refuses any
+database whose name doesn't end in "_bench", so it can't pollute real data.
+Titles and tags are drawn from a skewed vocabulary (a few very common
+words, a long tail of rare ones) so queries hit realistic match counts.
+"""
+import argparse
+import asyncio
+import os
+import random
+
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_search_bench")
+
+BRANDS = ["Apple", "Samsung", "Dell", "HP", "Lenovo", "Sony", "LG", "Xiaomi", "OnePlus", "Asus",
+          "Acer", "Nokia", "Motorola", "Philips", "Panasonic", "Realme", "Oppo", "Vivo"]
+KINDS = {
+    "mobile": ["phone", "smartphone", "iphone", "galaxy", "handset"],
+    "laptop": ["laptop", "notebook", "thinkpad", "macbook", "chromebook"],
+    "tv": ["tv", "television", "monitor", "display", "led"],
+    "tablet": ["tablet", "ipad", "tab"],
+    "accessory": ["charger", "cable", "earphones", "keyboard", "mouse", "adapter", "powerbank"],
+    "reusable": ["router", "speaker", "camera", "printer", "console"],
+}
+DETAILS = ["battery", "screen", "cracked", "working", "dead", "motherboard", "refurbished",
+           "original", "box", "warranty", "scratches", "64gb", "128gb", "8gb", "ram", "ssd",
+           "hdmi", "wifi", "bluetooth", "4k", "oled", "usb", "fast", "charging", "spare", "parts"]
+# long tail: model-number-like words that each appear in only a few listings
+RARE = [f"{prefix}{n}" for prefix in ("x", "m", "gt", "pro", "note") for n in range(1, 400)]
+CONDITIONS = ["Good", "Like New", "Fair", "Poor", "For Parts"]
+PRICE_SCALE = {"mobile": 6000, "laptop": 20000, "tv": 12000, "tablet": 8000, "accessory": 600, "reusable": 3000}
+
+
+def generate(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    categories = list(KINDS)
+    for i in range(count):
+        category = rng.choices(categories, weights=[30, 20, 10, 10, 20, 10])[0]
+        kind = rng.choice(KINDS[category])
+        words = [rng.choice(BRANDS), kind] + rng.sample(DETAILS, rng.randint(0, 3))
+        if rng.random() < 0.3:
+            words.append(rng.choice(RARE))
+        yield {
+            "title": " ".join(words),
+            "price": int(rng.lognormvariate(0, 0.8) * PRICE_SCALE[category]),
+            "condition": rng.choices(CONDITIONS, weights=[30, 15, 25, 15, 15])[0],
+            "stock": rng.choice([0, 1, 1, 1, 2, 5]),
+            "category": category,
+            "image_url": f"/media/{i:064x}/medium",
+            "tags": [kind, category] + rng.sample(DETAILS, rng.randint(0, 2)),
+            "owner_email": f"seller{rng.randint(1, count // 20 + 1)}@example.com",
+        }
+
+
+async def insert(collection, count: int, seed: int = 0, batch: int = 5000):
+    docs = []
+    for doc in generate(count, seed):
+        docs.append(doc)
+        if len(docs) == batch:
+            await collection.insert_many(docs, ordered=False)
+            docs = []
+    if docs:
+        await collection.insert_many(docs, ordered=False)
+
+
+async def main(count: int, seed: int):
+    from database import db
+
+    if not db.name.endswith("_bench"):
+        raise SystemExit(f"refusing to write synthetic listings into {db.name!r}")
+    await db.drop_collection("listings")
+    await insert(db["listings"], count, seed)
+    print(f"inserted {count} listings into {db.name}.listings")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.count, args.seed))
@@ -0,0 +1,105 @@
+# backend/scripts/parity_runtimes.py
+"""
+Check that two model runtimes give the same /classify answers on the
+sample images in uploads/. Exits non-zero on any mismatch.
+
+    python -m scripts.parity_runtimes                   # ultralytics vs onnx
+    python -m scripts.parity_runtimes --other onnx --int8
+
+An image passes when both runtimes return the same labels in the same
+order, confidences within --conf-tol, and every box pair overlaps with
+IoU >= --iou-min. INT8 needs looser tolerances than FP32.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+from utils.image_io import decode_for_model
+from utils.postprocess import build_predictions
+from utils.runtimes import ONNX_INT8_MODEL_PATH, OnnxRuntime, load_runtime
+
+CONF_THRESH = 0.25
+TOP_K = 6
+
+
+def _iou(a, b) -> float:
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 1.0
+
+
+def _classify(runtime, data: bytes):
+    arr, scale = decode_for_model(data)
+    started = time.perf_counter()
+    rows, names = runtime.predict_batch([arr], CONF_THRESH)[0]
+    elapsed = (time.perf_counter() - started) * 1000.0
+    preds, category = build_predictions(rows, names, CONF_THRESH, TOP_K, scale)
+    return preds, category, elapsed
+
+
+def _compare(ref, other, conf_tol: float, iou_min: float):
+    ref_preds, ref_cat, _ = ref
+    other_preds, other_cat, _ = other
+    if ref_cat != other_cat:
+        return f"category {ref_cat!r} != {other_cat!r}"
+    if [p["label"] for p in ref_preds] != [p["label"] for p in other_preds]:
+        return "labels differ: {} vs {}".format(
+            [p["label"] for p in ref_preds], [p["label"] for p in other_preds])
+    for a, b in zip(ref_preds, other_preds):
+        if abs(a["confidence"] - b["confidence"]) > conf_tol:
+            return f"{a['label']}: confidence {a['confidence']:.3f} vs {b['confidence']:.3f}"
+        if _iou(a["bbox"], b["bbox"]) < iou_min:
+            return f"{a['label']}: box IoU {_iou(a['bbox'], b['bbox']):.3f}"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ref", default="ultralytics")
+    parser.add_argument("--other", default="onnx")
+    parser.add_argument("--int8", action="store_true", help="use the INT8 ONNX model for --other onnx")
+    parser.add_argument("--images", default="uploads")
+    parser.add_argument("--conf-tol", type=float, default=None)
+    parser.add_argument("--iou-min", type=float, default=None)
+    args = parser.parse_args()
+
+    conf_tol = args.conf_tol if args.conf_tol is not None else (0.08 if args.int8 else 0.01)
+    iou_min = args.iou_min if args.iou_min is not None else (0.85 if args.int8 else 0.95)
+
+    ref_rt = load_runtime(args.ref)
+    if args.other == "onnx" and args.int8:
+        other_rt = OnnxRuntime(model_path=ONNX_INT8_MODEL_PATH)
+    else:
+        other_rt = load_runtime(args.other)
+
+    paths = sorted(
+        p for p in glob.glob(os.path.join(args.images, "*"))
+        if p.lower().endswith((".jpg", ".jpeg", ".png", ".webp"))
+    )
+    failures = 0
+    ref_ms = other_ms = 0.0
+    for path in paths:
+        with open(path, "rb") as f:
+            data = f.read()
+        ref = _classify(ref_rt, data)
+        other = _classify(other_rt, data)
+        ref_ms += ref[2]
+        other_ms += other[2]
+
+        problem = _compare(ref, other, conf_tol, iou_min)
+        status = "ok  " if problem is None else "FAIL"
+        print(f"{status} {os.path.basename(path)}  {ref[2]:7.1f}ms vs {other[2]:7.1f}ms  {problem or ''}")
+        failures += problem is not None
+
+    if paths:
+        print(f"\n{len(paths) - failures}/{len(paths)} match | "
+              f"avg {ref_ms / len(paths):.1f}ms ({args.ref}) vs {other_ms / len(paths):.1f}ms ({args.other})")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
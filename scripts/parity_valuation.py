@@ -0,0 +1,86 @@
+# backend/scripts/parity_valuation.py
+"""
+Check that the columnar valuation engine matches the scalar one exactly,
+and time both:
+
+    python -m scripts.parity_valuation [--items 20000] [--seed 0]
+
+Every field of every result must be equal (float ==, no tolerance).
+Exits non-zero on the first mismatch.
+"""
+import argparse
+import random
+import sys
+import time
+
+from schemas.valuation import ValueEstimateRequest
+from services.pricing_tables import BRAND_TIERS, BUILTIN_TABLES, CATEGORIES, CONDITIONS, PricingTables
+from services.valuation_engine import estimate_value, estimate_values
+
+COMPONENT_NAMES = ["battery", "Motherboard", "PCB", "screen", "LCD display", "casing", "speaker"]
+LOCATIONS = [None, "", "Bengaluru", " bengaluru ", "Mumbai", "unknown-town"]
+
+# builtin prices plus location overrides, so the override lookups are covered too
+TABLES = PricingTables({
+    **BUILTIN_TABLES,
+    "version": "parity",
+    "locations": {
+        "bengaluru": {"category_base_price": {"laptop": 900.0, "mobile": 275.5},
+                      "condition_multiplier": {"dead": 0.55}},
+        "mumbai": {"brand_multiplier": {"tier1": 1.15, "local": 0.85}},
+    },
+})
+
+
+def random_request(rng: random.Random) -> ValueEstimateRequest:
+    components = None
+    if rng.random() < 0.5:
+        components = [
+            {"name": rng.choice(COMPONENT_NAMES), "percentage": round(rng.random(), rng.choice([1, 2, 6]))}
+            for _ in range(rng.randint(0, 5))
+        ]
+    return ValueEstimateRequest(
+        category=rng.choice(CATEGORIES),
+        condition=rng.choice(CONDITIONS),
+        brand_tier=rng.choice(BRAND_TIERS),
+        # mix of "form" values and arbitrary floats
+        age_years=rng.choice([rng.randint(0, 12), round(rng.uniform(0, 15), 1), rng.uniform(0, 15)]),
+        weight_kg=rng.choice([None, round(rng.uniform(0, 20), 2), rng.uniform(0, 0.05), rng.uniform(0, 50)]),
+        components=components,
+        location=rng.choice(LOCATIONS),
+    )
+
+
+def main(items: int, seed: int) -> int:
+    rng = random.Random(seed)
+    requests = [random_request(rng) for _ in range(items)]
+
+    started = time.perf_counter()
+    scalar = [estimate_value(r, TABLES) for r in requests]
+    scalar_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    columnar = estimate_values(requests, TABLES)
+    columnar_s = time.perf_counter() - started
+
+    for i, (a, b) in enumerate(zip(scalar, columnar)):
+        if a != b:
+            print(f"MISMATCH at {i}: {requests[i]!r}\n  scalar:   {a}\n  columnar: {b}")
+            return 1
+    if len(scalar) != len(columnar):
+        print(f"MISMATCH: {len(scalar)} scalar results, {len(columnar)} columnar")
+        return 1
+
+    print(f"{items} items identical")
+    print(f"scalar:   {scalar_s * 1000:8.1f} ms ({items / scalar_s:,.0f} items/s)")
+    print(f"columnar: {columnar_s * 1000:8.1f} ms ({items / columnar_s:,.0f} items/s), "
+          f"{scalar_s / columnar_s:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(main(args.items, args.seed))
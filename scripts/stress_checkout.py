@@ -0,0 +1,149 @@
+# backend/scripts/stress_checkout.py
+"""
+Oversell stress test: fire hundreds of simultaneous checkouts at one
+listing with stock 5 and check that exactly 5 succeed and stock ends at 0.
+
+Runs both checkout paths (/payments/create-order and /orders/create)
+against MONGO_URI in a throwaway database (dropped afterwards), then a
+multi-listing run: buyers check out overlapping two- and three-listing
+carts (the all-or-nothing path) while one of the listings is deleted.
+Every listing's stock must go down by exactly what the successful orders
+bought, never below 0, and the deleted listing must stay deleted.
+
+    MONGO_URI=mongodb://localhost:27017 python -m scripts.stress_checkout [--buyers 500]
+
+Exits non-zero if anything oversold or stock/reservations don't add up.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+os.environ.setdefault("MONGO_DB_NAME", "ewaste_stress_checkout")
+
+from fastapi import HTTPException  # noqa: E402
+
+from database import client, db  # noqa: E402
+from models.listing_model import listings_collection  # noqa: E402
+from routes import orders, payments  # noqa: E402
+from services.reservations import reservations_collection  # noqa: E402
+
+STOCK = 5
+
+
+async def _checkout_payments(listing_id, buyer: int):
+    return await payments.create_order(
+        payments.CreateOrderRequest(listing_id=str(listing_id), user_email=f"buyer{buyer}@example.com"),
+        listings_collection=listings_collection,
+        orders_collection=db["orders"],
+    )
+
+
+async def _checkout_cart(listing_id, buyer: int):
+    return await orders.create_order(orders.CreateOrderRequest(
+        user_email=f"buyer{buyer}@example.com",
+        items=[orders.CartItem(listing_id=str(listing_id), quantity=1)],
+    ), listings_collection=listings_collection, orders_collection=db["orders"])
+
+
+async def _run(name: str, checkout, buyers: int) -> bool:
+    await db.drop_collection("orders")
+    await db.drop_collection("reservations")
+    listing_id = (await listings_collection.insert_one(
+        {"title": f"hot item ({name})", "price": 999, "stock": STOCK}
+    )).inserted_id
+
+    results = await asyncio.gather(
+        *(checkout(listing_id, i) for i in range(buyers)), return_exceptions=True
+    )
+    ok = sum(1 for r in results if not isinstance(r, BaseException))
+    rejected = sum(1 for r in results if isinstance(r, HTTPException) and r.status_code == 400)
+    unexpected = [r for r in results if isinstance(r, BaseException) and not isinstance(r, HTTPException)]
+
+    stock = (await listings_collection.find_one({"_id": listing_id}))["stock"]
+    committed = await reservations_collection.count_documents({"status": "committed"})
+    placed = await db["orders"].count_documents({})
+
+    passed = ok == STOCK and stock == 0 and committed == STOCK and placed == STOCK and not unexpected
+    print(f"[{'PASS' if passed else 'FAIL'}] {name}: {buyers} buyers -> {ok} sold, {rejected} rejected, "
+          f"stock={stock}, committed holds={committed}, orders={placed}, errors={len(unexpected)}")
+    for e in unexpected[:3]:
+        print("    ", repr(e))
+    return passed
+
+
+async def _run_carts(buyers: int) -> bool:
+    name = "orders.create_order (multi-listing carts)"
+    await db.drop_collection("orders")
+    await db.drop_collection("reservations")
+    ids = (await listings_collection.insert_many([
+        {"title": f"cart item {n}", "price": 499, "stock": STOCK} for n in range(4)
+    ])).inserted_ids
+    shared, doomed = ids[:3], ids[3]
+
+    # overlapping pairs; every 4th cart also takes the listing deleted mid-run
+    carts = []
+    for i in range(buyers):
+        cart = [shared[i % 3], shared[(i + 1) % 3]]
+        if i % 4 == 0:
+            cart.append(doomed)
+        carts.append(cart)
+
+    async def _checkout(i: int):
+        return await orders.create_order(orders.CreateOrderRequest(
+            user_email=f"buyer{i}@example.com",
+            items=[orders.CartItem(listing_id=str(oid), quantity=1) for oid in carts[i]],
+        ), listings_collection=listings_collection, orders_collection=db["orders"])
+
+    async def _delete_doomed():
+        await asyncio.sleep(0.01)
+        await listings_collection.delete_one({"_id": doomed})
+
+    *results, _ = await asyncio.gather(
+        *(_checkout(i) for i in range(buyers)), _delete_doomed(), return_exceptions=True
+    )
+    sold = [cart for cart, r in zip(carts, results) if not isinstance(r, BaseException)]
+    unexpected = [r for r in results if isinstance(r, BaseException) and not isinstance(r, HTTPException)]
+
+    stock = {doc["_id"]: doc["stock"] async for doc in listings_collection.find({"_id": {"$in": shared}})}
+    drift = {
+        str(oid): (STOCK - stock[oid], sum(cart.count(oid) for cart in sold))
+        for oid in shared if STOCK - stock[oid] != sum(cart.count(oid) for cart in sold)
+    }
+    negative = await listings_collection.count_documents({"stock": {"$lt": 0}})
+    phantom = await listings_collection.find_one({"_id": doomed})
+    committed = await reservations_collection.count_documents({"status": "committed"})
+    placed = await db["orders"].count_documents({})
+
+    passed = (sold and not drift and not negative and phantom is None
+              and committed == len(sold) and placed == len(sold) and not unexpected)
+    print(f"[{'PASS' if passed else 'FAIL'}] {name}: {buyers} buyers -> {len(sold)} sold, "
+          f"stock={[stock[oid] for oid in shared]}, negative={negative}, "
+          f"deleted listing {'recreated' if phantom else 'stays deleted'}, "
+          f"committed holds={committed}, orders={placed}, errors={len(unexpected)}")
+    for oid, (taken, bought) in drift.items():
+        print(f"     {oid}: stock down by {taken}, orders bought {bought}")
+    for e in unexpected[:3]:
+        print("    ", repr(e))
+    return passed
+
+
+async def main(buyers: int):
+    if db.name != os.environ["MONGO_DB_NAME"]:
+        raise SystemExit(f"refusing to run against database {db.name!r}")
+
+    try:
+        results = [
+            await _run("payments.create_order", _checkout_payments, buyers),
+            await _run("orders.create_order", _checkout_cart, buyers),
+            await _run_carts(buyers),
+        ]
+    finally:
+        await client.drop_database(db.name)
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buyers", type=int, default=300)
+    asyncio.run(main(parser.parse_args().buyers))
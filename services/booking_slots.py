@@ -0,0 +1,207 @@
+# backend/services/booking_slots.py
+"""
+Pickup slot capacity: how many bookings a facility takes per date + time slot.
+
+    await reserve(facility, date, time)    # before inserting the booking
+    await release(facility, date, time)    # if the booking insert fails
+    days = await availability(facility, start, end)
+
+One counter doc per facility/date/slot (collection `booking_slots`):
+    {facility, date: "YYYY-MM-DD", time, booked}
+reserve() is a single guarded upsert - `booked < capacity` in the filter,
+`$inc: {booked: 1}` - so concurrent bookings can never overfill a slot.
+A full slot makes the upsert collide with the unique (facility, date, time)
+index, which is how "full" is told apart from "no counter yet". Without
+that index a full slot would just get a second counter, so the app
+lifespan awaits ensure_index() before serving and refuses to start if it
+can't be built; it is not left to the background index reconciler.
+
+Capacity is BOOKING_SLOT_CAPACITY per slot, or the facility's entry in
+BOOKING_FACILITY_CAPACITY (JSON object {"facility": capacity}). It is read
+at booking time, not stored, so raising it takes effect at once.
+BOOKING_SLOTS lists the bookable slots. A pickupTime is mapped to one of
+them ignoring case and whitespace ("09:00-11:00" is "09:00 - 11:00");
+anything else is rejected, so a spelling variant can't get around a full
+slot with a counter of its own. Facilities are matched the same way
+against BOOKING_FACILITIES (plus the BOOKING_FACILITY_CAPACITY names).
+With BOOKING_FACILITIES set, other facilities are rejected; without it,
+an unlisted facility is keyed by its lower-cased, whitespace-collapsed
+name, so "Facility  A " and "facility a" still share one capacity.
+
+availability() is one range query on the same index (facility, date range)
+and is cached BOOKING_AVAILABILITY_TTL_S; bookings made by this process
+show up immediately, other workers' within the TTL.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from database import db
+from utils.auth_cache import TtlCache
+
+BOOKING_SLOT_CAPACITY = int(os.getenv("BOOKING_SLOT_CAPACITY", "5"))
+BOOKING_FACILITY_CAPACITY = json.loads(os.getenv("BOOKING_FACILITY_CAPACITY", "{}"))
+BOOKING_FACILITIES = [f.strip() for f in os.getenv("BOOKING_FACILITIES", "").split(",") if f.strip()]
+BOOKING_SLOTS = [s.strip() for s in os.getenv(
+    "BOOKING_SLOTS", "09:00 - 11:00,11:00 - 13:00,13:00 - 15:00,15:00 - 17:00,17:00 - 19:00"
+).split(",") if s.strip()]
+BOOKING_AVAILABILITY_MAX_DAYS = int(os.getenv("BOOKING_AVAILABILITY_MAX_DAYS", "31"))
+BOOKING_AVAILABILITY_TTL_S = float(os.getenv("BOOKING_AVAILABILITY_TTL_S", "5"))
+BOOKING_AVAILABILITY_CACHE_MAX_ENTRIES = int(os.getenv("BOOKING_AVAILABILITY_CACHE_MAX_ENTRIES", "2000"))
+
+slots_collection = db["booking_slots"]
+
+# one counter per slot (the unique key is what makes a full slot's upsert
+# fail) and availability's facility + date range
+SLOT_INDEX = IndexModel(
+    [("facility", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)],
+    unique=True, name="facility_date_time",
+)
+
+availability_cache = TtlCache(BOOKING_AVAILABILITY_CACHE_MAX_ENTRIES, BOOKING_AVAILABILITY_TTL_S)
+# bumped on every reserve/release in this process; part of the cache key,
+# so a write makes that facility's cached ranges unreachable at once
+_generation: dict = {}
+
+
+class SlotFullError(Exception):
+    def __init__(self, facility: str, day: str, time: str):
+        super().__init__(f"Slot {day} {time} at {facility} is full")
+        self.facility, self.date, self.time = facility, day, time
+
+
+def _facility_key(value: str) -> str:
+    return " ".join(value.split()).lower()
+
+
+_FACILITY_BY_KEY = {_facility_key(f): f for f in [*BOOKING_FACILITY_CAPACITY, *BOOKING_FACILITIES]}
+_CAPACITY_BY_KEY = {_facility_key(f): c for f, c in BOOKING_FACILITY_CAPACITY.items()}
+
+
+def capacity_for(facility: str) -> int:
+    return int(_CAPACITY_BY_KEY.get(_facility_key(facility), BOOKING_SLOT_CAPACITY))
+
+
+def parse_facility(value: str) -> str:
+    """The canonical facility name (see the module docstring). Raises ValueError."""
+    key = _facility_key(value or "")
+    if not key or (BOOKING_FACILITIES and key not in _FACILITY_BY_KEY):
+        raise ValueError(f"unknown facility {value!r}")
+    return _FACILITY_BY_KEY.get(key, key)
+
+
+def _slot_key(value: str) -> str:
+    return "".join(value.split()).lower()
+
+
+_SLOT_BY_KEY = {_slot_key(slot): slot for slot in BOOKING_SLOTS}
+
+
+def parse_slot(value: str) -> str:
+    """The configured BOOKING_SLOTS entry value names. Raises ValueError."""
+    slot = _SLOT_BY_KEY.get(_slot_key(value or ""))
+    if slot is None:
+        raise ValueError(f"unknown pickup slot {value!r}")
+    return slot
+
+
+def parse_date(value: str) -> str:
+    """Canonical YYYY-MM-DD (the counters' date format). Raises ValueError."""
+    return date.fromisoformat(value.strip()).isoformat()
+
+
+async def ensure_index():
+    """Build the unique slot index (no-op if it exists). Raises if it can't be built."""
+    await slots_collection.create_indexes([SLOT_INDEX])
+
+
+def _changed(facility: str):
+    _generation[facility] = _generation.get(facility, 0) + 1
+
+
+async def reserve(facility: str, day: str, time: str):
+    """Take one unit of the slot. Raises SlotFullError."""
+    capacity = capacity_for(facility)
+    if capacity <= 0:  # the upsert below would create the counter at 1
+        raise SlotFullError(facility, day, time)
+    key = {"facility": facility, "date": day, "time": time}
+    # second round: another request created the counter between our
+    # filter miss and our insert; update it without upserting
+    for upsert in (True, False):
+        try:
+            doc = await slots_collection.find_one_and_update(
+                {**key, "booked": {"$lt": capacity}},
+                {"$inc": {"booked": 1}},
+                upsert=upsert,
+                projection={"_id": 1},
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            continue
+        if doc is not None:
+            _changed(facility)
+            return
+        break
+    raise SlotFullError(facility, day, time)
+
+
+async def release(facility: str, day: str, time: str):
+    """Give one unit back (booking failed or was cancelled)."""
+    await slots_collection.update_one(
+        {"facility": facility, "date": day, "time": time, "booked": {"$gt": 0}},
+        {"$inc": {"booked": -1}},
+    )
+    _changed(facility)
+
+
+async def availability(facility: str, start: str, end: str) -> list:
+    """
+    [{date, slots: [{time, capacity, booked, free}]}] for start..end
+    (inclusive, YYYY-MM-DD), one entry per BOOKING_SLOTS slot.
+    """
+    key = (facility, start, end, _generation.get(facility, 0))
+    days = availability_cache.get(key)
+    if days is not None:
+        return days
+
+    capacity = capacity_for(facility)
+    cursor = slots_collection.find(
+        {"facility": facility, "date": {"$gte": start, "$lte": end}},
+        {"_id": 0, "date": 1, "time": 1, "booked": 1},
+    )
+    booked = {}
+    async for doc in cursor:
+        booked.setdefault(doc["date"], {})[doc["time"]] = doc["booked"]
+
+    days = []
+    day, last = date.fromisoformat(start), date.fromisoformat(end)
+    while day <= last:
+        taken = booked.get(day.isoformat(), {})
+        days.append({
+            "date": day.isoformat(),
+            "slots": [
+                {
+                    "time": t,
+                    "capacity": capacity,
+                    "booked": taken.get(t, 0),
+                    "free": max(0, capacity - taken.get(t, 0)),
+                }
+                for t in BOOKING_SLOTS
+            ],
+        })
+        day += timedelta(days=1)
+
+    availability_cache.set(key, days)
+    return days
+
+
+def stats() -> dict:
+    return {
+        "slot_capacity": BOOKING_SLOT_CAPACITY,
+        "facility_overrides": len(BOOKING_FACILITY_CAPACITY),
+        "facilities": len(BOOKING_FACILITIES) or None,
+        "availability_cache": availability_cache.stats(),
+    }
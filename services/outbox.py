@@ -0,0 +1,373 @@
+# backend/services/outbox.py
+"""
+Email outbox: request handlers enqueue, one background worker delivers.
+
+    await enqueue(to, subject, body, kind="booking_confirmation")
+
+The request only pays for one insert. OutboxWorker (started from the app
+lifespan) claims due messages in batches and sends them over a single SMTP
+connection that stays open between batches - STARTTLS and login happen once
+per connection, not once per mail.
+
+Outbox docs (collection `outbox`):
+    {to, subject, body, kind, status, attempts, next_attempt_at, created_at,
+     lease_until, last_error, sent_at, purge_at}
+status: pending -> sending -> sent | pending (retry later) | dead
+
+Failures are retried with exponential backoff up to OUTBOX_MAX_ATTEMPTS;
+permanent SMTP rejections (5xx, refused recipient) go to `dead` at once.
+Dead letters are kept for inspection; to retry one, set it back to
+{"status": "pending", "next_attempt_at": <now>}. Claims carry a lease, so
+a message held by a crashed worker is picked up again after OUTBOX_LEASE_S.
+On shutdown the worker finishes the message it is sending (waiting up to
+OUTBOX_STOP_TIMEOUT_S), records it, and hands the rest of its batch back
+as pending, so a clean stop never leaves a sent message leased to be sent
+again.
+Sent messages are removed by a TTL index on purge_at (db_indexes.py).
+
+Without SMTP credentials and without an explicit SMTP_HOST (local dev),
+messages are printed and marked `skipped` instead of sent.
+"""
+import asyncio
+import os
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from database import db
+
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")  # your email / SMTP username
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")  # app password or SMTP password
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+SMTP_TIMEOUT_S = float(os.getenv("SMTP_TIMEOUT_S", "30"))
+SMTP_IDLE_CLOSE_S = float(os.getenv("SMTP_IDLE_CLOSE_S", "60"))
+FROM_EMAIL = os.getenv("FROM_EMAIL", SMTP_USERNAME or "no-reply@example.com")
+SMTP_CONFIGURED = bool(SMTP_USERNAME and SMTP_PASSWORD) or "SMTP_HOST" in os.environ
+
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+OUTBOX_POLL_INTERVAL_S = float(os.getenv("OUTBOX_POLL_INTERVAL_S", "5"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_BACKOFF_BASE_S = float(os.getenv("OUTBOX_BACKOFF_BASE_S", "30"))
+OUTBOX_BACKOFF_MAX_S = float(os.getenv("OUTBOX_BACKOFF_MAX_S", "3600"))
+OUTBOX_LEASE_S = float(os.getenv("OUTBOX_LEASE_S", "300"))
+OUTBOX_RETENTION_S = float(os.getenv("OUTBOX_RETENTION_S", str(7 * 24 * 3600)))
+# one send can take a reconnect plus the send itself
+OUTBOX_STOP_TIMEOUT_S = float(os.getenv("OUTBOX_STOP_TIMEOUT_S", str(2 * SMTP_TIMEOUT_S)))
+RATE_WINDOW_S = 60.0
+
+outbox_collection = db["outbox"]
+
+# _deliver's result for messages it didn't try because the worker is stopping
+_NOT_SENT = object()
+
+
+# ---------- enqueue ----------
+
+async def enqueue(to: str, subject: str, body: str, kind: str = "email"):
+    """Store a message for delivery. Returns its id."""
+    now = datetime.utcnow()
+    res = await outbox_collection.insert_one({
+        "to": to,
+        "subject": subject,
+        "body": body,
+        "kind": kind,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": now,
+    })
+    outbox_worker.notify()
+    return res.inserted_id
+
+
+def _backoff_s(attempts: int) -> float:
+    delay = min(OUTBOX_BACKOFF_MAX_S, OUTBOX_BACKOFF_BASE_S * 2 ** (attempts - 1))
+    return delay * random.uniform(0.8, 1.2)  # jitter: retries don't arrive in waves
+
+
+def _is_permanent(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    # 5xx is a final "no" for this message; auth failures are a config
+    # problem of the whole connection, so those are retried instead
+    return (
+        isinstance(error, smtplib.SMTPResponseException)
+        and not isinstance(error, smtplib.SMTPAuthenticationError)
+        and error.smtp_code >= 500
+    )
+
+
+# ---------- SMTP connection ----------
+
+class _SmtpSession:
+    """
+    One reused SMTP connection. Only the worker's delivery thread touches
+    it, one batch at a time, so it needs no locking.
+    """
+
+    def __init__(self):
+        self._smtp: smtplib.SMTP | None = None
+        self._last_used = 0.0
+        self.connects = 0
+
+    def _open(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_S)
+        try:
+            if SMTP_STARTTLS:
+                smtp.starttls()
+            if SMTP_USERNAME and SMTP_PASSWORD:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        self.connects += 1
+        return smtp
+
+    @property
+    def connected(self) -> bool:
+        return self._smtp is not None
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+    def close_if_idle(self):
+        if self._smtp is not None and time.monotonic() - self._last_used > SMTP_IDLE_CLOSE_S:
+            self.close()
+
+    def send(self, msg):
+        self.close_if_idle()
+        for attempt in range(2):
+            if self._smtp is None:
+                self._smtp = self._open()
+            try:
+                self._smtp.send_message(msg)
+                self._last_used = time.monotonic()
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # the server dropped an idle connection: reconnect once
+                self._smtp.close()
+                self._smtp = None
+                if attempt:
+                    raise
+
+
+def _build_message(doc) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["Subject"] = doc["subject"]
+    msg["From"] = FROM_EMAIL
+    msg["To"] = doc["to"]
+    msg.attach(MIMEText(doc["body"], "plain"))
+    return msg
+
+
+# ---------- worker ----------
+
+class OutboxWorker:
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self._session = _SmtpSession()
+        self._task: asyncio.Task | None = None
+        self._wake: asyncio.Event | None = None
+        self._stopping = threading.Event()  # read by the delivery thread
+
+        self.sent = 0
+        self.skipped = 0
+        self.retried = 0
+        self.dead = 0
+        self._sent_at = deque()  # monotonic timestamps of recent sends
+        self.last_batch = None
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._stopping.clear()
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # don't cancel mid-send: the message would stay leased and be
+            # sent again once the lease runs out. Let the delivery thread
+            # finish the current message and the batch be recorded.
+            self._stopping.set()
+            self.notify()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), OUTBOX_STOP_TIMEOUT_S)
+            except asyncio.TimeoutError:
+                print("⚠ [outbox] delivery still running at shutdown; its batch stays leased")
+                self._task.cancel()
+                try:
+                    await self._task
+                except asyncio.CancelledError:
+                    pass
+            self._task = None
+        await asyncio.to_thread(self._session.close)
+
+    def notify(self):
+        """New mail was enqueued: don't wait for the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---------- delivery ----------
+
+    async def _claim(self, now: datetime) -> list:
+        claimable = {"$or": [
+            {"status": "pending", "next_attempt_at": {"$lte": now}},
+            # a worker died mid-batch: its lease ran out
+            {"status": "sending", "lease_until": {"$lt": now}},
+        ]}
+        candidates = await (
+            outbox_collection.find(claimable, {"_id": 1})
+            .sort("next_attempt_at", 1)
+            .limit(self.batch_size)
+            .to_list(length=self.batch_size)
+        )
+        if not candidates:
+            return []
+
+        # claim with a token so that, with several app workers, each
+        # message ends up in exactly one batch
+        token = ObjectId()
+        await outbox_collection.update_many(
+            {"_id": {"$in": [doc["_id"] for doc in candidates]}, **claimable},
+            {"$set": {"status": "sending", "claim": token,
+                      "lease_until": now + timedelta(seconds=OUTBOX_LEASE_S)}},
+        )
+        return await outbox_collection.find({"claim": token, "status": "sending"}).to_list(length=None)
+
+    def _deliver(self, docs: list) -> list:
+        """Runs in a thread. Returns (doc, error) per message, error None on success."""
+        results = []
+        for doc in docs:
+            if self._stopping.is_set():
+                results.extend((rest, _NOT_SENT) for rest in docs[len(results):])
+                break
+            if not SMTP_CONFIGURED:
+                # For dev, just log instead of sending
+                print(f"⚠ SMTP not configured, not sending {doc['kind']} to {doc['to']}:\n{doc['body']}")
+                results.append((doc, None))
+                continue
+            try:
+                self._session.send(_build_message(doc))
+                results.append((doc, None))
+            except Exception as e:
+                results.append((doc, e))
+                if not self._session.connected:
+                    # can't connect / log in: don't hammer the server with the rest
+                    results.extend((rest, e) for rest in docs[len(results):])
+                    break
+        return results
+
+    async def _record(self, results: list, now: datetime):
+        ops = []
+        done_status = "sent" if SMTP_CONFIGURED else "skipped"
+        for doc, error in results:
+            if error is _NOT_SENT:
+                # not tried: back to pending, no attempt counted
+                ops.append(UpdateOne({"_id": doc["_id"]}, {
+                    "$set": {"status": "pending", "next_attempt_at": now},
+                    "$unset": {"lease_until": "", "claim": ""},
+                }))
+                continue
+            if error is None:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {
+                    "$set": {"status": done_status, "sent_at": now,
+                             "purge_at": now + timedelta(seconds=OUTBOX_RETENTION_S)},
+                    "$unset": {"lease_until": "", "claim": ""},
+                }))
+                continue
+
+            attempts = doc.get("attempts", 0) + 1
+            update = {"attempts": attempts, "last_error": f"{type(error).__name__}: {error}"}
+            if _is_permanent(error) or attempts >= OUTBOX_MAX_ATTEMPTS:
+                update.update(status="dead", dead_at=now)
+                self.dead += 1
+                print(f"❌ [outbox] gave up on {doc['kind']} to {doc['to']}:", error)
+            else:
+                update.update(status="pending", next_attempt_at=now + timedelta(seconds=_backoff_s(attempts)))
+                self.retried += 1
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": update, "$unset": {"lease_until": "", "claim": ""}}))
+        await outbox_collection.bulk_write(ops, ordered=False)
+
+    async def drain_once(self) -> int:
+        """Claim and deliver one batch. Returns how many messages were claimed."""
+        docs = await self._claim(datetime.utcnow())
+        if not docs:
+            return 0
+
+        started = time.perf_counter()
+        results = await asyncio.to_thread(self._deliver, docs)
+        elapsed = time.perf_counter() - started
+        await self._record(results, datetime.utcnow())
+
+        delivered = sum(1 for _, error in results if error is None)
+        if SMTP_CONFIGURED:
+            self.sent += delivered
+        else:
+            self.skipped += delivered
+        now = time.monotonic()
+        self._sent_at.extend([now] * delivered)
+        self.last_batch = {
+            "size": len(docs),
+            "delivered": delivered,
+            "seconds": round(elapsed, 3),
+            "messages_per_s": round(delivered / elapsed, 1) if elapsed > 0 else None,
+        }
+        return len(docs)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                claimed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("⚠ [outbox] delivery round failed:", e)
+                claimed = 0
+
+            if claimed >= self.batch_size or self._stopping.is_set():
+                continue  # probably more waiting (or stop() woke us)
+            await asyncio.to_thread(self._session.close_if_idle)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=OUTBOX_POLL_INTERVAL_S)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    # ---------- reporting ----------
+
+    def stats(self) -> dict:
+        cutoff = time.monotonic() - RATE_WINDOW_S
+        while self._sent_at and self._sent_at[0] < cutoff:
+            self._sent_at.popleft()
+        return {
+            "smtp_configured": SMTP_CONFIGURED,
+            "sent": self.sent,
+            "skipped": self.skipped,
+            "retried": self.retried,
+            "dead": self.dead,
+            "smtp_connects": self._session.connects,
+            # averaged over the last RATE_WINDOW_S seconds
+            "messages_per_s": round(len(self._sent_at) / RATE_WINDOW_S, 2),
+            "last_batch": self.last_batch,
+        }
+
+
+outbox_worker = OutboxWorker()
@@ -1,32 +1,328 @@
-CATEGORY_BASE_PRICE = {
-    "laptop": 25000,
-    "mobile_phone": 12000,
-    "tablet": 15000,
-    "charger": 300,
-    "monitor": 7000,
-    "keyboard": 500,
-    "printer": 8000,
-}
+# backend/services/pricing_tables.py
+"""
+Versioned valuation price tables, compiled for lookup and hot-swapped.
 
-SCRAP_RATE_PER_KG = {
-    "laptop": 250,         # ₹ per kg
-    "mobile_phone": 400,
-    "tablet": 300,
-    "charger": 150,
-    "monitor": 200,
-    "printer": 180,
-}
+    tables = current_tables()    # grab once per request / batch, then use only `tables`
 
-CONDITION_FACTORS = {
-    "working": 1.0,
-    "repairable": 0.6,
-    "dead": 0.2,
-}
+A table version is one JSON document:
+
+    {
+      "version": "2026-10-01",
+      "category_base_price": {"mobile": 250.0, "laptop": 800.0, ...},
+      "condition_multiplier": {"working": 1.4, ...},
+      "brand_multiplier": {"tier1": 1.1, ...},
+      "reference_weight": {"mobile": 0.18, ...},
+      "age": {"discount_per_year": 0.08, "max_discount": 0.5},
+      "components": {"rules": [{"match": ["motherboard", "pcb"], "rate": 80}, ...],
+                     "default_rate": 20},
+      "locations": {                        # optional per-location overrides
+        "bengaluru": {"category_base_price": {"laptop": 900.0},
+                      "condition_multiplier": {...}, "brand_multiplier": {...}}
+      }
+    }
+
+The version string identifies a table: publish changes under a new
+version, an edit that keeps the version is ignored. Every category,
+condition and brand tier of BUILTIN_TABLES must be present; a document
+that fails to compile is rejected and the current version stays.
+Locations are matched case-insensitively; unknown or missing locations
+use the defaults.
+
+Source (VALUATION_TABLES_SOURCE):
+    builtin - BUILTIN_TABLES below (default)
+    file    - VALUATION_TABLES_FILE, re-read when its mtime changes
+    mongo   - newest {"active": true} doc in `pricing_tables`, re-read on a
+              change stream event (or every VALUATION_TABLES_POLL_S without one)
+SIGHUP forces a reload from any source.
+
+Compiled tables are immutable and replaced with a single reference
+assignment, so readers never lock and never see half a version.
+"""
+import asyncio
+import json
+import os
+import signal
+import time
 
-AGE_DEPRECIATION_PER_YEAR = {
-    "laptop": 0.18,
-    "mobile_phone": 0.25,
-    "tablet": 0.22,
-    "monitor": 0.15,
-    "printer": 0.20,
+import numpy as np
+
+VALUATION_TABLES_SOURCE = os.getenv("VALUATION_TABLES_SOURCE", "builtin").lower()  # builtin | file | mongo
+VALUATION_TABLES_FILE = os.getenv("VALUATION_TABLES_FILE", "pricing_tables.json")
+VALUATION_TABLES_POLL_S = float(os.getenv("VALUATION_TABLES_POLL_S", "30"))
+
+BUILTIN_TABLES = {
+    "version": "builtin-1",
+    "category_base_price": {
+        "mobile": 250.0,   # base scrap / resale value in INR
+        "laptop": 800.0,
+        "tv": 500.0,
+        "tablet": 400.0,
+        "accessory": 100.0,
+        "other": 150.0,
+    },
+    "condition_multiplier": {
+        "working": 1.4,     # more value if device is working
+        "repairable": 1.0,  # normal
+        "dead": 0.6,        # only parts/scrap
+    },
+    "brand_multiplier": {
+        "tier1": 1.1,   # Apple, Samsung, Dell, etc.
+        "tier2": 1.0,   # mid-range brands
+        "local": 0.9,   # unbranded / very low-end
+    },
+    "reference_weight": {
+        "mobile": 0.18,   # in kg (approx)
+        "laptop": 2.0,
+        "tv": 8.0,
+        "tablet": 0.5,
+        "accessory": 0.1,
+        "other": 1.0,
+    },
+    "age": {"discount_per_year": 0.08, "max_discount": 0.5},
+    "components": {
+        "rules": [
+            {"match": ["motherboard", "pcb"], "rate": 80},
+            {"match": ["screen", "display"], "rate": 60},
+            {"match": ["battery"], "rate": 40},
+        ],
+        "default_rate": 20,
+    },
+    "locations": {},
 }
+
+# code order is fixed by the builtin tables, so codes mean the same in every version
+CATEGORIES = tuple(BUILTIN_TABLES["category_base_price"])
+CONDITIONS = tuple(BUILTIN_TABLES["condition_multiplier"])
+BRAND_TIERS = tuple(BUILTIN_TABLES["brand_multiplier"])
+
+
+def normalize_location(location) -> str:
+    return (location or "").strip().lower()
+
+
+def _float_table(doc: dict, key: str, names: tuple, base=None) -> list:
+    table = doc.get(key) or {}
+    if base is None:
+        missing = [name for name in names if name not in table]
+        if missing:
+            raise ValueError(f"{key} is missing {', '.join(missing)}")
+        return [float(table[name]) for name in names]
+    unknown = set(table) - set(names)
+    if unknown:
+        raise ValueError(f"{key} has unknown keys {', '.join(sorted(unknown))}")
+    return [float(table.get(name, default)) for name, default in zip(names, base)]
+
+
+class PricingTables:
+    """
+    One compiled table version. Row 0 of the per-location arrays holds the
+    defaults, row i the overrides of locations[i]. The *_rows lists hold
+    the same floats as the arrays, for the scalar path.
+    """
+
+    def __init__(self, doc: dict):
+        self.version = str(doc["version"])
+        self.categories = CATEGORIES
+        self.conditions = CONDITIONS
+        self.brand_tiers = BRAND_TIERS
+        self.category_code = {name: i for i, name in enumerate(CATEGORIES)}
+        self.condition_code = {name: i for i, name in enumerate(CONDITIONS)}
+        self.brand_code = {name: i for i, name in enumerate(BRAND_TIERS)}
+
+        base = [_float_table(doc, "category_base_price", CATEGORIES)]
+        cond = [_float_table(doc, "condition_multiplier", CONDITIONS)]
+        brand = [_float_table(doc, "brand_multiplier", BRAND_TIERS)]
+        self.locations = ("",)
+        for name, overrides in (doc.get("locations") or {}).items():
+            key = normalize_location(name)
+            if not key or key in self.locations:
+                raise ValueError(f"duplicate or empty location {name!r}")
+            self.locations += (key,)
+            base.append(_float_table(overrides, "category_base_price", CATEGORIES, base[0]))
+            cond.append(_float_table(overrides, "condition_multiplier", CONDITIONS, cond[0]))
+            brand.append(_float_table(overrides, "brand_multiplier", BRAND_TIERS, brand[0]))
+        self.location_code = {name: i for i, name in enumerate(self.locations)}
+
+        self.base_price = np.array(base, dtype=np.float64)        # [location, category]
+        self.condition_mult = np.array(cond, dtype=np.float64)    # [location, condition]
+        self.brand_mult = np.array(brand, dtype=np.float64)       # [location, brand tier]
+        self.ref_weight = np.array(_float_table(doc, "reference_weight", CATEGORIES), dtype=np.float64)
+        self.base_price_rows = self.base_price.tolist()
+        self.condition_mult_rows = self.condition_mult.tolist()
+        self.brand_mult_rows = self.brand_mult.tolist()
+        self.ref_weight_row = self.ref_weight.tolist()
+
+        age = doc.get("age") or {}
+        self.discount_per_year = float(age.get("discount_per_year", 0.08))
+        self.max_discount = float(age.get("max_discount", 0.5))
+
+        components = doc.get("components") or {}
+        self.component_rules = tuple(
+            (tuple(word.lower() for word in rule["match"]), rule["rate"])
+            for rule in components.get("rules", [])
+        )
+        self.component_default_rate = components.get("default_rate", 20)
+
+        if (self.base_price < 0).any() or (self.ref_weight <= 0).any():
+            raise ValueError("base prices must be >= 0 and reference weights > 0")
+
+    def category_index(self, category: str) -> int:
+        return self.category_code.get(category, self.category_code["other"])
+
+    def location_index(self, location) -> int:
+        return self.location_code.get(normalize_location(location), 0)
+
+    def component_rate(self, name: str):
+        """Bonus (INR) for a component making up 100% of the device."""
+        name = name.lower()
+        for words, rate in self.component_rules:
+            if any(word in name for word in words):
+                return rate
+        return self.component_default_rate
+
+
+# ---------- loading + hot swap ----------
+
+_current = PricingTables(BUILTIN_TABLES)
+_listeners = []
+
+
+def current_tables() -> PricingTables:
+    return _current
+
+
+def on_change(callback):
+    """Call callback(new_tables) after every swap."""
+    _listeners.append(callback)
+
+
+class _State:
+    source = VALUATION_TABLES_SOURCE
+    loaded_at = time.time()
+    reloads = 0
+    errors = 0
+    last_error = None
+    file_mtime = None
+    change_stream_active = False
+    watcher: asyncio.Task | None = None
+
+
+def _swap(tables: PricingTables):
+    global _current
+    if tables.version == _current.version:
+        return False
+    _current = tables
+    _State.loaded_at = time.time()
+    _State.reloads += 1
+    print(f"✅ [pricing] now using table version {tables.version}")
+    for callback in _listeners:
+        try:
+            callback(tables)
+        except Exception as e:
+            print("⚠ [pricing] change listener failed:", e)
+    return True
+
+
+def _read_file():
+    mtime = os.path.getmtime(VALUATION_TABLES_FILE)
+    with open(VALUATION_TABLES_FILE, "r", encoding="utf-8") as f:
+        return mtime, json.load(f)
+
+
+def _collection():
+    from database import db
+    return db["pricing_tables"]
+
+
+async def _load_doc():
+    if VALUATION_TABLES_SOURCE == "file":
+        mtime, doc = await asyncio.to_thread(_read_file)
+        _State.file_mtime = mtime
+        return doc
+    if VALUATION_TABLES_SOURCE == "mongo":
+        doc = await _collection().find_one({"active": True}, sort=[("activated_at", -1), ("_id", -1)])
+        if doc is None:
+            raise LookupError("no active document in pricing_tables")
+        doc.pop("_id", None)
+        return doc
+    return BUILTIN_TABLES
+
+
+async def reload() -> bool:
+    """Load the configured source and swap it in if the version changed. False if nothing changed."""
+    try:
+        doc = await _load_doc()
+        # compiling is cheap (a few small arrays): no need for a thread
+        return _swap(PricingTables(doc))
+    except Exception as e:
+        _State.errors += 1
+        _State.last_error = f"{type(e).__name__}: {e}"
+        print(f"⚠ [pricing] reload failed, keeping version {_current.version}:", e)
+        return False
+
+
+async def _watch_file():
+    while True:
+        await asyncio.sleep(VALUATION_TABLES_POLL_S)
+        try:
+            mtime = os.path.getmtime(VALUATION_TABLES_FILE)
+        except OSError:
+            continue
+        if mtime != _State.file_mtime:
+            _State.file_mtime = mtime  # a broken file is reported once, not every poll
+            await reload()
+
+
+async def _watch_mongo():
+    while True:
+        try:
+            async with _collection().watch() as stream:
+                _State.change_stream_active = True
+                await reload()  # anything written before the stream opened
+                async for _ in stream:
+                    await reload()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # no change stream (standalone mongod): poll instead
+            _State.change_stream_active = False
+            await reload()
+        await asyncio.sleep(VALUATION_TABLES_POLL_S)
+
+
+async def start():
+    """Initial load + change watcher (called from the app lifespan)."""
+    if VALUATION_TABLES_SOURCE != "builtin":
+        await reload()
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGHUP, lambda: asyncio.ensure_future(reload()))
+    except (NotImplementedError, AttributeError, RuntimeError):
+        pass  # no SIGHUP on this platform / not the main thread
+    if VALUATION_TABLES_SOURCE == "file":
+        _State.watcher = asyncio.create_task(_watch_file())
+    elif VALUATION_TABLES_SOURCE == "mongo":
+        _State.watcher = asyncio.create_task(_watch_mongo())
+
+
+async def stop():
+    if _State.watcher is not None:
+        _State.watcher.cancel()
+        try:
+            await _State.watcher
+        except asyncio.CancelledError:
+            pass
+        _State.watcher = None
+
+
+def stats() -> dict:
+    return {
+        "version": _current.version,
+        "source": _State.source,
+        "locations": len(_current.locations) - 1,
+        "loaded_at": _State.loaded_at,
+        "reloads": _State.reloads,
+        "errors": _State.errors,
+        "last_error": _State.last_error,
+        "change_stream_active": _State.change_stream_active,
+    }
@@ -0,0 +1,237 @@
+# backend/services/reservations.py
+"""
+Stock reservations: the only code that changes listing stock on checkout.
+
+    reservation_id = await hold({listing_oid: qty, ...}, owner=email)
+    ... create the order ...
+    await commit(reservation_id)      # or: await release(reservation_id)
+
+hold() takes stock with guarded writes (`stock >= qty` in the filter), so
+two buyers can never both get the last unit - no read-check-write race.
+A hold that is neither committed nor released before `expires_at` is
+expired by sweep_expired(), which puts the stock back.
+
+Reservation docs (collection `reservations`):
+    {listing_id -> qty in items, owner, status, created_at, expires_at, purge_at}
+status: held -> committed | released | expired
+Finished reservations get a `purge_at` and the TTL index in db_indexes.py
+deletes them after RESERVATION_RETENTION_S.
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+from database import db, client, supports_transactions
+from models.listing_model import listings_collection
+from utils.listing_cache import listing_cache
+
+RESERVATION_TTL_S = float(os.getenv("RESERVATION_TTL_S", "600"))
+RESERVATION_RETENTION_S = float(os.getenv("RESERVATION_RETENTION_S", str(7 * 24 * 3600)))
+RESERVATION_SWEEP_INTERVAL_S = float(os.getenv("RESERVATION_SWEEP_INTERVAL_S", "30"))
+
+reservations_collection = db["reservations"]
+
+
+class OutOfStockError(Exception):
+    def __init__(self, listing_id):
+        super().__init__(f"Not enough stock for {listing_id}")
+        self.listing_id = listing_id
+
+
+class ReservationError(Exception):
+    """Reservation is unknown or no longer held (expired, released, committed)."""
+
+
+# ---------- stock writes ----------
+
+async def _take_one(listing_id, qty: int, session=None):
+    doc = await listings_collection.find_one_and_update(
+        {"_id": listing_id, "stock": {"$gte": qty}},
+        {"$inc": {"stock": -qty}},
+        projection={"_id": 1},
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    if doc is None:
+        raise OutOfStockError(listing_id)
+
+
+async def _take_many(quantities: dict, session=None):
+    """
+    All-or-nothing guarded decrement of several listings.
+
+    In a transaction it is one ordered bulk_write; a guard that doesn't
+    match simply matches nothing, so fewer modified docs than ops means
+    some listing ran out (or is gone) and raising aborts the whole
+    transaction. Nothing is ever upserted: checkout never creates listings.
+
+    Without a transaction the listings are taken one by one, each with its
+    own guarded write, and the ones already taken are given back when a
+    later one fails - the bulk result can't say which op missed, so it
+    can't be undone precisely.
+    """
+    if session is None:
+        taken = {}
+        try:
+            for oid, qty in quantities.items():
+                await _take_one(oid, qty)
+                taken[oid] = qty
+        except BaseException:
+            await _give_back(taken)
+            raise
+        return
+
+    ops = [
+        UpdateOne({"_id": oid, "stock": {"$gte": qty}}, {"$inc": {"stock": -qty}})
+        for oid, qty in quantities.items()
+    ]
+    result = await listings_collection.bulk_write(ops, ordered=True, session=session)
+    if result.modified_count == len(ops):
+        return
+    # name the first listing short of stock from the committed state (this
+    # transaction's own writes aren't visible outside the session)
+    stock = {
+        doc["_id"]: doc.get("stock", 0)
+        async for doc in listings_collection.find({"_id": {"$in": list(quantities)}}, {"stock": 1})
+    }
+    short = next((oid for oid, qty in quantities.items() if stock.get(oid, 0) < qty), next(iter(quantities)))
+    raise OutOfStockError(short)
+
+
+async def _give_back(quantities: dict, session=None):
+    if quantities:
+        await listings_collection.bulk_write([
+            UpdateOne({"_id": oid}, {"$inc": {"stock": qty}}) for oid, qty in quantities.items()
+        ], session=session)
+
+
+async def _take(quantities: dict, session=None):
+    if len(quantities) == 1:
+        (oid, qty), = quantities.items()
+        await _take_one(oid, qty, session=session)
+    else:
+        await _take_many(quantities, session=session)
+
+
+def _items(quantities: dict) -> list:
+    return [{"listing_id": oid, "quantity": qty} for oid, qty in quantities.items()]
+
+
+def _quantities(doc) -> dict:
+    return {item["listing_id"]: item["quantity"] for item in doc["items"]}
+
+
+# ---------- public API ----------
+
+async def hold(quantities: dict, owner: str | None = None, ttl_s: float = RESERVATION_TTL_S):
+    """
+    Take stock for {listing ObjectId: quantity} and record a hold.
+    Returns the reservation id. Raises OutOfStockError (nothing taken).
+    """
+    now = datetime.utcnow()
+    doc = {
+        "items": _items(quantities),
+        "owner": owner,
+        "status": "held",
+        "created_at": now,
+        "expires_at": now + timedelta(seconds=ttl_s),
+    }
+
+    async def _hold_in_transaction(session):
+        await _take(quantities, session=session)
+        return await reservations_collection.insert_one(doc, session=session)
+
+    try:
+        if await supports_transactions():
+            # stock and the hold record commit together: no leak window.
+            # with_transaction retries write conflicts with other checkouts
+            # of the same listings (TransientTransactionError) by itself
+            async with await client.start_session() as session:
+                try:
+                    res = await session.with_transaction(_hold_in_transaction)
+                except PyMongoError as e:
+                    if not e.has_error_label("TransientTransactionError"):
+                        raise
+                    # still conflicting after with_transaction gave up: the
+                    # listing is too contended to sell right now
+                    raise OutOfStockError(next(iter(quantities)))
+        else:
+            # stock first: a crash before the insert under-sells, never over-sells
+            await _take(quantities)
+            try:
+                res = await reservations_collection.insert_one(doc)
+            except Exception:
+                await _give_back(quantities)
+                raise
+    finally:
+        listing_cache.invalidate_many(quantities)
+
+    return res.inserted_id
+
+
+async def _finish(reservation_id, status: str):
+    now = datetime.utcnow()
+    return await reservations_collection.find_one_and_update(
+        {"_id": reservation_id, "status": "held"},
+        {"$set": {
+            "status": status,
+            "finished_at": now,
+            "purge_at": now + timedelta(seconds=RESERVATION_RETENTION_S),
+        }},
+        projection={"items": 1},
+    )
+
+
+async def commit(reservation_id):
+    """Make a hold permanent. Raises ReservationError if it is no longer held."""
+    if await _finish(reservation_id, "committed") is None:
+        raise ReservationError("Reservation expired or already finished")
+
+
+async def release(reservation_id) -> bool:
+    """Cancel a hold and return its stock. False if it was not held anymore."""
+    doc = await _finish(reservation_id, "released")
+    if doc is None:
+        return False
+    quantities = _quantities(doc)
+    await _give_back(quantities)
+    listing_cache.invalidate_many(quantities)
+    return True
+
+
+async def sweep_expired() -> int:
+    """Expire overdue holds and return their stock. Returns how many were expired."""
+    expired = 0
+    while True:
+        now = datetime.utcnow()
+        # claim one at a time: concurrent sweepers (other workers) never double-restore
+        doc = await reservations_collection.find_one_and_update(
+            {"status": "held", "expires_at": {"$lt": now}},
+            {"$set": {
+                "status": "expired",
+                "finished_at": now,
+                "purge_at": now + timedelta(seconds=RESERVATION_RETENTION_S),
+            }},
+            projection={"items": 1},
+        )
+        if doc is None:
+            return expired
+        quantities = _quantities(doc)
+        await _give_back(quantities)
+        listing_cache.invalidate_many(quantities)
+        expired += 1
+
+
+async def run_sweeper():
+    """Background task (started from the app lifespan)."""
+    while True:
+        try:
+            count = await sweep_expired()
+            if count:
+                print(f"[reservations] expired {count} hold(s)")
+        except Exception as e:
+            print("⚠ [reservations] sweep failed:", e)
+        await asyncio.sleep(RESERVATION_SWEEP_INTERVAL_S)
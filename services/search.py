@@ -0,0 +1,483 @@
+# backend/services/search.py
+"""
+Marketplace search: relevance-ranked text query over listing title + tags,
+with facet counts (category, condition, price bucket) for the same matches.
+
+    page = await search(listings_collection, "iphone battery", filters, limit=20)
+
+Two backends (SEARCH_BACKEND):
+    text   - Mongo $text on the title_tags_text index (db_indexes.py). The
+             page, the total and every facet come from one aggregation:
+             $match -> $project -> $facet. Without a query there is no
+             relevance to rank by: the facets are still one aggregation, but
+             the page is a plain find() in _id order, which an index serves
+             ($facet sub-pipelines can't use indexes, so sorting the whole
+             collection in there would be an in-memory sort).
+    memory - an in-process inverted index of title/tags terms plus the
+             facet fields, built from `listings` at startup and kept up to
+             date by the listing write paths (index_listing / remove_listing).
+             Matching ids are ranked here; the page itself is one $in read.
+    auto   - text when the index exists, memory otherwise (default). The
+             index is re-checked every SEARCH_REFRESH_S, so once
+             reconcile_indexes has built it the app moves over to it.
+
+Both rank by term weight (title counts SEARCH_TITLE_WEIGHT times a tag),
+newest first on ties; a query matches listings containing any of its terms.
+Mongo also stems words, the memory index only lower-cases them, so rankings
+are close but not identical. The memory index sees writes made by this
+process right away and writes made by other workers after the next
+rebuild (every SEARCH_REFRESH_S).
+"""
+import asyncio
+import heapq
+import math
+import os
+import re
+import time
+from bisect import bisect_left, bisect_right, insort
+
+from pymongo.errors import OperationFailure
+
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto").lower()  # auto | text | memory
+SEARCH_REFRESH_S = float(os.getenv("SEARCH_REFRESH_S", "300"))
+SEARCH_TITLE_WEIGHT = int(os.getenv("SEARCH_TITLE_WEIGHT", "3"))
+# lower bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = [float(b) for b in os.getenv("SEARCH_PRICE_BUCKETS", "0,500,1000,2500,5000,10000,25000").split(",")]
+
+TEXT_INDEX_NAME = "title_tags_text"
+SEARCH_PROJECTION = {
+    "title": 1, "price": 1, "condition": 1, "stock": 1, "category": 1,
+    "image_url": 1, "tags": 1, "owner_email": 1,
+}
+
+# roughly what Mongo's english text index ignores
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from in is it of on or that the this to with".split()
+)
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text) -> list:
+    return [t for t in _TOKEN.findall((text or "").lower()) if t not in STOP_WORDS]
+
+
+def price_bucket(price):
+    """Index into PRICE_BUCKETS, None for missing/negative prices (not counted)."""
+    if not isinstance(price, (int, float)) or price < PRICE_BUCKETS[0]:
+        return None
+    return bisect_right(PRICE_BUCKETS, price) - 1
+
+
+def _bucket_facet(counts: dict) -> list:
+    return [
+        {
+            "min": PRICE_BUCKETS[i],
+            "max": PRICE_BUCKETS[i + 1] if i + 1 < len(PRICE_BUCKETS) else None,
+            "count": counts[i],
+        }
+        for i in sorted(counts)
+    ]
+
+
+def _value_facet(counts: dict) -> list:
+    return [
+        {"value": value, "count": count}
+        for value, count in sorted(counts.items(), key=lambda kv: (-kv[1], str(kv[0])))
+    ]
+
+
+# ---------- in-process inverted index ----------
+
+class InvertedIndex:
+    """
+    Listings are numbered as they are added (the rebuild adds them in _id
+    order, new listings get the next number), and everything inside works
+    on those numbers: ObjectId hashing and comparison run in Python and
+    would dominate a query otherwise. Number order is _id order, which is
+    what ties and browsing sort by.
+    """
+
+    def __init__(self):
+        self._numbers: dict = {}   # ObjectId -> number
+        self._oids: dict = {}      # number -> ObjectId
+        self._next = 0
+        self._postings: dict = {}  # term -> {number: weight}
+        self._docs: dict = {}      # number -> (category, condition, price, price bucket, terms)
+        # browsing (no query) never scores: the page comes off _order and
+        # the facets off _counts, both kept up to date by add/remove
+        self._order: list = []     # numbers, ascending
+        self._counts: dict = {}    # (category, condition) -> [listings, {price bucket: listings}]
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _count(self, category, condition, bucket, delta: int):
+        entry = self._counts.setdefault((category, condition), [0, {}])
+        entry[0] += delta
+        if bucket is not None:
+            entry[1][bucket] = entry[1].get(bucket, 0) + delta
+            if not entry[1][bucket]:
+                del entry[1][bucket]
+        if not entry[0]:
+            del self._counts[(category, condition)]
+
+    def add(self, doc):
+        oid = doc["_id"]
+        number = self._numbers.get(oid)
+        if number is None:
+            number = self._numbers[oid] = self._next
+            self._oids[number] = oid
+            self._next += 1
+        else:
+            self._unindex(number)  # an edit keeps its place in _id order
+
+        weights = {}
+        for term in tokenize(doc.get("title")):
+            weights[term] = weights.get(term, 0) + SEARCH_TITLE_WEIGHT
+        for tag in doc.get("tags") or []:
+            for term in tokenize(tag):
+                weights[term] = weights.get(term, 0) + 1
+        for term, weight in weights.items():
+            self._postings.setdefault(term, {})[number] = weight
+
+        category, condition, price = doc.get("category"), doc.get("condition"), doc.get("price")
+        bucket = price_bucket(price)
+        self._docs[number] = (category, condition, price, bucket, tuple(weights))
+        insort(self._order, number)  # an append, except for edits
+        self._count(category, condition, bucket, 1)
+
+    def remove(self, oid):
+        number = self._numbers.pop(oid, None)
+        if number is not None:
+            self._unindex(number)
+            del self._oids[number]
+
+    def _unindex(self, number: int):
+        category, condition, _, bucket, terms = self._docs.pop(number)
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(number, None)
+                if not posting:
+                    del self._postings[term]
+        del self._order[bisect_left(self._order, number)]
+        self._count(category, condition, bucket, -1)
+
+    def _browse(self, category, condition, limit: int, offset: int):
+        """No query and no price range: newest first, facets from the running counts."""
+        total, categories, conditions, buckets = 0, {}, {}, {}
+        for (doc_category, doc_condition), (count, doc_buckets) in self._counts.items():
+            if (category and doc_category != category) or (condition and doc_condition != condition):
+                continue
+            total += count
+            categories[doc_category] = categories.get(doc_category, 0) + count
+            conditions[doc_condition] = conditions.get(doc_condition, 0) + count
+            for bucket, n in doc_buckets.items():
+                buckets[bucket] = buckets.get(bucket, 0) + n
+
+        wanted = offset + limit
+        if category or condition:
+            page = []
+            for number in reversed(self._order):
+                doc_category, doc_condition = self._docs[number][:2]
+                if (category and doc_category != category) or (condition and doc_condition != condition):
+                    continue
+                page.append(number)
+                if len(page) == wanted:
+                    break
+        else:
+            page = self._order[-wanted:][::-1] if wanted else []
+
+        facets = {
+            "category": _value_facet(categories),
+            "condition": _value_facet(conditions),
+            "price": _bucket_facet(buckets),
+        }
+        return [(0.0, self._oids[number]) for number in page[offset:]], total, facets
+
+    def search(self, query: str, filters: dict, limit: int, offset: int):
+        """([(score, id)] of the page, best first; total; facets)."""
+        if not query and filters.get("min_price") is None and filters.get("max_price") is None:
+            return self._browse(filters.get("category"), filters.get("condition"), limit, offset)
+
+        if query:
+            # a query of stop words only matches nothing, as with $text
+            scores = {}
+            total_docs = len(self._docs)
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + total_docs / len(posting))
+                for number, weight in posting.items():
+                    scores[number] = scores.get(number, 0.0) + weight * idf
+        else:
+            scores = dict.fromkeys(self._docs, 0.0)
+
+        category = filters.get("category")
+        condition = filters.get("condition")
+        min_price = filters.get("min_price")
+        max_price = filters.get("max_price")
+        docs = self._docs
+
+        matches = []
+        categories, conditions, buckets = {}, {}, {}
+        for number, score in scores.items():
+            doc_category, doc_condition, price, bucket, _ = docs[number]
+            if category and doc_category != category:
+                continue
+            if condition and doc_condition != condition:
+                continue
+            if min_price is not None or max_price is not None:
+                if not isinstance(price, (int, float)):
+                    continue
+                if (min_price is not None and price < min_price) or (max_price is not None and price > max_price):
+                    continue
+            matches.append((score, number))
+            categories[doc_category] = categories.get(doc_category, 0) + 1
+            conditions[doc_condition] = conditions.get(doc_condition, 0) + 1
+            if bucket is not None:
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+
+        page = heapq.nlargest(offset + limit, matches)[offset:]
+        facets = {
+            "category": _value_facet(categories),
+            "condition": _value_facet(conditions),
+            "price": _bucket_facet(buckets),
+        }
+        return [(score, self._oids[number]) for score, number in page], len(matches), facets
+
+
+class _State:
+    backend = "memory" if SEARCH_BACKEND == "memory" else "text"
+    index: InvertedIndex | None = None
+    building = False
+    pending: list = []   # writes seen while a rebuild was reading the collection
+    builds = 0
+    last_build_s = None
+    last_error = None
+    maintainer: asyncio.Task | None = None
+
+
+_build_lock = asyncio.Lock()
+
+
+def _collection():
+    from database import db
+    return db["listings"]
+
+
+async def _build_index():
+    started = time.perf_counter()
+    _State.building = True
+    _State.pending = []
+    try:
+        index = InvertedIndex()
+        # _id order, so listing numbers follow it (see InvertedIndex)
+        cursor = _collection().find(
+            {}, {"title": 1, "tags": 1, "category": 1, "condition": 1, "price": 1}
+        ).sort("_id", 1)
+        async for doc in cursor.batch_size(5000):
+            index.add(doc)
+        # replay what the request handlers wrote while we were reading
+        for op, arg in _State.pending:
+            if op == "add":
+                index.add(arg)
+            else:
+                index.remove(arg)
+        _State.index = index
+    finally:
+        _State.building = False
+        _State.pending = []
+    _State.builds += 1
+    _State.last_build_s = round(time.perf_counter() - started, 3)
+
+
+def index_listing(doc):
+    """Call after inserting/replacing a listing (doc includes _id)."""
+    if _State.building:
+        _State.pending.append(("add", doc))
+    if _State.index is not None:
+        _State.index.add(doc)
+
+
+def remove_listing(oid):
+    """Call after deleting a listing."""
+    if _State.building:
+        _State.pending.append(("remove", oid))
+    if _State.index is not None:
+        _State.index.remove(oid)
+
+
+async def _has_text_index() -> bool:
+    return TEXT_INDEX_NAME in await _collection().index_information()
+
+
+async def refresh():
+    """Pick the backend (auto) and rebuild the memory index if it is in use."""
+    try:
+        if SEARCH_BACKEND == "auto":
+            _State.backend = "text" if await _has_text_index() else "memory"
+        if _State.backend == "memory":
+            async with _build_lock:
+                await _build_index()
+        else:
+            _State.index = None
+        _State.last_error = None
+    except Exception as e:
+        _State.last_error = f"{type(e).__name__}: {e}"
+        print("⚠ [search] refresh failed:", e)
+
+
+async def _maintain():
+    while True:
+        await refresh()
+        if SEARCH_BACKEND == "text":
+            return
+        await asyncio.sleep(SEARCH_REFRESH_S)
+
+
+def start():
+    """
+    Choose the backend and build the memory index in the background (called
+    from the app lifespan); a search arriving before the build is done waits for it.
+    """
+    if _State.maintainer is None or _State.maintainer.done():
+        _State.maintainer = asyncio.create_task(_maintain())
+
+
+async def stop():
+    if _State.maintainer is not None:
+        _State.maintainer.cancel()
+        try:
+            await _State.maintainer
+        except asyncio.CancelledError:
+            pass
+        _State.maintainer = None
+
+
+# ---------- queries ----------
+
+def _match(query: str, filters: dict) -> dict:
+    match = {}
+    if query:
+        match["$text"] = {"$search": query}
+    if filters.get("category"):
+        match["category"] = filters["category"]
+    if filters.get("condition"):
+        match["condition"] = filters["condition"]
+    if filters.get("min_price") is not None or filters.get("max_price") is not None:
+        match["price"] = {}
+        if filters.get("min_price") is not None:
+            match["price"]["$gte"] = filters["min_price"]
+        if filters.get("max_price") is not None:
+            match["price"]["$lte"] = filters["max_price"]
+    return match
+
+
+FACET_FIELDS = {"category": 1, "condition": 1, "price": 1}
+
+
+def _facet_pipeline(query: str, filters: dict, limit: int, offset: int) -> list:
+    """$text query: page + total + facets. No query: total + facets only."""
+    facets = {
+        "total": [{"$count": "n"}],
+        "category": [{"$sortByCount": "$category"}],
+        "condition": [{"$sortByCount": "$condition"}],
+        "price": [{"$bucket": {
+            "groupBy": "$price",
+            "boundaries": PRICE_BUCKETS + [math.inf],
+            "default": "other",
+        }}],
+    }
+    if not query:
+        return [{"$match": _match(query, filters)}, {"$project": FACET_FIELDS}, {"$facet": facets}]
+
+    facets["results"] = [
+        {"$sort": {"score": -1, "_id": -1}},
+        {"$skip": offset},
+        {"$limit": limit},
+    ]
+    # project before $facet: every sub-pipeline then works on small docs
+    return [
+        {"$match": _match(query, filters)},
+        {"$project": {**SEARCH_PROJECTION, "score": {"$meta": "textScore"}}},
+        {"$facet": facets},
+    ]
+
+
+async def _search_text(collection, query, filters, limit, offset):
+    aggregation = collection.aggregate(_facet_pipeline(query, filters, limit, offset), allowDiskUse=True)
+    if query:
+        out = (await aggregation.to_list(length=1))[0]
+        results = out["results"]
+    else:
+        # newest first straight off the _id (or filter + _id) index
+        page = (
+            collection.find(_match(query, filters), SEARCH_PROJECTION)
+            .sort("_id", -1)
+            .skip(offset)
+            .limit(limit)
+        )
+        out, results = await asyncio.gather(aggregation.to_list(length=1), page.to_list(length=limit))
+        out = out[0]
+    buckets = {
+        PRICE_BUCKETS.index(b["_id"]): b["count"]
+        for b in out["price"] if b["_id"] != "other"
+    }
+    facets = {
+        "category": _value_facet({c["_id"]: c["count"] for c in out["category"]}),
+        "condition": _value_facet({c["_id"]: c["count"] for c in out["condition"]}),
+        "price": _bucket_facet(buckets),
+    }
+    total = out["total"][0]["n"] if out["total"] else 0
+    return results, total, facets
+
+
+async def _search_memory(collection, query, filters, limit, offset):
+    index = _State.index
+    if index is None:  # startup build still running (or not started)
+        async with _build_lock:
+            if _State.index is None:
+                await _build_index()
+        index = _State.index
+    page, total, facets = index.search(query, filters, limit, offset)
+    ids = [oid for _, oid in page]
+    docs = await collection.find({"_id": {"$in": ids}}, SEARCH_PROJECTION).to_list(length=len(ids))
+    by_id = {doc["_id"]: doc for doc in docs}
+    results = []
+    for score, oid in page:
+        doc = by_id.get(oid)
+        if doc is None:
+            continue  # deleted by another worker since the last rebuild
+        if query:
+            doc["score"] = score
+        results.append(doc)
+    return results, total, facets
+
+
+async def search(collection, query: str, filters: dict, limit: int = 20, offset: int = 0):
+    """(listing docs of the page, total matches, facets, backend used)."""
+    query = (query or "").strip()
+    if _State.backend == "text":
+        try:
+            docs, total, facets = await _search_text(collection, query, filters, limit, offset)
+            return docs, total, facets, "text"
+        except OperationFailure as e:
+            if SEARCH_BACKEND != "auto" or e.code != 27:  # 27: text index required
+                raise
+            print("⚠ [search] text index missing, falling back to the in-process index")
+            _State.backend = "memory"
+    docs, total, facets = await _search_memory(collection, query, filters, limit, offset)
+    return docs, total, facets, "memory"
+
+
+def stats() -> dict:
+    return {
+        "backend": _State.backend,
+        "configured": SEARCH_BACKEND,
+        "memory_index_docs": len(_State.index) if _State.index is not None else None,
+        "builds": _State.builds,
+        "last_build_s": _State.last_build_s,
+        "last_error": _State.last_error,
+    }
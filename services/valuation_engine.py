@@ -1,38 +1,13 @@
 # backend/services/valuation_engine.py
-from schemas.valuation import ValueEstimateRequest
-
-
-# --- RULE TABLES ---
+import numpy as np
 
-CATEGORY_BASE_PRICE = {
-    "mobile": 250.0,   # base scrap / resale value in INR
-    "laptop": 800.0,
-    "tv": 500.0,
-    "tablet": 400.0,
-    "accessory": 100.0,
-    "other": 150.0,
-}
-
-CONDITION_MULTIPLIER = {
-    "working": 1.4,     # more value if device is working
-    "repairable": 1.0,  # normal
-    "dead": 0.6,        # only parts/scrap
-}
+from schemas.valuation import ValueEstimateRequest
+from services.pricing_tables import PricingTables, current_tables
 
-BRAND_MULTIPLIER = {
-    "tier1": 1.1,   # Apple, Samsung, Dell, etc.
-    "tier2": 1.0,   # mid-range brands
-    "local": 0.9,   # unbranded / very low-end
-}
 
-REFERENCE_WEIGHT = {
-    "mobile": 0.18,   # in kg (approx)
-    "laptop": 2.0,
-    "tv": 8.0,
-    "tablet": 0.5,
-    "accessory": 0.1,
-    "other": 1.0,
-}
+# Rule tables live in services/pricing_tables.py (versioned, hot-reloaded).
+# A request or batch takes one snapshot via current_tables() and uses only
+# that, so a concurrent table swap can never mix two versions in one result.
 
 
 def _age_factor(age_years: float,
@@ -46,7 +21,7 @@ def _age_factor(age_years: float,
     return 1.0 - discount
 
 
-def _weight_factor(category: str, weight_kg: float | None) -> float:
+def _weight_factor(ref: float, weight_kg: float | None) -> float:
     """
     Adjust value based on how heavy/light it is compared to the reference.
     If weight is None, we don't adjust.
@@ -54,13 +29,12 @@ def _weight_factor(category: str, weight_kg: float | None) -> float:
     if weight_kg is None:
         return 1.0
 
-    ref = REFERENCE_WEIGHT.get(category, REFERENCE_WEIGHT["other"])
     ratio = max(weight_kg / ref, 0.2)  # avoid too small values
     # use a soft exponent so it doesn't explode
     return ratio ** 0.7
 
 
-def _component_bonus(components) -> float:
+def _component_bonus(components, tables: PricingTables) -> float:
     """
     Optional extra bonus based on valuable components.
     Example: if user says "battery:0.3, motherboard:0.4, screen:0.3",
@@ -71,40 +45,12 @@ def _component_bonus(components) -> float:
 
     bonus = 0.0
     for c in components:
-        name = c.name.lower()
-        pct = c.percentage
-        if "motherboard" in name or "pcb" in name:
-            bonus += 80 * pct
-        elif "screen" in name or "display" in name:
-            bonus += 60 * pct
-        elif "battery" in name:
-            bonus += 40 * pct
-        else:
-            bonus += 20 * pct
+        bonus += tables.component_rate(c.name) * c.percentage
     return bonus
 
 
-def estimate_value(request: ValueEstimateRequest) -> dict:
-    """
-    Main rule-based valuation function.
-    Returns a dict that matches ValueEstimateResponse.
-    """
-
-    category = request.category
-    condition = request.condition
-    brand_tier = request.brand_tier
-
-    base_price = CATEGORY_BASE_PRICE.get(category, CATEGORY_BASE_PRICE["other"])
-    condition_mult = CONDITION_MULTIPLIER[condition]
-    brand_mult = BRAND_MULTIPLIER[brand_tier]
-    age_fact = _age_factor(request.age_years)
-    weight_fact = _weight_factor(category, request.weight_kg)
-    comp_bonus = _component_bonus(request.components)
-
-    # core multiplicative model
-    value = base_price * condition_mult * brand_mult * age_fact * weight_fact
-    value += comp_bonus  # add bonus linearly
-
+def _result(tables: PricingTables, location: int,
+            base_price, condition_mult, brand_mult, age_fact, weight_fact, comp_bonus, value) -> dict:
     final_value = max(round(value, 2), 0.0)
 
     breakdown = {
@@ -116,10 +62,113 @@ def estimate_value(request: ValueEstimateRequest) -> dict:
         "component_bonus": round(comp_bonus, 2),
         "final_value": final_value,
         "currency": "INR",
+        "location": tables.locations[location] or None,
     }
 
     return {
         "estimated_value": final_value,
         "currency": "INR",
         "breakdown": breakdown,
+        "table_version": tables.version,
     }
+
+
+def estimate_value(request: ValueEstimateRequest, tables: PricingTables | None = None) -> dict:
+    """
+    Main rule-based valuation function.
+    Returns a dict that matches ValueEstimateResponse.
+    """
+    tables = tables or current_tables()
+
+    category = tables.category_index(request.category)
+    condition = tables.condition_code[request.condition]
+    brand_tier = tables.brand_code[request.brand_tier]
+    location = tables.location_index(request.location)
+
+    base_price = tables.base_price_rows[location][category]
+    condition_mult = tables.condition_mult_rows[location][condition]
+    brand_mult = tables.brand_mult_rows[location][brand_tier]
+    age_fact = _age_factor(request.age_years, tables.discount_per_year, tables.max_discount)
+    weight_fact = _weight_factor(tables.ref_weight_row[category], request.weight_kg)
+    comp_bonus = _component_bonus(request.components, tables)
+
+    # core multiplicative model
+    value = base_price * condition_mult * brand_mult * age_fact * weight_fact
+    value += comp_bonus  # add bonus linearly
+
+    return _result(tables, location, base_price, condition_mult, brand_mult, age_fact, weight_fact,
+                   comp_bonus, value)
+
+
+# --- COLUMNAR (batch) ---
+#
+# estimate_values() prices many requests at once: categorical fields and the
+# location become integer codes into the compiled table arrays, and the
+# factors are computed over whole arrays. Every float operation is the one
+# estimate_value() performs, in the same order, so results are bit-for-bit
+# identical (checked by scripts/parity_valuation.py). Two spots stay scalar
+# on purpose:
+#   - x ** 0.7: np.power may use a SIMD pow that differs from libm in the
+#     last bit, so it is applied per *distinct* ratio with Python's **
+#   - rounding: np.round is not Python's correctly-rounded round()
+
+
+def _age_factors(age_years: np.ndarray, discount_per_year: float, max_discount: float) -> np.ndarray:
+    return 1.0 - np.minimum(age_years * discount_per_year, max_discount)
+
+
+def _weight_factors(ref: np.ndarray, weight_kg: np.ndarray) -> np.ndarray:
+    """weight_kg is NaN where the request had no weight (factor 1.0)."""
+    factors = np.ones(len(weight_kg), dtype=np.float64)
+    known = ~np.isnan(weight_kg)
+    if known.any():
+        ratio = np.maximum(weight_kg[known] / ref[known], 0.2)
+        distinct, inverse = np.unique(ratio, return_inverse=True)
+        factors[known] = np.array([r ** 0.7 for r in distinct.tolist()], dtype=np.float64)[inverse]
+    return factors
+
+
+def _component_bonuses(requests: list, tables: PricingTables) -> np.ndarray:
+    rows, rates, shares = [], [], []
+    for i, request in enumerate(requests):
+        for c in request.components or ():
+            rows.append(i)
+            rates.append(tables.component_rate(c.name))
+            shares.append(c.percentage)
+    if not rows:
+        return np.zeros(len(requests), dtype=np.float64)
+    # bincount adds each row's terms in order starting from 0.0, like the loop
+    weights = np.array(rates, dtype=np.float64) * np.array(shares, dtype=np.float64)
+    return np.bincount(rows, weights=weights, minlength=len(requests))
+
+
+def estimate_values(requests: list, tables: PricingTables | None = None) -> list:
+    """
+    Batch version of estimate_value(): one result dict per request, in order,
+    identical to calling estimate_value() on each with the same tables.
+    """
+    tables = tables or current_tables()
+    n = len(requests)
+    if n == 0:
+        return []
+
+    category = np.fromiter((tables.category_index(r.category) for r in requests), dtype=np.intp, count=n)
+    condition = np.fromiter((tables.condition_code[r.condition] for r in requests), dtype=np.intp, count=n)
+    brand = np.fromiter((tables.brand_code[r.brand_tier] for r in requests), dtype=np.intp, count=n)
+    location = np.fromiter((tables.location_index(r.location) for r in requests), dtype=np.intp, count=n)
+    age_years = np.fromiter((r.age_years for r in requests), dtype=np.float64, count=n)
+    weight_kg = np.fromiter((np.nan if r.weight_kg is None else r.weight_kg for r in requests),
+                            dtype=np.float64, count=n)
+
+    base_price = tables.base_price[location, category]
+    condition_mult = tables.condition_mult[location, condition]
+    brand_mult = tables.brand_mult[location, brand]
+    age_fact = _age_factors(age_years, tables.discount_per_year, tables.max_discount)
+    weight_fact = _weight_factors(tables.ref_weight[category], weight_kg)
+    comp_bonus = _component_bonuses(requests, tables)
+
+    value = base_price * condition_mult * brand_mult * age_fact * weight_fact
+    value += comp_bonus
+
+    columns = (location, base_price, condition_mult, brand_mult, age_fact, weight_fact, comp_bonus, value)
+    return [_result(tables, *row) for row in zip(*(column.tolist() for column in columns))]
@@ -0,0 +1,101 @@
+# backend/services/valuation_memo.py
+# Memoized /valuation/estimate quotes.
+#
+# The frontend re-quotes on every form change, so the same few requests
+# arrive over and over. Quotes are cached as ready-to-send JSON bytes, so a
+# hit skips both estimate_value() and response-model validation.
+#
+# Key = normalized request + pricing table version:
+#   - age_years rounded to VALUATION_MEMO_AGE_DECIMALS
+#   - components lower-cased and sorted (order doesn't matter to the rules)
+#   - location normalized like the pricing tables match it
+# A miss prices the *normalized* request, so a cached quote is always
+# exactly what its key computes to, whichever request filled it. Every
+# pricing path prices the normalized request - with the memo off
+# (VALUATION_MEMO_MAX_ENTRIES=0) and in the batch / upload endpoints too -
+# so a quote never depends on whether it was cached or how it was sent.
+# The cache is cleared whenever the pricing tables are swapped.
+import os
+from collections import OrderedDict
+
+from schemas.valuation import ComponentShare, ValueEstimateRequest, ValueEstimateResponse
+from services import pricing_tables
+from services.valuation_engine import estimate_value
+
+VALUATION_MEMO_MAX_ENTRIES = int(os.getenv("VALUATION_MEMO_MAX_ENTRIES", "10000"))
+VALUATION_MEMO_AGE_DECIMALS = int(os.getenv("VALUATION_MEMO_AGE_DECIMALS", "2"))
+
+
+def normalize(request: ValueEstimateRequest, age_decimals: int = VALUATION_MEMO_AGE_DECIMALS):
+    """(key tuple, equivalent request to price)."""
+    age_years = round(request.age_years, age_decimals)
+    components = tuple(sorted((c.name.lower(), c.percentage) for c in request.components or ()))
+    location = pricing_tables.normalize_location(request.location)
+
+    key = (request.category, request.condition, request.brand_tier, age_years,
+           request.weight_kg, components, location)
+    normalized = ValueEstimateRequest.model_construct(
+        category=request.category,
+        condition=request.condition,
+        brand_tier=request.brand_tier,
+        age_years=age_years,
+        weight_kg=request.weight_kg,
+        components=[ComponentShare.model_construct(name=n, percentage=p) for n, p in components] or None,
+        location=location or None,
+    )
+    return key, normalized
+
+
+def _serialize(result: dict) -> bytes:
+    return ValueEstimateResponse.model_validate(result).model_dump_json().encode()
+
+
+class ValuationMemo:
+    def __init__(self, max_entries: int = VALUATION_MEMO_MAX_ENTRIES):
+        self.max_entries = max(0, max_entries)
+        self._data: OrderedDict = OrderedDict()  # (version, *key) -> JSON bytes
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def quote(self, request: ValueEstimateRequest) -> bytes:
+        """Serialized ValueEstimateResponse for request."""
+        tables = pricing_tables.current_tables()
+        key, normalized = normalize(request)
+        if not self.max_entries:
+            return _serialize(estimate_value(normalized, tables))
+
+        # the version in the key covers a swap between clear() and this lookup
+        key = (tables.version,) + key
+        body = self._data.get(key)
+        if body is not None:
+            self._data.move_to_end(key)
+            self.hits += 1
+            return body
+
+        self.misses += 1
+        body = _serialize(estimate_value(normalized, tables))
+        self._data[key] = body
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+        return body
+
+    def clear(self, *_):
+        self._data.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "age_decimals": VALUATION_MEMO_AGE_DECIMALS,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+valuation_memo = ValuationMemo()
+pricing_tables.on_change(valuation_memo.clear)
@@ -0,0 +1,67 @@
+# backend/utils/auth_cache.py
+# Caches behind auth.current_user, so authenticated requests need neither a
+# signature check nor a Mongo lookup for identity in the common case.
+#
+#   claims - decoded JWT claims keyed by the token's signature bytes. An
+#            entry never outlives the token's own `exp`.
+#   users  - small user projection per `sub`, AUTH_USER_CACHE_TTL_S long;
+#            profile writes call invalidate() so edits show up at once in
+#            this process.
+import os
+import time
+from collections import OrderedDict
+
+AUTH_CLAIMS_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CLAIMS_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CLAIMS_CACHE_TTL_S = float(os.getenv("AUTH_CLAIMS_CACHE_TTL_S", "300"))
+AUTH_USER_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_USER_CACHE_MAX_ENTRIES", "10000"))
+AUTH_USER_CACHE_TTL_S = float(os.getenv("AUTH_USER_CACHE_TTL_S", "60"))
+
+
+class TtlCache:
+    """LRU with a per-entry deadline (time.time() seconds)."""
+
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self._data: OrderedDict = OrderedDict()  # key -> (deadline, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, value, deadline: float | None = None):
+        if not self.max_entries:
+            return
+        limit = time.time() + self.ttl_s
+        self._data[key] = (limit if deadline is None else min(deadline, limit), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+claims_cache = TtlCache(AUTH_CLAIMS_CACHE_MAX_ENTRIES, AUTH_CLAIMS_CACHE_TTL_S)
+user_cache = TtlCache(AUTH_USER_CACHE_MAX_ENTRIES, AUTH_USER_CACHE_TTL_S)
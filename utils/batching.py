@@ -0,0 +1,138 @@
+# backend/utils/batching.py
+import asyncio
+import time
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue is at capacity (caller should shed load)."""
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching queue.
+
+    Callers `submit()` one item and await its result. A single worker task
+    drains the queue: it waits for the first item, then keeps collecting
+    until it has `max_batch` items or `max_wait_ms` has passed, and runs
+    `batch_fn(items)` once in a background thread. `batch_fn` must return
+    one result per item, in the same order.
+
+    Because there is only one worker, calls into `batch_fn` never overlap,
+    so a shared (non thread-safe) model is only ever used by one thread.
+    """
+
+    def __init__(self, batch_fn, max_batch: int = 8, max_wait_ms: float = 10.0,
+                 queue_depth: int = 64):
+        self.batch_fn = batch_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.queue_depth = max(1, queue_depth)
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._batch: list = []  # entries taken off the queue and not answered yet
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue(maxsize=self.queue_depth)
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        # fail anything still waiting - queued, being collected or in the
+        # cancelled predict call - so callers don't hang forever
+        pending, self._batch = self._batch, []
+        if self._queue is not None:
+            while not self._queue.empty():
+                pending.append(self._queue.get_nowait())
+        self._queue = None
+        for _, fut, _ in pending:
+            if not fut.done():
+                fut.set_exception(RuntimeError("Inference queue shut down"))
+
+    # ---------- public API ----------
+
+    async def submit(self, item):
+        """
+        Enqueue one item and wait for its result.
+        Returns (result, queue_ms, compute_ms).
+        Raises QueueFullError if the queue is full.
+        """
+        self.start()
+        fut = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((item, fut, time.perf_counter()))
+        except asyncio.QueueFull:
+            raise QueueFullError("Inference queue is full")
+        return await fut
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "queue_depth": self.queue_depth,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+    # ---------- worker ----------
+
+    async def _collect(self):
+        """
+        Block for the first item, then gather more until full or timed out.
+        Collects into self._batch, so stop() can fail whatever it holds.
+        """
+        batch = self._batch = []
+        batch.append(await self._queue.get())
+        deadline = time.perf_counter() + self.max_wait
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+
+            # drop callers that already went away (client disconnect / cancel)
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            items = [item for item, _, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = list(await asyncio.to_thread(self.batch_fn, items))
+                if len(results) != len(items):
+                    # zip() would leave the extra callers waiting forever
+                    raise RuntimeError(
+                        f"batch_fn returned {len(results)} results for {len(items)} inputs"
+                    )
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                self._batch = []
+                continue
+            finished = time.perf_counter()
+
+            compute_ms = (finished - started) * 1000.0
+            for (_, fut, enqueued), result in zip(batch, results):
+                if not fut.done():
+                    queue_ms = (started - enqueued) * 1000.0
+                    fut.set_result((result, queue_ms, compute_ms))
+            self._batch = []
@@ -0,0 +1,85 @@
+# backend/utils/body_limit.py
+# Hard request body limits for upload endpoints, enforced while the body
+# arrives. A route's own size check runs too late for this: with an
+# `UploadFile = File(...)` parameter, Starlette has parsed and spooled the
+# whole multipart body before the handler is called.
+#
+#   app.add_middleware(BodyLimitMiddleware, limits={"/classify": 15 * 1024 * 1024})
+#
+# A declared Content-Length over the limit is answered with 413 without
+# reading anything. Otherwise (no Content-Length, chunked, or a lying one)
+# the bytes are counted as they are received and the request is cut off
+# with 413 as soon as it goes over; whatever the app tried to answer after
+# that is dropped.
+import json
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class BodyLimitMiddleware:
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = {path.rstrip("/") or "/": limit for path, limit in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http":
+            limit = self.limits.get(scope["path"].rstrip("/") or "/")
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope.get("headers") or ():
+            if name == b"content-length":
+                try:
+                    declared = int(value)
+                except ValueError:
+                    break
+                if declared > limit:
+                    await _reject(send)
+                    return
+                break
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    rejected = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected and not response_started:
+                return  # the app's answer to the cut-off body; 413 goes out instead
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if rejected and not response_started:
+            await _reject(send)
+
+
+async def _reject(send):
+    body = json.dumps({"detail": "Request body too large."}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
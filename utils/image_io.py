@@ -0,0 +1,94 @@
+# backend/utils/image_io.py
+# Upload ingestion for the classifier: bounded streaming read, header-based
+# type check, and a decode that never materializes more pixels than the
+# model will look at (YOLO letterboxes everything to imgsz anyway).
+import io
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+MODEL_IMGSZ = int(os.getenv("MODEL_IMGSZ", "640"))
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class ImageTooLargeError(Exception):
+    """Upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class UnsupportedImageError(Exception):
+    """Upload is not an image format we decode."""
+
+
+# magic bytes -> format name
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+    (b"II*\x00", "tiff"),
+    (b"MM\x00*", "tiff"),
+)
+
+
+def sniff_image_type(head: bytes):
+    """Return the image format from the first bytes of the file, or None."""
+    for magic, kind in _SIGNATURES:
+        if head.startswith(magic):
+            return kind
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+async def read_upload_limited(file, max_bytes: int = MAX_UPLOAD_BYTES, check_image: bool = True) -> bytes:
+    """
+    Read an UploadFile in chunks, stopping as soon as it goes over max_bytes
+    and (unless check_image=False) rejecting it after the first chunk if it
+    doesn't look like an image.
+    """
+    chunks = []
+    total = 0
+    while True:
+        chunk = await file.read(READ_CHUNK_BYTES)
+        if not chunk:
+            break
+        if check_image and not chunks and sniff_image_type(chunk[:16]) is None:
+            raise UnsupportedImageError("File must be a JPEG, PNG, WebP, GIF, BMP or TIFF image.")
+        total += len(chunk)
+        if total > max_bytes:
+            raise ImageTooLargeError(f"Image larger than {max_bytes // (1024 * 1024)} MB.")
+        chunks.append(chunk)
+
+    if not chunks:
+        raise UnsupportedImageError("Empty upload.")
+    return b"".join(chunks)
+
+
+def decode_for_model(image_bytes: bytes, target: int = MODEL_IMGSZ):
+    """
+    Decode straight to roughly model size and return (bgr_array, scale).
+
+    - JPEGs use PIL's draft mode, so libjpeg does the DCT at 1/2, 1/4 or 1/8
+      scale and a 48 MP photo never exists as a full-size RGB buffer.
+    - EXIF orientation is applied so phone photos aren't classified sideways.
+    - The array is BGR uint8 (what ultralytics expects for numpy input).
+    - `scale` maps boxes on the array back to original image pixels.
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    orig_long_side = max(img.size)
+
+    if img.format == "JPEG":
+        # picks the smallest DCT scale that still keeps both sides >= target
+        img.draft("RGB", (target, target))
+
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("RGB")
+    if max(img.size) > target:
+        img.thumbnail((target, target), Image.BILINEAR)
+
+    arr = np.ascontiguousarray(np.asarray(img)[..., ::-1])
+    scale = orig_long_side / max(img.size)
+    return arr, scale
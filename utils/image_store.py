@@ -0,0 +1,175 @@
+# backend/utils/image_store.py
+# Content-addressed image store.
+#
+# Images are keyed by the SHA-256 of their bytes and sharded two levels deep:
+#   media/ab/cd/abcd...ef/original.jpg
+#                        /thumb.webp     (<= 320 px)
+#                        /medium.webp    (<= 1024 px)
+# Identical uploads land on the same path, so they're stored once. Because
+# a path's content can never change, the digest doubles as a strong ETag and
+# responses can be cached forever.
+import asyncio
+import hashlib
+import io
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from utils.image_io import sniff_image_type
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "media")
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+WEBP_QUALITY = int(os.getenv("MEDIA_WEBP_QUALITY", "80"))
+
+# variant name -> longest side in px
+VARIANTS = {
+    "thumb": 320,
+    "medium": 1024,
+}
+
+_EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "gif": "gif", "bmp": "bmp", "tiff": "tiff"}
+_DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+_MEDIA_URL_RE = re.compile(r"^/media/([0-9a-f]{64})/(original|" + "|".join(VARIANTS) + r")$")
+
+_executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix="media")
+_pending: dict[tuple[str, str], asyncio.Future] = {}
+
+
+def is_digest(value: str) -> bool:
+    return bool(_DIGEST_RE.match(value))
+
+
+def _dir_for(digest: str) -> str:
+    return os.path.join(MEDIA_ROOT, digest[:2], digest[2:4], digest)
+
+
+def _original_path(digest: str):
+    folder = _dir_for(digest)
+    try:
+        for name in os.listdir(folder):
+            # in-flight writes are hidden ".*.tmp" files (see _atomic_write)
+            if name.startswith("original.") and not name.endswith(".tmp"):
+                return os.path.join(folder, name)
+    except FileNotFoundError:
+        pass
+    return None
+
+
+def path_for(digest: str, variant: str):
+    """Filesystem path of a stored variant, or None if it doesn't exist (yet)."""
+    if variant == "original":
+        return _original_path(digest)
+    path = os.path.join(_dir_for(digest), f"{variant}.webp")
+    return path if os.path.exists(path) else None
+
+
+def variant_url(digest: str, variant: str = "original") -> str:
+    return f"/media/{digest}/{variant}"
+
+
+def variant_url_for(image_url: str, variant: str) -> str:
+    """
+    Rewrite a /media/<digest>/<any> URL to the requested variant.
+    Anything else (legacy /uploads paths, external URLs) is returned as-is.
+    """
+    m = _MEDIA_URL_RE.match(image_url or "")
+    return variant_url(m.group(1), variant) if m else image_url
+
+
+def _atomic_write(path: str, data: bytes):
+    # unique per call (two writers in one process don't share it) and never
+    # named "original.*", so readers can't pick up a half-written file
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _render_variant(digest: str, variant: str) -> str:
+    path = os.path.join(_dir_for(digest), f"{variant}.webp")
+    if os.path.exists(path):
+        return path
+
+    size = VARIANTS[variant]
+    img = Image.open(_original_path(digest))
+    if img.format == "JPEG":
+        img.draft("RGB", (size, size))
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("RGBA" if img.mode in ("RGBA", "LA", "P") else "RGB")
+    img.thumbnail((size, size), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+    _atomic_write(path, buf.getvalue())
+    return path
+
+
+def _ensure_variant(digest: str, variant: str) -> asyncio.Future:
+    """Schedule (or join) rendering of one variant on the media thread pool."""
+    key = (digest, variant)
+    fut = _pending.get(key)
+    if fut is None:
+        fut = asyncio.get_running_loop().run_in_executor(_executor, _render_variant, digest, variant)
+        _pending[key] = fut
+        fut.add_done_callback(lambda f: _render_done(key, f))
+    return fut
+
+
+def _render_done(key, fut):
+    _pending.pop(key, None)
+    if not fut.cancelled() and fut.exception() is not None:
+        print(f"❌ Failed to render {key[1]} for {key[0][:12]}:", fut.exception())
+
+
+def _store_original(data: bytes, ext: str):
+    digest = hashlib.sha256(data).hexdigest()
+    if _original_path(digest) is not None:
+        return digest, False
+
+    folder = _dir_for(digest)
+    os.makedirs(folder, exist_ok=True)
+    _atomic_write(os.path.join(folder, f"original.{ext}"), data)
+    return digest, True
+
+
+async def put(data: bytes) -> str:
+    """
+    Store image bytes and return their SHA-256 digest.
+    Already-stored content is not written again. Resized variants are
+    generated in the background; readers that arrive first wait for them.
+    """
+    kind = sniff_image_type(data[:16])
+    if kind is None:
+        raise ValueError("Not an image")
+
+    digest, created = await asyncio.to_thread(_store_original, data, _EXTENSIONS[kind])
+    if created:
+        for variant in VARIANTS:
+            _ensure_variant(digest, variant)
+    return digest
+
+
+def exists(digest: str, variant: str) -> bool:
+    """Whether get_path() can serve this (the original is stored; variants render on demand)."""
+    if not is_digest(digest) or (variant != "original" and variant not in VARIANTS):
+        return False
+    return _original_path(digest) is not None
+
+
+async def get_path(digest: str, variant: str):
+    """Path to serve for a variant, rendering it on demand if needed. None if unknown."""
+    if not exists(digest, variant):
+        return None
+    if variant == "original":
+        return _original_path(digest)
+    return path_for(digest, variant) or await _ensure_variant(digest, variant)
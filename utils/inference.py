@@ -1,86 +1,132 @@
 # backend/utils/inference.py
-import io
 import asyncio
-import time
+import io
+import os
 from PIL import Image
-from ultralytics import YOLO
 
-# Load model globally one time
-MODEL_PATH = "models/best.pt"
-model = YOLO(MODEL_PATH)
+from utils.image_io import decode_for_model
+
+from utils.batching import BatchScheduler, QueueFullError  # noqa: F401 (re-exported)
+from utils.postprocess import KNOWN_CATEGORIES, build_predictions  # noqa: F401
+
+# "inprocess": model lives in this process, requests are micro-batched.
+# "pool":      model lives in INFERENCE_POOL_WORKERS separate processes.
+# Which runtime executes the model is INFERENCE_RUNTIME (utils/runtimes.py).
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "inprocess").lower()
+
+# ---------- batching config (inprocess) ----------
+# Requests are grouped into one model.predict call: up to MAX_BATCH images,
+# or whatever arrived within MAX_WAIT_MS of the first one.
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+INFERENCE_QUEUE_DEPTH = int(os.getenv("INFERENCE_QUEUE_DEPTH", "64"))
+
+# ---------- process pool config ----------
+INFERENCE_POOL_WORKERS = int(os.getenv("INFERENCE_POOL_WORKERS", "2"))
+INFERENCE_POOL_THREADS = int(os.getenv("INFERENCE_POOL_THREADS", "1"))  # runtime threads per worker
+INFERENCE_POOL_TIMEOUT_S = float(os.getenv("INFERENCE_POOL_TIMEOUT_S", "30"))
+
+
+# Loaded by startup(); importing this module never touches ultralytics/torch.
+# `runtime` is a utils.runtimes.ModelRuntime (INFERENCE_RUNTIME picks which).
+runtime = None
+pool = None
+
+
+def _load_model():
+    global runtime
+    from utils.runtimes import load_runtime
+
+    # Load model globally one time
+    runtime = load_runtime()
+
+
+def _predict_batch(jobs):
+    """
+    Run one batched predict for a list of (img, conf_thresh) jobs.
+    The batch runs at the lowest threshold asked for; each caller's own
+    threshold is applied again in build_predictions.
+    """
+    images = [img for img, _ in jobs]
+    conf = min(c for _, c in jobs)
+    return runtime.predict_batch(images, conf)
+
+
+scheduler = BatchScheduler(
+    _predict_batch,
+    max_batch=INFERENCE_MAX_BATCH,
+    max_wait_ms=INFERENCE_MAX_WAIT_MS,
+    queue_depth=INFERENCE_QUEUE_DEPTH,
+)
+
+
+# ---------- lifecycle (driven by utils.model_provider) ----------
+
+async def startup():
+    """Load the model on the configured backend. Safe to call once."""
+    global pool
+    if INFERENCE_BACKEND == "pool":
+        from utils.inference_pool import InferencePool
+        from utils.runtimes import INFERENCE_RUNTIME
+
+        # the API process never loads the model itself
+        pool = InferencePool(
+            INFERENCE_RUNTIME,
+            num_workers=INFERENCE_POOL_WORKERS,
+            threads_per_worker=INFERENCE_POOL_THREADS,
+            queue_depth=INFERENCE_QUEUE_DEPTH,
+            timeout_s=INFERENCE_POOL_TIMEOUT_S,
+        )
+        await pool.wait_ready()
+    else:
+        await asyncio.to_thread(_load_model)
+        scheduler.start()
 
-# If your model classes are exactly these names, fine.
-# If not, adjust this mapping to match model.names values.
-KNOWN_CATEGORIES = {"recyclable", "reusable", "hazardous"}
+
+async def warm_up():
+    """
+    Push one blank image through the full path so lazy framework init
+    (fusing layers, allocating buffers, ...) isn't paid by the first user.
+    """
+    buf = io.BytesIO()
+    Image.new("RGB", (640, 640), (114, 114, 114)).save(buf, format="JPEG")
+    await run_inference(buf.getvalue())
+
+
+async def shutdown():
+    global pool
+    await scheduler.stop()
+    if pool is not None:
+        await pool.stop()
+        pool = None
 
 
 async def run_inference(image_bytes: bytes, conf_thresh: float = 0.25, top_k: int = 6):
     """
-    Async + thread-safe YOLOv8 inference.
+    Async YOLOv8 inference on the configured backend.
     Returns:
       {
         "predictions": [ { "label": str, "confidence": float, "bbox": [x1,y1,x2,y2] }, ... ],
         "category": "recyclable" | "reusable" | "hazardous" | None,
-        "speed_ms": 123.4
+        "speed_ms": 123.4,      # queue_ms + compute_ms
+        "queue_ms": 3.2,        # time spent waiting for a batch slot / free worker
+        "compute_ms": 120.2     # time of the predict call this request rode in
       }
+    Raises QueueFullError when the backend is at capacity.
     """
-    img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-
-    start = time.time()
-    # Offload YOLO inference to background thread (prevents blocking the main event loop)
-    results = await asyncio.to_thread(
-        model.predict,
-        img,
-        imgsz=640,
-        conf=conf_thresh,
-        verbose=False
-    )
-    end = time.time()
-
-    elapsed_ms = (end - start) * 1000.0
-
-    preds = []
-    r = results[0]
-
-    # collect boxes -> build predictions list
-    for box in r.boxes:
-        cls_id = int(box.cls[0])
-        conf = float(box.conf[0])
-        bbox = [float(x) for x in box.xyxy[0].tolist()]
-
-        # model.names should exist and map class ids to name strings
-        label = r.names.get(cls_id, str(cls_id)) if hasattr(r, "names") else str(cls_id)
-
-        preds.append({
-            "label": label,
-            "confidence": conf,
-            "bbox": bbox
-        })
-
-    # sort by confidence desc and limit to top_k
-    preds = sorted(preds, key=lambda x: x["confidence"], reverse=True)[:top_k]
-
-    # If the model was trained directly with 'recyclable','reusable','hazardous',
-    # prefer that. Otherwise return None and let frontend do heuristics.
-    category = None
-    if preds:
-        # if any top prediction label matches known categories, pick the most confident match
-        for p in preds:
-            lab = str(p["label"]).lower().strip()
-            if lab in KNOWN_CATEGORIES:
-                category = lab
-                break
-
-        # fallback: if no exact match, attempt fuzzy match by checking if predicted label contains keywords
-        if category is None:
-            lower_labels = " ".join([str(p["label"]).lower() for p in preds])
-            for known in KNOWN_CATEGORIES:
-                if known in lower_labels:
-                    category = known
-                    break
+    if pool is not None:
+        return await pool.run(image_bytes, conf_thresh, top_k)
+
+    # decode off the event loop, already at model size
+    img, scale = await asyncio.to_thread(decode_for_model, image_bytes)
+
+    (rows, names), queue_ms, compute_ms = await scheduler.submit((img, conf_thresh))
+    preds, category = build_predictions(rows, names, conf_thresh, top_k, scale)
 
     return {
         "predictions": preds,
         "category": category,      # may be None if model's class names are different
-        "speed_ms": round(elapsed_ms, 1),
+        "speed_ms": round(queue_ms + compute_ms, 1),
+        "queue_ms": round(queue_ms, 1),
+        "compute_ms": round(compute_ms, 1),
     }
@@ -0,0 +1,263 @@
+# backend/utils/inference_pool.py
+# Process-pool inference backend.
+#
+# K worker processes each load the model runtime (utils/runtimes.py) once. The API process decodes
+# the upload into a uint8 array, copies it into a multiprocessing.shared_memory
+# block and sends only (shm name, shape, dtype) over a pipe, so the pixels are
+# never pickled. Workers reply with the small (cls, conf, xyxy) detection
+# arrays, which go through the same post-processing as the in-process backend.
+import asyncio
+import multiprocessing as mp
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from utils.batching import QueueFullError
+from utils.image_io import decode_for_model
+from utils.postprocess import build_predictions
+
+
+MODEL_LOAD_TIMEOUT_S = 120.0
+
+
+class WorkerCrashedError(Exception):
+    """The worker process died (or hung) while handling a request."""
+
+
+# ---------- worker process side ----------
+
+def _worker_main(conn, runtime_name: str, num_threads: int):
+    # heavy imports happen only inside the worker
+    from multiprocessing import resource_tracker
+    from utils.runtimes import load_runtime
+
+    runtime = load_runtime(runtime_name, num_threads=num_threads)
+    conn.send(("ready", None))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+
+        shm_name, shape, dtype, conf = job
+        shm = img = None
+        try:
+            # gone already if the parent gave up on this job; that is an
+            # error reply, not a reason for the worker to die
+            shm = shared_memory.SharedMemory(name=shm_name)
+            # the parent owns (and unlinks) the block; stop our tracker from
+            # trying to clean it up a second time when this process exits
+            resource_tracker.unregister(shm._name, "shared_memory")
+            img = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            conn.send(("ok", runtime.predict_batch([img], conf)[0]))
+        except Exception as e:
+            conn.send(("error", str(e)))
+        finally:
+            del img
+            if shm is not None:
+                shm.close()
+
+
+# ---------- API process side ----------
+
+class _Worker:
+    """Parent-side handle for one worker process."""
+
+    def __init__(self, ctx, runtime_name: str, num_threads: int):
+        self.ctx = ctx
+        self.runtime_name = runtime_name
+        self.num_threads = num_threads
+        self.proc = None
+        self.conn = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        parent_conn, child_conn = self.ctx.Pipe()
+        self.proc = self.ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.runtime_name, self.num_threads),
+            daemon=True,
+        )
+        self.proc.start()
+        child_conn.close()  # so recv() raises EOFError if the child dies
+        self.conn = parent_conn
+        self._ready = False
+
+    def stop(self):
+        if self.proc is None:
+            return
+        try:
+            self.conn.send(None)
+        except Exception:
+            pass
+        self.proc.join(timeout=2)
+        if self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        self.conn.close()
+        self.proc = None
+
+    def restart(self):
+        if self.proc is not None and self.proc.is_alive():
+            self.proc.kill()
+            self.proc.join()
+        if self.conn is not None:
+            self.conn.close()
+        self.proc = None
+        self.start()
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.is_alive()
+
+    def _recv(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Inference worker timed out")
+            if self.conn.poll(min(remaining, 0.5)):
+                return self.conn.recv()
+            if not self.proc.is_alive():
+                raise EOFError("Inference worker exited")
+
+    def _wait_ready(self, timeout: float):
+        if not self._ready:
+            tag, _ = self._recv(timeout)
+            self._ready = tag == "ready"
+
+    def wait_ready(self, timeout: float):
+        """Block until the worker has finished loading the model."""
+        with self.lock:
+            self._wait_ready(timeout)
+
+    def call(self, job, timeout: float):
+        """Blocking send/receive; run via asyncio.to_thread."""
+        with self.lock:
+            # first call after (re)start also waits for the model load
+            self._wait_ready(timeout + MODEL_LOAD_TIMEOUT_S)
+            self.conn.send(job)
+            return self._recv(timeout)
+
+
+class InferencePool:
+    def __init__(self, runtime_name: str, num_workers: int = 2, threads_per_worker: int = 1,
+                 queue_depth: int = 64, timeout_s: float = 30.0):
+        self.runtime_name = runtime_name
+        self.num_workers = max(1, num_workers)
+        self.threads_per_worker = threads_per_worker
+        self.queue_depth = max(1, queue_depth)
+        self.timeout_s = timeout_s
+        self.restarts = 0
+        self._ctx = mp.get_context("spawn")
+        self._workers: list[_Worker] = []
+        self._idle: asyncio.Queue | None = None
+        self._pending = 0
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._workers:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.num_workers):
+            w = _Worker(self._ctx, self.runtime_name, self.threads_per_worker)
+            w.start()
+            self._workers.append(w)
+            self._idle.put_nowait(w)
+
+    async def wait_ready(self):
+        """Start the workers and wait until every one has loaded the model."""
+        self.start()
+        await asyncio.gather(*(
+            asyncio.to_thread(w.wait_ready, MODEL_LOAD_TIMEOUT_S) for w in self._workers
+        ))
+
+    async def stop(self):
+        workers, self._workers = self._workers, []
+        for w in workers:
+            await asyncio.to_thread(w.stop)
+        self._idle = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "alive": sum(1 for w in self._workers if w.alive()),
+            "pending": self._pending,
+            "queue_depth": self.queue_depth,
+            "restarts": self.restarts,
+        }
+
+    # ---------- request path ----------
+
+    async def _dispatch(self, arr: np.ndarray, conf_thresh: float):
+        """Returns (rows, names, queue_ms, compute_ms)."""
+        enqueued = time.perf_counter()
+        worker = await self._idle.get()
+        started = time.perf_counter()
+
+        shm = shared_memory.SharedMemory(create=True, size=arr.nbytes)
+        try:
+            np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+            job = (shm.name, arr.shape, arr.dtype.str, conf_thresh)
+
+            if not worker.alive():
+                await asyncio.to_thread(worker.restart)
+                self.restarts += 1
+            call = asyncio.ensure_future(asyncio.to_thread(worker.call, job, self.timeout_s))
+            try:
+                tag, payload = await asyncio.shield(call)
+            except asyncio.CancelledError:
+                # worker.call can't be interrupted: the block has to outlive
+                # it, and the worker can't go back to the idle queue until
+                # its reply has been read
+                while not call.done():
+                    try:
+                        await asyncio.wait([call])
+                    except asyncio.CancelledError:
+                        pass
+                if isinstance(call.exception(), (EOFError, OSError, TimeoutError)):
+                    await asyncio.to_thread(worker.restart)
+                    self.restarts += 1
+                raise
+            except (EOFError, OSError, TimeoutError) as e:
+                # crashed or hung: replace the process, fail only this request
+                await asyncio.to_thread(worker.restart)
+                self.restarts += 1
+                raise WorkerCrashedError(str(e))
+        finally:
+            shm.close()
+            shm.unlink()
+            self._idle.put_nowait(worker)
+
+        finished = time.perf_counter()
+        if tag != "ok":
+            raise RuntimeError(payload)
+
+        rows, names = payload
+        return rows, names, (started - enqueued) * 1000.0, (finished - started) * 1000.0
+
+    async def run(self, image_bytes: bytes, conf_thresh: float = 0.25, top_k: int = 6):
+        if self._pending >= self.queue_depth:
+            raise QueueFullError("Inference pool is full")
+        self.start()
+
+        self._pending += 1
+        try:
+            arr, scale = await asyncio.to_thread(decode_for_model, image_bytes)
+            rows, names, queue_ms, compute_ms = await self._dispatch(arr, conf_thresh)
+        finally:
+            self._pending -= 1
+
+        preds, category = build_predictions(rows, names, conf_thresh, top_k, scale)
+        return {
+            "predictions": preds,
+            "category": category,
+            "speed_ms": round(queue_ms + compute_ms, 1),
+            "queue_ms": round(queue_ms, 1),
+            "compute_ms": round(compute_ms, 1),
+        }
@@ -0,0 +1,225 @@
+# backend/utils/listing_cache.py
+# In-process read-through cache for marketplace listings.
+#
+# Holds two things:
+#   - single listings keyed by ObjectId (GET /marketplace/listings/{id})
+#   - the first LISTING_CACHE_FEED_PAGES pages of the unfiltered feed
+#
+# Invalidation:
+#   - a change stream on `listings` drops entries as soon as any process
+#     writes (needs a replica set / Atlas; standalone mongod has none)
+#   - writes in this process invalidate directly (create/delete/stock changes)
+#   - without a change stream, entries live only LISTING_CACHE_FALLBACK_TTL_S,
+#     which bounds how stale another worker's write can make us
+#
+# Read-through race: a request reads Mongo, a write invalidates, then the
+# request puts its (now stale) doc back - and nothing would clear it again.
+# So every invalidation gets a sequence number; readers take token() before
+# reading Mongo and put()/put_page() drop the value if the listing (or the
+# feed) was invalidated after that token.
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+LISTING_CACHE_MAX_ENTRIES = int(os.getenv("LISTING_CACHE_MAX_ENTRIES", "5000"))
+LISTING_CACHE_TTL_S = float(os.getenv("LISTING_CACHE_TTL_S", "300"))
+LISTING_CACHE_FALLBACK_TTL_S = float(os.getenv("LISTING_CACHE_FALLBACK_TTL_S", "5"))
+LISTING_CACHE_FEED_PAGES = int(os.getenv("LISTING_CACHE_FEED_PAGES", "3"))
+CHANGE_STREAM_RETRY_S = 60.0
+
+
+class ListingCache:
+    def __init__(self, max_entries: int = LISTING_CACHE_MAX_ENTRIES):
+        self.max_entries = max(1, max_entries)
+        self._items: OrderedDict = OrderedDict()  # ObjectId -> (stored_at, expires_at, doc)
+        self._feed: dict = {}                      # (cursor, limit) -> (stored_at, expires_at, page)
+        self._feed_page_no: dict = {None: 0}       # cursor -> page number in the default feed
+        self._watcher: asyncio.Task | None = None
+        self.change_stream_active = False
+
+        self._seq = 0                               # bumped by every invalidation
+        self._invalidated_at: OrderedDict = OrderedDict()  # ObjectId -> seq, oldest first
+        self._floor = 0       # seq of the newest pruned/cleared entry: older tokens are all stale
+        self._feed_invalidated_at = 0
+        self.stale_puts = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        self.last_event_lag_s = None
+
+    # ---------- helpers ----------
+
+    def _ttl(self) -> float:
+        return LISTING_CACHE_TTL_S if self.change_stream_active else LISTING_CACHE_FALLBACK_TTL_S
+
+    def _hit(self, stored_at: float):
+        self.hits += 1
+        age = time.monotonic() - stored_at
+        self._served_age_total += age
+        self._served_age_max = max(self._served_age_max, age)
+
+    # ---------- single listings ----------
+
+    def get(self, oid):
+        entry = self._items.get(oid)
+        if entry is None or entry[1] < time.monotonic():
+            if entry is not None:
+                del self._items[oid]
+            self.misses += 1
+            return None
+        self._items.move_to_end(oid)
+        self._hit(entry[0])
+        return entry[2]
+
+    def token(self) -> int:
+        """Take before reading Mongo; pass to put()/put_page()."""
+        return self._seq
+
+    def _stale(self, token, oid=None) -> bool:
+        if token is None:
+            return False
+        if token < self._floor or (oid is not None and self._invalidated_at.get(oid, -1) > token):
+            self.stale_puts += 1
+            return True
+        return False
+
+    def put(self, oid, doc, token=None):
+        if self._stale(token, oid):
+            return
+        now = time.monotonic()
+        self._items[oid] = (now, now + self._ttl(), doc)
+        self._items.move_to_end(oid)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    # ---------- default feed pages ----------
+
+    def get_page(self, cursor, limit: int):
+        entry = self._feed.get((cursor, limit))
+        if entry is None or entry[1] < time.monotonic():
+            self._feed.pop((cursor, limit), None)
+            self.misses += 1
+            return None
+        self._hit(entry[0])
+        return entry[2]
+
+    def put_page(self, cursor, limit: int, page, next_cursor, token=None):
+        """Cache a feed page if it is one of the first LISTING_CACHE_FEED_PAGES."""
+        if token is not None and self._feed_invalidated_at > token:
+            self.stale_puts += 1
+            return
+        page_no = self._feed_page_no.get(cursor)
+        if page_no is None or page_no >= LISTING_CACHE_FEED_PAGES:
+            return
+        now = time.monotonic()
+        self._feed[(cursor, limit)] = (now, now + self._ttl(), page)
+        if next_cursor is not None:
+            self._feed_page_no[next_cursor] = page_no + 1
+
+    # ---------- invalidation ----------
+
+    def _bump(self, oid=None) -> int:
+        self._seq += 1
+        if oid is not None:
+            self._invalidated_at[oid] = self._seq
+            self._invalidated_at.move_to_end(oid)
+            # bounded: forgetting an oid raises the floor past it instead
+            while len(self._invalidated_at) > self.max_entries:
+                _, seq = self._invalidated_at.popitem(last=False)
+                self._floor = max(self._floor, seq)
+        return self._seq
+
+    def invalidate(self, oid=None):
+        """Drop one listing (if given) and every cached feed page."""
+        self._feed_invalidated_at = self._bump(oid)
+        if oid is not None:
+            self._items.pop(oid, None)
+        self._feed.clear()
+        self._feed_page_no = {None: 0}
+        self.invalidations += 1
+
+    def invalidate_many(self, oids):
+        for oid in oids:
+            self._bump(oid)
+            self._items.pop(oid, None)
+        self.invalidate()
+
+    def clear(self):
+        self._items.clear()
+        self.invalidate()
+        self._invalidated_at.clear()
+        self._floor = self._seq
+
+    # ---------- change stream ----------
+
+    def start(self, collection):
+        if self._watcher is None or self._watcher.done():
+            self._watcher = asyncio.create_task(self._watch(collection))
+
+    async def stop(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
+        self.change_stream_active = False
+
+    async def _watch(self, collection):
+        while True:
+            try:
+                async with collection.watch() as stream:
+                    # anything cached under the short TTL may predate the stream
+                    self.clear()
+                    self.change_stream_active = True
+                    print("✅ [listing cache] change stream active")
+                    async for change in stream:
+                        key = change.get("documentKey", {}).get("_id")
+                        if change.get("operationType") in ("drop", "rename", "dropDatabase", "invalidate"):
+                            self.clear()
+                        else:
+                            self.invalidate(key)
+                        cluster_time = change.get("clusterTime")
+                        if cluster_time is not None:
+                            self.last_event_lag_s = round(max(0.0, time.time() - cluster_time.time), 3)
+                # the server closed the stream (e.g. after an invalidate event)
+                print("⚠ [listing cache] change stream closed, falling back to short TTL")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.change_stream_active:
+                    print("⚠ [listing cache] change stream lost, falling back to short TTL:", e)
+            finally:
+                # however the stream ended, nothing invalidates entries anymore
+                self.change_stream_active = False
+                self.clear()
+            await asyncio.sleep(CHANGE_STREAM_RETRY_S)
+
+    # ---------- reporting ----------
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._items),
+            "feed_pages": len(self._feed),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "stale_puts_dropped": self.stale_puts,
+            "change_stream_active": self.change_stream_active,
+            "ttl_s": self._ttl(),
+            # how old cached data was when served (upper bound on staleness
+            # without a change stream; ~change-stream lag with one)
+            "served_age_avg_s": round(self._served_age_total / self.hits, 3) if self.hits else 0.0,
+            "served_age_max_s": round(self._served_age_max, 3),
+            "last_event_lag_s": self.last_event_lag_s,
+        }
+
+
+listing_cache = ListingCache()
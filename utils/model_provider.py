@@ -0,0 +1,141 @@
+# backend/utils/model_provider.py
+# Owns the lifetime of the classifier so app startup never pays for
+# ultralytics/torch unless inference is actually wanted.
+#
+# INFERENCE_MODE:
+#   disabled - utils.inference is never imported, /classify returns 503
+#   lazy     - the model loads on the first /classify request
+#   eager    - the model loads at startup and runs one warm-up predict;
+#              if that fails the app still starts, /health reports the
+#              model as failed and /classify returns 503 (no retries)
+import asyncio
+import importlib
+import os
+import time
+
+INFERENCE_MODE = os.getenv("INFERENCE_MODE", "disabled").lower()
+MODEL_PATH = "models/best.pt"
+
+# Identifies the weights behind a prediction (used in cache keys). Set it
+# explicitly on deploy, otherwise it is derived from the weight file itself.
+MODEL_VERSION = os.getenv("MODEL_VERSION")
+
+
+def model_version() -> str:
+    if MODEL_VERSION:
+        return MODEL_VERSION
+
+    # runtimes agree to within float noise, not bit-for-bit, so tag them apart
+    runtime = os.getenv("INFERENCE_RUNTIME", "ultralytics").lower()
+    if runtime == "onnx" and os.getenv("ONNX_INT8", "0") == "1":
+        runtime = "onnx-int8"
+    try:
+        st = os.stat(MODEL_PATH)
+        return f"{st.st_size:x}-{int(st.st_mtime):x}-{runtime}"
+    except OSError:
+        return f"unknown-{runtime}"
+
+
+class ModelDisabledError(Exception):
+    """Inference is switched off for this deployment."""
+
+
+class ModelUnavailableError(ModelDisabledError):
+    """The model failed to load; /health has the error."""
+
+
+class ModelProvider:
+    def __init__(self, mode: str = INFERENCE_MODE):
+        if mode not in ("disabled", "lazy", "eager"):
+            raise ValueError(f"Unknown INFERENCE_MODE: {mode!r}")
+        self.mode = mode
+        self.state = "disabled" if mode == "disabled" else "not_loaded"
+        self.error = None
+        self.load_ms = None
+        self.warm_up_ms = None
+        self._inference = None
+        self._lock = asyncio.Lock()
+
+    # ---------- lifespan hooks ----------
+
+    async def startup(self):
+        if self.mode == "eager":
+            try:
+                await self.load(warm_up=True)
+            except ModelUnavailableError:
+                pass  # already reported; serve everything else
+
+    async def shutdown(self):
+        if self._inference is not None:
+            await self._inference.shutdown()
+            self._inference = None
+            if self.state == "ready":
+                self.state = "not_loaded"
+
+    # ---------- loading ----------
+
+    async def load(self, warm_up: bool = False):
+        """Import and start the inference module once; concurrent callers share the load."""
+        if self.mode == "disabled":
+            raise ModelDisabledError("AI model disabled in this deployment.")
+        if self._inference is not None:
+            return self._inference
+        if self.mode == "eager" and self.state == "failed":
+            raise ModelUnavailableError(f"AI model failed to load: {self.error}")
+
+        async with self._lock:
+            if self._inference is not None:
+                return self._inference
+
+            self.state = "loading"
+            started = time.perf_counter()
+            inference = None
+            try:
+                inference = await asyncio.to_thread(importlib.import_module, "utils.inference")
+                await inference.startup()
+                self.load_ms = round((time.perf_counter() - started) * 1000.0, 1)
+
+                if warm_up:
+                    warm_started = time.perf_counter()
+                    await inference.warm_up()
+                    self.warm_up_ms = round((time.perf_counter() - warm_started) * 1000.0, 1)
+            except Exception as e:
+                # startup() may have got as far as starting the scheduler or
+                # the worker pool; don't leave them running without a model
+                if inference is not None:
+                    try:
+                        await inference.shutdown()
+                    except Exception as stop_error:
+                        print("⚠ Failed to stop inference after load error:", stop_error)
+                self.state = "failed"
+                self.error = str(e)
+                print("❌ Failed to load classifier:", e)
+                raise ModelUnavailableError(f"AI model failed to load: {e}") from e
+
+            self._inference = inference
+            self.state = "ready"
+            self.error = None
+            print(f"✅ Classifier ready in {self.load_ms}ms (mode={self.mode})")
+            return inference
+
+    async def run_inference(self, image_bytes: bytes, **kwargs):
+        inference = await self.load()
+        return await inference.run_inference(image_bytes, **kwargs)
+
+    # ---------- reporting ----------
+
+    def health(self) -> dict:
+        info = {
+            "mode": self.mode,
+            "state": self.state,
+            "ready": self.state == "ready",
+            "load_ms": self.load_ms,
+            "warm_up_ms": self.warm_up_ms,
+            "version": model_version(),
+        }
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+model_provider = ModelProvider()
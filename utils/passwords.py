@@ -0,0 +1,111 @@
+# backend/utils/passwords.py
+# Password hashing off the event loop.
+#
+# bcrypt is deliberately slow (~100-300 ms per call at the default cost), so
+# hashing and verifying run on a small dedicated thread pool instead of in
+# the async handlers. Two limits keep a login burst from hurting the rest of
+# the app:
+#   PASSWORD_HASH_WORKERS     - threads doing bcrypt (caps CPU spent on it)
+#   PASSWORD_HASH_MAX_PENDING - calls allowed in flight or queued; anything
+#                               beyond that fails fast with HasherBusyError
+#
+# BCRYPT_ROUNDS sets the cost. Stored hashes with a different cost are
+# re-hashed on the next successful login (see verify_and_update).
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+# min/max pin the accepted cost to exactly BCRYPT_ROUNDS, so any stored
+# hash made with another cost reports needs_update after verification
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256"],
+    deprecated="auto",
+    bcrypt_sha256__default_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__min_rounds=BCRYPT_ROUNDS,
+    bcrypt_sha256__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+class HasherBusyError(Exception):
+    """Too many hash/verify calls pending (caller should answer 503)."""
+
+
+class PasswordHasher:
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        self.workers = max(1, workers)
+        self.max_pending = max(self.workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+        self.calls = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._compute_total = 0.0
+
+    async def _run(self, fn, *args):
+        # admission check happens on the loop thread, so no lock is needed
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            raise HasherBusyError("Too many password operations in progress")
+
+        self._pending += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_s, compute_s = await loop.run_in_executor(self._executor, timed)
+        finally:
+            self._pending -= 1
+
+        self.calls += 1
+        self._wait_total += wait_s
+        self._wait_max = max(self._wait_max, wait_s)
+        self._compute_total += compute_s
+        return result
+
+    # ---------- public API ----------
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify_and_update(self, password: str, stored_hash: str):
+        """
+        (valid, new_hash). new_hash is None unless the password was right and
+        the stored hash uses an outdated cost - then the caller should save it.
+        """
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, stored_hash)
+        if new_hash is not None:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "rounds": BCRYPT_ROUNDS,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+            "calls": self.calls,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            # time spent queued for a bcrypt thread - grows first under a burst
+            "wait_avg_ms": round(1000 * self._wait_total / self.calls, 2) if self.calls else 0.0,
+            "wait_max_ms": round(1000 * self._wait_max, 2),
+            "compute_avg_ms": round(1000 * self._compute_total / self.calls, 2) if self.calls else 0.0,
+        }
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,118 @@
+# backend/utils/postprocess.py
+# Shared post-processing for every inference backend.
+# Kept free of ultralytics/torch imports so the API process can use it
+# even when the model itself lives in worker processes.
+#
+# Detections travel as three NumPy arrays (cls ids, confidences, xyxy boxes)
+# plus the model's names dict; everything below works on whole arrays and
+# resolves labels/categories through a per-model lookup table.
+import numpy as np
+
+# If your model classes are exactly these names, fine.
+# If not, adjust this mapping to match model.names values.
+# Order matters: it is the tie-break for the fuzzy category fallback.
+KNOWN_CATEGORIES = ("recyclable", "reusable", "hazardous")
+
+
+class LabelTable:
+    """
+    Everything that depends only on the class id, computed once per model:
+      labels[id]  -> display label
+      exact[id]   -> index into KNOWN_CATEGORIES if the label *is* a category, else -1
+      fuzzy[id]   -> bitmask of KNOWN_CATEGORIES contained in the label
+    """
+
+    def __init__(self, names: dict):
+        size = (max(names) + 1) if names else 0
+        self.labels = [str(names.get(i, i)) for i in range(size)]
+        self.exact = np.full(size, -1, dtype=np.int16)
+        self.fuzzy = np.zeros(size, dtype=np.int16)
+
+        for i, label in enumerate(self.labels):
+            lab = label.lower().strip()
+            for k, known in enumerate(KNOWN_CATEGORIES):
+                if lab == known:
+                    self.exact[i] = k
+                if known in label.lower():
+                    self.fuzzy[i] |= 1 << k
+
+    def label(self, cls_id: int) -> str:
+        return self.labels[cls_id] if 0 <= cls_id < len(self.labels) else str(cls_id)
+
+
+_tables: dict[tuple, LabelTable] = {}
+_last = (None, None)  # (names object, table): the common case is one model's own dict
+
+
+def label_table(names: dict) -> LabelTable:
+    """Memoized LabelTable for a model's names dict (one per model, in practice)."""
+    global _last
+    if names is _last[0]:
+        return _last[1]
+
+    key = tuple(sorted(names.items()))
+    table = _tables.get(key)
+    if table is None:
+        table = _tables[key] = LabelTable(names)
+    _last = (names, table)
+    return table
+
+
+def boxes_to_rows(r):
+    """
+    Pull an ultralytics Results object out as plain arrays:
+    ((cls int64[N], conf float32[N], xyxy float32[N, 4]), names)
+    one device->host copy per field instead of one per box.
+    """
+    boxes = r.boxes
+    cls = boxes.cls.cpu().numpy().astype(np.int64)
+    conf = boxes.conf.cpu().numpy().astype(np.float32)
+    xyxy = boxes.xyxy.cpu().numpy().astype(np.float32).reshape(-1, 4)
+    names = r.names if hasattr(r, "names") else {}
+    return (cls, conf, xyxy), names
+
+
+def build_predictions(rows, names, conf_thresh: float, top_k: int, scale: float = 1.0):
+    """
+    Turn (cls, conf, xyxy) arrays into the /classify predictions list
+    and overall category. Returns (preds, category).
+    `scale` maps boxes from the (downscaled) model input back to the
+    original image's pixel coordinates.
+    """
+    cls, conf, xyxy = rows
+    table = label_table(names)
+
+    keep = np.flatnonzero(conf >= conf_thresh) if top_k > 0 else np.empty(0, dtype=np.int64)
+    if keep.size > top_k:
+        # only the top_k survive: partial select, then order just those
+        keep = keep[np.argpartition(-conf[keep], top_k - 1)[:top_k]]
+    keep = keep[np.argsort(-conf[keep], kind="stable")]
+
+    cls_k = cls[keep]
+    boxes = xyxy[keep].astype(np.float64)
+    if scale != 1.0:
+        boxes *= scale
+
+    preds = [
+        {"label": table.label(c), "confidence": p, "bbox": b}
+        for c, p, b in zip(cls_k.tolist(), conf[keep].tolist(), boxes.tolist())
+    ]
+
+    # If the model was trained directly with 'recyclable','reusable','hazardous',
+    # prefer the most confident exact match. Otherwise fall back to any category
+    # contained in a label; None lets the frontend do heuristics.
+    category = None
+    if cls_k.size:
+        in_table = cls_k[(cls_k >= 0) & (cls_k < len(table.labels))]
+        exact = table.exact[in_table]
+        hits = exact[exact >= 0]
+        if hits.size:
+            category = KNOWN_CATEGORIES[int(hits[0])]
+        else:
+            mask = int(np.bitwise_or.reduce(table.fuzzy[in_table])) if in_table.size else 0
+            for k, known in enumerate(KNOWN_CATEGORIES):
+                if mask & (1 << k):
+                    category = known
+                    break
+
+    return preds, category
@@ -0,0 +1,171 @@
+# backend/utils/result_cache.py
+# Content-hash cache for /classify results.
+#
+# Key = blake2b(raw upload bytes) + conf_thresh + top_k + model version, so a
+# retrained best.pt never serves stale answers. Two tiers:
+#   memory     - LRU with max entries + TTL, always on
+#   persistent - optional, "mongo" (classify_cache collection, TTL index)
+#                or "disk" (one JSON file per key under RESULT_CACHE_DIR)
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "2048"))
+RESULT_CACHE_TTL_S = float(os.getenv("RESULT_CACHE_TTL_S", "3600"))
+RESULT_CACHE_PERSIST = os.getenv("RESULT_CACHE_PERSIST", "none").lower()  # none | mongo | disk
+RESULT_CACHE_PERSIST_TTL_S = float(os.getenv("RESULT_CACHE_PERSIST_TTL_S", str(7 * 24 * 3600)))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", ".cache/classify")
+
+
+def make_key(image_bytes: bytes, conf_thresh: float, top_k: int, model_version: str) -> str:
+    digest = hashlib.blake2b(image_bytes, digest_size=16).hexdigest()
+    return f"{digest}:{conf_thresh:g}:{top_k}:{model_version}"
+
+
+class _MemoryTier:
+    def __init__(self, max_entries: int, ttl_s: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: str):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: dict):
+        self._data[key] = (time.monotonic() + self.ttl_s, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class _MongoTier:
+    def __init__(self, ttl_s: float):
+        self.ttl_s = ttl_s
+
+    def _collection(self):
+        from database import db
+        return db["classify_cache"]
+
+    async def get(self, key: str):
+        doc = await self._collection().find_one({"_id": key}, {"result": 1, "expires_at": 1})
+        if not doc or doc["expires_at"] < datetime.utcnow():
+            return None
+        return doc["result"]
+
+    async def set(self, key: str, value: dict):
+        # expired docs are removed by the TTL index declared in db_indexes.py
+        await self._collection().replace_one(
+            {"_id": key},
+            {"_id": key, "result": value, "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl_s)},
+            upsert=True,
+        )
+
+
+class _DiskTier:
+    def __init__(self, root: str, ttl_s: float):
+        self.root = root
+        self.ttl_s = ttl_s
+
+    def _path(self, key: str) -> str:
+        name = hashlib.sha1(key.encode()).hexdigest()
+        return os.path.join(self.root, name[:2], name + ".json")
+
+    def _read(self, key: str):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_s:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key: str, value: dict):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(value, f)
+        os.replace(tmp, path)  # atomic, readers never see half a file
+
+    async def get(self, key: str):
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: dict):
+        await asyncio.to_thread(self._write, key, value)
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = RESULT_CACHE_MAX_ENTRIES, ttl_s: float = RESULT_CACHE_TTL_S,
+                 persist: str = RESULT_CACHE_PERSIST):
+        self.memory = _MemoryTier(max_entries, ttl_s)
+        if persist == "mongo":
+            self.persistent = _MongoTier(RESULT_CACHE_PERSIST_TTL_S)
+        elif persist == "disk":
+            self.persistent = _DiskTier(RESULT_CACHE_DIR, RESULT_CACHE_PERSIST_TTL_S)
+        else:
+            self.persistent = None
+        self.persist = persist if self.persistent else "none"
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        if self.persistent is not None:
+            try:
+                value = await self.persistent.get(key)
+            except Exception as e:
+                # a broken persistent tier should only cost us the hit
+                print("⚠ classify cache read failed:", e)
+                value = None
+            if value is not None:
+                self.persistent_hits += 1
+                self.memory.set(key, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, value)
+            except Exception as e:
+                print("⚠ classify cache write failed:", e)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.persistent_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "persist": self.persist,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+
+
+result_cache = ResultCache()
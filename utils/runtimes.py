@@ -0,0 +1,190 @@
+# backend/utils/runtimes.py
+# Model runtimes: what actually executes the detector.
+#
+# Every runtime takes a batch of BGR uint8 arrays (see utils.image_io) and
+# returns, per image, ((cls, conf, xyxy) arrays, names) which
+# utils.postprocess turns into the /classify response. That keeps responses
+# identical no matter which runtime produced them.
+#
+# INFERENCE_RUNTIME:
+#   ultralytics - PyTorch through ultralytics.YOLO (default)
+#   onnx        - ONNX Runtime on models/best.onnx (or best.int8.onnx)
+#
+# (Where the runtime lives - in this process or in worker processes - is
+# INFERENCE_BACKEND, see utils/inference.py.)
+import ast
+import os
+
+import numpy as np
+
+from utils.model_provider import MODEL_PATH
+
+INFERENCE_RUNTIME = os.getenv("INFERENCE_RUNTIME", "ultralytics").lower()
+
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "models/best.onnx")
+ONNX_INT8_MODEL_PATH = os.getenv("ONNX_INT8_MODEL_PATH", "models/best.int8.onnx")
+ONNX_INT8 = os.getenv("ONNX_INT8", "0") == "1"
+ONNX_INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", "0"))  # 0 = onnxruntime default
+ONNX_INTER_OP_THREADS = int(os.getenv("ONNX_INTER_OP_THREADS", "0"))
+# e.g. "OpenVINOExecutionProvider,CPUExecutionProvider" with onnxruntime-openvino
+ONNX_PROVIDERS = [p.strip() for p in os.getenv("ONNX_PROVIDERS", "CPUExecutionProvider").split(",") if p.strip()]
+
+# same defaults as ultralytics' predictor, so both runtimes keep the same boxes
+IMGSZ = 640
+IOU_THRESH = 0.7
+MAX_DET = 300
+_MAX_WH = 7680  # per-class box offset for batched NMS
+
+
+class ModelRuntime:
+    name = "base"
+
+    def predict_batch(self, images, conf: float):
+        """images: list of HxWx3 BGR uint8 arrays -> list of ((cls, conf, xyxy), names)."""
+        raise NotImplementedError
+
+
+class UltralyticsRuntime(ModelRuntime):
+    name = "ultralytics"
+
+    def __init__(self, model_path: str = MODEL_PATH, num_threads: int = 0):
+        import torch
+        from ultralytics import YOLO
+        from utils.postprocess import boxes_to_rows
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+        self._boxes_to_rows = boxes_to_rows
+        self.model = YOLO(model_path)
+
+    def predict_batch(self, images, conf: float):
+        results = self.model.predict(images, imgsz=IMGSZ, conf=conf, verbose=False)
+        return [self._boxes_to_rows(r) for r in results]
+
+
+class OnnxRuntime(ModelRuntime):
+    name = "onnx"
+
+    def __init__(self, model_path: str | None = None, intra_op_threads: int = ONNX_INTRA_OP_THREADS,
+                 inter_op_threads: int = ONNX_INTER_OP_THREADS, providers=None):
+        import onnxruntime as ort
+
+        if model_path is None:
+            model_path = ONNX_INT8_MODEL_PATH if ONNX_INT8 else ONNX_MODEL_PATH
+        self.model_path = model_path
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads > 0:
+            opts.intra_op_num_threads = intra_op_threads
+        if inter_op_threads > 0:
+            opts.inter_op_num_threads = inter_op_threads
+            opts.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        self.session = ort.InferenceSession(model_path, sess_options=opts,
+                                            providers=providers or ONNX_PROVIDERS)
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        # exported with dynamic=False the batch axis is fixed at 1
+        self.fixed_batch = isinstance(inp.shape[0], int)
+
+        # ultralytics export stores class names as a dict repr in metadata
+        meta = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+
+    # ---------- pre / post processing (mirrors ultralytics LetterBox + NMS) ----------
+
+    @staticmethod
+    def _letterbox(img: np.ndarray):
+        from PIL import Image
+
+        h, w = img.shape[:2]
+        gain = min(IMGSZ / h, IMGSZ / w)
+        new_w, new_h = int(round(w * gain)), int(round(h * gain))
+        dw, dh = (IMGSZ - new_w) / 2, (IMGSZ - new_h) / 2
+        top, left = int(round(dh - 0.1)), int(round(dw - 0.1))
+
+        canvas = np.full((IMGSZ, IMGSZ, 3), 114, dtype=np.uint8)
+        if (new_w, new_h) != (w, h):
+            img = np.asarray(Image.fromarray(img).resize((new_w, new_h), Image.BILINEAR))
+        canvas[top:top + new_h, left:left + new_w] = img
+
+        # BGR HWC uint8 -> RGB CHW float
+        tensor = canvas[..., ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+        return tensor, gain, left, top
+
+    @staticmethod
+    def _nms(boxes: np.ndarray, scores: np.ndarray, iou_thresh: float) -> np.ndarray:
+        x1, y1, x2, y2 = boxes.T
+        areas = (x2 - x1) * (y2 - y1)
+        order = scores.argsort()[::-1]
+        keep = []
+        while order.size:
+            i = order[0]
+            keep.append(i)
+            xx1 = np.maximum(x1[i], x1[order[1:]])
+            yy1 = np.maximum(y1[i], y1[order[1:]])
+            xx2 = np.minimum(x2[i], x2[order[1:]])
+            yy2 = np.minimum(y2[i], y2[order[1:]])
+            inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+            iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+            order = order[1:][iou <= iou_thresh]
+        return np.asarray(keep, dtype=np.int64)
+
+    def _decode_output(self, pred: np.ndarray, conf: float, shape, gain, left, top):
+        # pred: (4 + num_classes, num_anchors), boxes as cx, cy, w, h
+        pred = pred.T
+        scores_all = pred[:, 4:]
+        cls_ids = scores_all.argmax(axis=1)
+        scores = scores_all[np.arange(len(cls_ids)), cls_ids]
+
+        mask = scores > conf
+        if not mask.any():
+            return np.empty(0, np.int64), np.empty(0, np.float32), np.empty((0, 4), np.float32)
+        xywh, scores, cls_ids = pred[mask, :4], scores[mask], cls_ids[mask]
+
+        boxes = np.empty_like(xywh)
+        boxes[:, 0] = xywh[:, 0] - xywh[:, 2] / 2
+        boxes[:, 1] = xywh[:, 1] - xywh[:, 3] / 2
+        boxes[:, 2] = xywh[:, 0] + xywh[:, 2] / 2
+        boxes[:, 3] = xywh[:, 1] + xywh[:, 3] / 2
+
+        # class-aware NMS via per-class coordinate offsets
+        keep = self._nms(boxes + cls_ids[:, None] * _MAX_WH, scores, IOU_THRESH)[:MAX_DET]
+        boxes, scores, cls_ids = boxes[keep], scores[keep], cls_ids[keep]
+
+        # undo letterbox, clip to the image
+        h, w = shape
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - left) / gain).clip(0, w)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - top) / gain).clip(0, h)
+
+        return cls_ids.astype(np.int64), scores.astype(np.float32), boxes.astype(np.float32)
+
+    def predict_batch(self, images, conf: float):
+        prepped = [self._letterbox(img) for img in images]
+        tensors = np.stack([p[0] for p in prepped])
+
+        if self.fixed_batch:
+            outputs = np.concatenate([
+                self.session.run(None, {self.input_name: tensors[i:i + 1]})[0]
+                for i in range(len(images))
+            ])
+        else:
+            outputs = self.session.run(None, {self.input_name: tensors})[0]
+
+        results = []
+        for img, (_, gain, left, top), pred in zip(images, prepped, outputs):
+            rows = self._decode_output(pred, conf, img.shape[:2], gain, left, top)
+            results.append((rows, self.names))
+        return results
+
+
+def load_runtime(name: str = INFERENCE_RUNTIME, num_threads: int = 0) -> ModelRuntime:
+    """num_threads > 0 overrides the runtime's own thread setting (pool workers)."""
+    if name == "onnx":
+        if num_threads > 0:
+            return OnnxRuntime(intra_op_threads=num_threads)
+        return OnnxRuntime()
+    if name == "ultralytics":
+        return UltralyticsRuntime(num_threads=num_threads)
+    raise ValueError(f"Unknown INFERENCE_RUNTIME: {name!r}")
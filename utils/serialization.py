@@ -0,0 +1,65 @@
+# backend/utils/serialization.py
+# Fast JSON output for the API.
+#
+#   - JSON_RESPONSE_CLASS is the app's default response class: ORJSONResponse
+#     when orjson is installed, the stdlib JSONResponse otherwise
+#   - dumps() writes straight to bytes; ObjectId and datetime (what Mongo
+#     hands back) are encoded natively, so entity dicts can carry them as-is
+#   - trusted() is for list endpoints returning entity dicts the server built
+#     itself. Normally they go through response_model validation like
+#     everything else; with TRUST_SERVER_RESPONSES=true they are serialized
+#     once with dumps() and sent as-is, skipping the re-validation and the
+#     jsonable_encoder pass. The entity functions must then produce exactly
+#     the response_model's fields (they do for the endpoints using this).
+import datetime
+import json
+import os
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+except ImportError:  # stdlib fallback, same output
+    orjson = None
+    ORJSONResponse = None
+
+TRUST_SERVER_RESPONSES = os.getenv("TRUST_SERVER_RESPONSES", "false").lower() == "true"
+
+JSON_RESPONSE_CLASS = ORJSONResponse if orjson is not None else JSONResponse
+
+
+def _default(obj):
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):  # stdlib path only; orjson does these itself
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    def dumps(content) -> bytes:
+        return orjson.dumps(content, default=_default)
+else:
+    def dumps(content) -> bytes:
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class JSONBytesResponse(Response):
+    """A body that is already JSON bytes (from dumps() or a cache)."""
+    media_type = "application/json"
+
+
+def trusted(content):
+    """content as-is (validated by response_model), or pre-serialized with TRUST_SERVER_RESPONSES."""
+    if TRUST_SERVER_RESPONSES:
+        return JSONBytesResponse(dumps(content))
+    return content
+
+
+def stats() -> dict:
+    return {
+        "encoder": "orjson" if orjson is not None else "json",
+        "trust_server_responses": TRUST_SERVER_RESPONSES,
+    }